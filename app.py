@@ -1,81 +1,190 @@
 #!/usr/bin/env python3
-from typing import Dict, List, Any
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Tuple, Callable, Union
 
 from apscheduler.schedulers.blocking import BlockingScheduler
 
+import config
 from daily_dnds.abstract_daily_dnd import AbstractDailyDND
-from daily_dnds.rune_goldberg import rune_goldberg
 from hourly_dnds.abstract_hourly_dnd import AbstractHourlyDND
-from hourly_dnds.wilderness_flash_events import wilderness_flash_events
 from logging_framework.log_handler import log, Module
+from metrics.metrics import metrics, EVENT_RUNS
+from networking.http_client import http_client
+from plugins.registry import registry, DAILY, HOURLY, ADAPTER
+from profiling.profiler import profiler
+from scheduling.clock import clock
+from scheduling.event_runner import event_runner, EventTask, RunSummary
+from scheduling.triggers import daily_trigger, hourly_trigger
 from social_media_connectors.AbstractSocialMediaAdapter import AbstractSocialMediaAdapter
-from social_media_connectors.telegram_api import api as telegram_api
+from social_media_connectors.outbox import outbox
+from storage.state_store import state_store, get_content_hash
 
-daily_events: Dict[str, AbstractDailyDND] = {
-    'Rune Goldberg': rune_goldberg.RuneGoldberg()
-}
+scheduler: BlockingScheduler = BlockingScheduler(job_defaults={
+    # A run missed by at most the grace time still executes, several missed runs of a job execute once
+    'coalesce': True,
+    'misfire_grace_time': config.event_misfire_grace_seconds,
+    # Overlapping runs of the same event are handled by the event runner's overlap policy
+    'max_instances': 1
+})
 
-hourly_events: Dict[str, AbstractHourlyDND] = {
-    'Wilderness Flash Events': wilderness_flash_events.WildernessFlashEvents()
-}
 
-social_media_adapters: List[AbstractSocialMediaAdapter] = [
-    telegram_api
-]
-
-
-def _check_flags_and_notify(event_name: str, message: str, flags: Dict[str, Any]):
+def _check_flags_and_notify(event_name: str, message: str, flags: Dict[str, Any], period: str):
     if message is None or not len(message.strip()):
         log.info(f'Event {event_name} did not return a notification. Skipping.', module=Module.MAIN)
         return
-    for adapter in social_media_adapters:
-        adapter.notify(message=message, flags=flags, delete_previous_key=event_name)
+    image: Optional[Union[bytes, memoryview]] = AbstractSocialMediaAdapter.get_image(flags)
+    if image is not None and flags.get('image_data') is None:
+        # Read an image given by filepath once, instead of once per adapter
+        flags = {**flags, 'image_data': image}
+    content_hash: str = get_content_hash(message, image)
+    if state_store.was_delivered(event_name, period, content_hash) \
+            or outbox.is_pending(event_name, period, content_hash):
+        log.info(f'Identical notification for event {event_name} was already sent for {period}. Skipping.',
+                 module=Module.MAIN)
+        return
+    # Delivered and retried by the outbox worker, the scheduler does not wait for the adapters
+    outbox.enqueue(registry.names(ADAPTER), event_name, period, content_hash, message, image, flags=flags,
+                   delete_key=event_name)
 
 
-def daily_schedule() -> None:
+def _create_task(
+        event_name: str,
+        routine: str,
+        dnd: Union[AbstractDailyDND, AbstractHourlyDND],
+        execute: Callable[[], Tuple[str, Dict[str, Any]]],
+        skip_delivered: bool
+) -> EventTask:
     """
-    Fetches daily D&Ds.
-    :return:
+    Create the event runner task executing a D&D and sending its notification.
+    :param event_name: the event name.
+    :param routine: daily or hourly, for logging.
+    :param dnd: the D&D.
+    :param execute: the D&D's daily_exec or hourly_exec.
+    :param skip_delivered: skip the D&D entirely if a notification was already delivered for the current period.
+    :return: the task.
+    """
+    def _task(cancelled: threading.Event) -> None:
+        period: str = dnd.get_period_key(clock.now_ms())
+        if skip_delivered and (state_store.was_delivered(event_name, period) or outbox.is_pending(event_name, period)):
+            log.info(f'Event {event_name} was already delivered for {period}. Skipping.', module=Module.MAIN)
+            return
+        metrics.inc(EVENT_RUNS, event=event_name)
+        log.info(f'Executing {routine} routine for event: {event_name}', module=Module.MAIN)
+        with profiler.profile(routine, event_name):
+            message, flags = execute()
+            if cancelled.is_set():
+                log.warning(f'Event {event_name} finished after its deadline, dropping its notification.',
+                            module=Module.MAIN)
+                return
+            _check_flags_and_notify(event_name, message, flags, period)
+
+    return _task
+
+
+def _get_deadline(dnd: Union[AbstractDailyDND, AbstractHourlyDND]) -> float:
+    return dnd.deadline_seconds if dnd.deadline_seconds is not None else config.event_deadline_seconds
+
+
+def daily_schedule(skip_delivered: bool = False) -> RunSummary:
+    """
+    Fetches daily D&Ds concurrently.
+    :param skip_delivered: skip events that were already delivered for the current game day.
+    :return: the outcome of every event.
     """
-    global daily_events
-    for event_name, dnd in daily_events.items():
-        try:
-            log.info(f'Executing daily routine for event: {event_name}', module=Module.MAIN)
-            message, flags = dnd.daily_exec()
-            _check_flags_and_notify(event_name, message, flags)
-        except Exception as e:
-            log.error(f'Error executing daily schedule for event {event_name}. Trace: {e}', module=Module.MAIN)
+    events: List[Tuple[str, AbstractDailyDND]] = [(name, registry.get(DAILY, name)) for name in registry.names(DAILY)]
+    summary = event_runner.run('Daily schedule', [
+        (event_name, _create_task(event_name, 'daily', dnd, dnd.daily_exec, skip_delivered), _get_deadline(dnd))
+        for event_name, dnd in events if dnd is not None
+    ])
+    http_client.log_stats()
+    return summary
 
 
-def hourly_schedule() -> None:
+def hourly_schedule(event_names: Optional[List[str]] = None, skip_delivered: bool = False) -> RunSummary:
     """
-    Fetches hourly D&Ds.
+    Fetches hourly D&Ds concurrently.
+    :param event_names: optionally only run these events.
+    :param skip_delivered: skip events that were already delivered for their current period.
+    :return: the outcome of every event.
+    """
+    events: List[Tuple[str, AbstractHourlyDND]] = [
+        (name, registry.get(HOURLY, name)) for name in registry.names(HOURLY)
+        if event_names is None or name in event_names
+    ]
+    summary = event_runner.run('Hourly schedule', [
+        (event_name, _create_task(event_name, 'hourly', dnd, dnd.hourly_exec, skip_delivered), _get_deadline(dnd))
+        for event_name, dnd in events if dnd is not None
+    ])
+    http_client.log_stats()
+    return summary
+
+
+def _arm_hourly_event(event_name: str) -> bool:
+    """
+    Register a one-shot job for the next time the given hourly event is due.
+    :param event_name: the event name.
+    :return: false if the event does not provide its next fire time and has to run on the cron schedule.
+    """
+    dnd: Optional[AbstractHourlyDND] = registry.get(HOURLY, event_name)
+    if dnd is None:
+        return False
+    try:
+        fire_ms: Optional[int] = dnd.get_next_fire_time(clock.now_ms())
+    except Exception as e:
+        log.error(f'Error computing next run for event {event_name}. Trace: {e}', module=Module.MAIN)
+        fire_ms = None
+    if fire_ms is None:
+        return False
+    run_date = datetime.fromtimestamp(fire_ms / 1000, tz=timezone.utc)
+    scheduler.add_job(_fire_hourly_event, 'date', run_date=run_date, args=[event_name],
+                      id=f'hourly-{event_name}', replace_existing=True)
+    log.info(f'Next run for event {event_name} scheduled at {run_date.strftime("%m/%d/%Y %H:%M:%S")} UTC',
+             module=Module.MAIN)
+    return True
+
+
+def _fire_hourly_event(event_name: str) -> None:
+    """
+    One-shot job of the event driven scheduler mode. Runs the event and re-arms it.
+    :param event_name: the event name.
     :return:
     """
-    global hourly_events
-    for event_name, dnd in hourly_events.items():
-        try:
-            log.info(f'Executing hourly routine for event: {event_name}', module=Module.MAIN)
-            message, flags = dnd.hourly_exec()
-            _check_flags_and_notify(event_name, message, flags)
-        except Exception as e:
-            log.error(f'Error executing hourly schedule for event {event_name}. Trace: {e}', module=Module.MAIN)
+    try:
+        hourly_schedule([event_name])
+    finally:
+        if not _arm_hourly_event(event_name):
+            log.error(f'Could not re-arm event {event_name}, falling back to the hourly schedule.',
+                      module=Module.MAIN)
+            scheduler.add_job(hourly_schedule, hourly_trigger, args=[[event_name]],
+                              id=f'hourly-{event_name}', replace_existing=True)
 
 
 def exec_test_run() -> None:
+    """
+    Run all events on startup. Events already delivered before a restart are skipped.
+    :return:
+    """
     log.info('Executing daily schedule test...', module=Module.MAIN)
-    daily_schedule()
+    daily_schedule(skip_delivered=True)
     log.info('Executing hourly schedule test...', module=Module.MAIN)
-    hourly_schedule()
+    hourly_schedule(skip_delivered=True)
 
 
 if __name__ == '__main__':
     log.info('Starting application....', module=Module.MAIN)
+    if config.metrics_enabled:
+        metrics.start_server(config.metrics_host, config.metrics_port)
+    profiler.install_signal_handler()
+    # Deliver notifications left over from before a restart
+    outbox.start()
     exec_test_run()
     log.info('Testrun finished, started scheduler...', module=Module.MAIN)
-    scheduler = BlockingScheduler()
-    # 6 AM to ensure community events have correct information.
-    scheduler.add_job(daily_schedule, 'cron', hour=6, minute=0, id='daily-schedule')
-    # 30 minutes to next hour.
-    scheduler.add_job(hourly_schedule, 'cron', minute=30, id='hourly-schedule')
+    scheduler.add_job(daily_schedule, daily_trigger, id='daily-schedule')
+    if config.scheduler_mode == 'event':
+        cron_events = [event_name for event_name in registry.names(HOURLY) if not _arm_hourly_event(event_name)]
+        if cron_events:
+            scheduler.add_job(hourly_schedule, hourly_trigger, args=[cron_events], id='hourly-schedule')
+    else:
+        scheduler.add_job(hourly_schedule, hourly_trigger, id='hourly-schedule')
     scheduler.start()
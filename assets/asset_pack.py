@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Packs the static images of the D&D events into one indexed file.
+
+Build it with (from the repository root):
+    python -m assets.asset_pack [--output assets/assets.pack]
+
+Layout: the magic and the length of the index, the json index of key -> [offset, length, mime type], then the
+raw asset bytes. Offsets are relative to the end of the index. Keys are the paths relative to the source folders,
+for instance runes/1.gif or maps/lost_souls.png.
+"""
+import os
+import sys
+import json
+import mmap
+import base64
+import struct
+import argparse
+import mimetypes
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+import config
+from logging_framework.log_handler import log, Module
+
+_MAGIC: bytes = b'DNDPACK1'
+_HEADER = struct.Struct('<8sI')
+_ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Asset key prefix -> source folder
+SOURCES: Dict[str, str] = {
+    'runes': os.path.join(_ROOT, 'daily_dnds', 'rune_goldberg', 'runes'),
+    'maps': os.path.join(_ROOT, 'hourly_dnds', 'wilderness_flash_events', 'maps'),
+}
+
+
+def _list_sources(sources: Dict[str, str]) -> List[Tuple[str, str]]:
+    """
+    :param sources: key prefix -> source folder.
+    :return: the asset keys and file paths, sorted by key.
+    """
+    files: List[Tuple[str, str]] = []
+    for prefix, directory in sources.items():
+        if not os.path.isdir(directory):
+            continue
+        for filename in os.listdir(directory):
+            filepath = os.path.join(directory, filename)
+            if os.path.isfile(filepath):
+                files.append((f'{prefix}/{filename}', filepath))
+    return sorted(files)
+
+
+def pack(sources: Dict[str, str]) -> bytes:
+    """
+    Pack the files of the source folders.
+    :param sources: key prefix -> source folder.
+    :return: the asset pack.
+    """
+    index: Dict[str, list] = {}
+    blobs: List[bytes] = []
+    offset: int = 0
+    for key, filepath in _list_sources(sources):
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        index[key] = [offset, len(data), mimetypes.guess_type(filepath)[0] or 'application/octet-stream']
+        blobs.append(data)
+        offset += len(data)
+    encoded_index: bytes = json.dumps(index, separators=(',', ':')).encode('utf-8')
+    return b''.join([_HEADER.pack(_MAGIC, len(encoded_index)), encoded_index] + blobs)
+
+
+def build(filepath: str, sources: Dict[str, str], required: Optional[List[str]] = None) -> bytes:
+    """
+    Build the asset pack and write it atomically.
+    :param filepath: the output file.
+    :param sources: key prefix -> source folder.
+    :param required: optionally keys that must be packed, nothing is written if any is missing.
+    :return: the asset pack.
+    """
+    missing: List[str] = sorted(set(required or []) - {key for key, _ in _list_sources(sources)})
+    if missing:
+        raise ValueError(f'Assets missing from the source folders: {", ".join(missing)}')
+    data: bytes = pack(sources)
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    tmp_filepath: str = f'{filepath}.{os.getpid()}.tmp'
+    with open(tmp_filepath, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_filepath, filepath)
+    return data
+
+
+class AssetPack:
+    """
+    Read-only view of the asset pack. The file is memory-mapped on first use and assets are returned as
+    zero-copy slices of it. The base64 and data uri forms are encoded on first use and kept in memory.
+    A missing or outdated pack is rebuilt from the source folders when it is opened.
+    """
+
+    def _is_stale(self) -> bool:
+        """
+        :return: true if the pack is missing or older than any of its source folders or files.
+        """
+        if not os.path.exists(self._filepath):
+            return True
+        built: float = os.path.getmtime(self._filepath)
+        folders: List[str] = [directory for directory in self._sources.values() if os.path.isdir(directory)]
+        paths: List[str] = folders + [filepath for _, filepath in _list_sources(self._sources)]
+        return any(os.path.getmtime(path) > built for path in paths)
+
+    def _load(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        """
+        Read the index of a pack.
+        :param buffer: the mapped file or the pack in memory.
+        :return:
+        """
+        view = memoryview(buffer)
+        magic, index_length = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError(f'{self._filepath} is not an asset pack.')
+        data_start: int = _HEADER.size + index_length
+        index = json.loads(bytes(view[_HEADER.size:data_start]))
+        self._index = {key: (data_start + offset, length, mime) for key, (offset, length, mime) in index.items()}
+        self._view = view
+
+    def _open(self) -> None:
+        """
+        Map the pack into memory, rebuilding it first if required.
+        :return:
+        """
+        with self._lock:
+            if self._view is not None:
+                return
+            if self._is_stale():
+                try:
+                    build(self._filepath, self._sources)
+                    log.info(f'Built asset pack {self._filepath}.', module=Module.ASSETS)
+                except OSError as e:
+                    # Read-only installations still work, the pack is kept in memory instead
+                    log.error('Error writing asset pack, keeping it in memory. Trace:', e, module=Module.ASSETS)
+                    self._load(pack(self._sources))
+                    return
+            with open(self._filepath, 'rb') as f:
+                self._load(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            log.debug(f'Mapped {len(self._index)} assets from {self._filepath}.', module=Module.ASSETS)
+
+    def keys(self, prefix: str = '') -> List[str]:
+        """
+        :param prefix: optionally only list keys starting with this prefix, for instance 'maps/'.
+        :return: the asset keys.
+        """
+        if self._view is None:
+            self._open()
+        return [key for key in self._index if key.startswith(prefix)]
+
+    def get(self, key: str) -> Optional[memoryview]:
+        """
+        Get an asset without copying it.
+        :param key: the asset key, for instance runes/1.gif.
+        :return: the asset bytes, None if there is no such asset.
+        """
+        if self._view is None:
+            self._open()
+        entry: Optional[Tuple[int, int, str]] = self._index.get(key)
+        if entry is None:
+            return None
+        offset, length, _ = entry
+        return self._view[offset:offset + length]
+
+    def get_base64(self, key: str) -> Optional[str]:
+        """
+        :param key: the asset key.
+        :return: the base64 encoded asset, None if there is no such asset.
+        """
+        if key not in self._base64:
+            data: Optional[memoryview] = self.get(key)
+            if data is None:
+                return None
+            self._base64[key] = base64.b64encode(data).decode('ascii')
+        return self._base64[key]
+
+    def get_data_uri(self, key: str) -> Optional[str]:
+        """
+        :param key: the asset key.
+        :return: the asset as data uri, for instance to inline it in html. None if there is no such asset.
+        """
+        if key not in self._data_uris:
+            encoded: Optional[str] = self.get_base64(key)
+            if encoded is None:
+                return None
+            self._data_uris[key] = f'data:{self._index[key][2]};base64,{encoded}'
+        return self._data_uris[key]
+
+    def __init__(self, filepath: str, sources: Dict[str, str]):
+        """
+        Default constructor. Nothing is read until the first asset is requested.
+        :param filepath: the asset pack file.
+        :param sources: key prefix -> source folder, used to rebuild the pack.
+        """
+        self._filepath: str = filepath
+        self._sources: Dict[str, str] = sources
+        self._view: Optional[memoryview] = None
+        self._index: Dict[str, Tuple[int, int, str]] = {}
+        self._base64: Dict[str, str] = {}
+        self._data_uris: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+
+asset_pack: AssetPack = AssetPack(config.asset_pack_filepath, SOURCES)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=config.asset_pack_filepath)
+    args = parser.parse_args()
+    # Imported here, the event imports this module for its maps
+    from hourly_dnds.wilderness_flash_events.wilderness_flash_events import WildernessFlashEvents
+    required: List[str] = [f'maps/{filename}' for filename in WildernessFlashEvents.ROTATION.values()]
+    try:
+        data: bytes = build(args.output, SOURCES, required=required)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f'Packed {len(_list_sources(SOURCES))} assets into {args.output} ({len(data)} bytes).')
+
+
+if __name__ == '__main__':
+    main()
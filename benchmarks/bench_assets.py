@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the asset lookups of the D&D events. 'files' reads the assets from their source folders on every
+lookup, as the events did before the asset pack: listing the runes folder and base64 encoding each rune of a
+Rune Goldberg table, and checking for and reading a flash event map. 'pack' looks them up in the memory-mapped
+asset pack. The time to open the pack is reported separately.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_assets [--iterations 1000]
+"""
+import os
+import json
+import time
+import base64
+import argparse
+import tempfile
+from typing import Dict, Any, List, Callable
+
+# A table shows 1 first rune and 7 second runes
+_TABLE_RUNES: List[str] = [f'runes/{number}.gif' for number in (1, 4, 7, 9, 12, 15, 18, 20)]
+_MAP: str = 'maps/lost_souls.png'
+
+
+def _measure(lookup: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        lookup()
+    return round((time.perf_counter() - start) * 1000 * 1000 / iterations, 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=1000)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'DATA_DIR': tempfile.mkdtemp(prefix='dnd-bench-'),
+        'LOGFILE': os.path.join(tempfile.gettempdir(), 'dnd-bench.log'),
+        'LOG_LEVEL': 'silent',
+        'ASSET_PACK_FILEPATH': os.path.join(tempfile.mkdtemp(prefix='dnd-bench-'), 'assets.pack'),
+    })
+    from assets.asset_pack import AssetPack, SOURCES, build
+    import config
+
+    def files_table() -> List[str]:
+        available = os.listdir(SOURCES['runes'])
+        uris = []
+        for key in _TABLE_RUNES:
+            if os.path.basename(key) in available:
+                with open(os.path.join(SOURCES['runes'], os.path.basename(key)), 'rb') as f:
+                    uris.append(f"data:image/gif;base64,{base64.b64encode(f.read()).decode('utf-8')}")
+        return uris
+
+    def files_map() -> bytes:
+        filepath = os.path.join(SOURCES['maps'], os.path.basename(_MAP))
+        if os.path.exists(filepath):
+            with open(filepath, 'rb') as f:
+                return f.read()
+
+    start = time.perf_counter()
+    build(config.asset_pack_filepath, SOURCES)
+    build_ms = (time.perf_counter() - start) * 1000
+    pack = AssetPack(config.asset_pack_filepath, SOURCES)
+    start = time.perf_counter()
+    pack.get(_MAP)
+    open_ms = (time.perf_counter() - start) * 1000
+
+    results: Dict[str, Any] = {
+        'build_ms': round(build_ms, 2),
+        'open_ms': round(open_ms, 2),
+        'pack_bytes': os.path.getsize(config.asset_pack_filepath),
+        'rune_table_us': {
+            'files': _measure(files_table, args.iterations),
+            'pack': _measure(lambda: [pack.get_data_uri(key) for key in _TABLE_RUNES], args.iterations),
+        },
+        'map_us': {
+            'files': _measure(files_map, args.iterations),
+            'pack': _measure(lambda: pack.get(_MAP), args.iterations),
+        },
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the attachment path from the D&D events to the Telegram upload, counting the files opened per
+notification with an audit hook. 'buffer' passes images in memory as the events return them now, 'filepath'
+writes them to a file and passes its path, as the events did before the in-memory attachment pipeline.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_attachment_io [--iterations 50]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from typing import Dict, Any, List, Tuple, Callable
+
+from benchmarks.fake_telegram_api import FakeTelegramServer
+from benchmarks.fixture_server import FixtureServer
+
+_opened: List[str] = []
+
+
+def _audit(event: str, args: Tuple) -> None:
+    if event == 'open' and isinstance(args[0], str):
+        _opened.append(args[0])
+
+
+def _configure_environment(fixtures: FixtureServer, telegram: FakeTelegramServer) -> None:
+    """
+    Point the application at the local servers. Must run before the application modules are imported.
+    """
+    os.environ.update({
+        'DATA_DIR': tempfile.mkdtemp(prefix='dnd-bench-'),
+        'LOGFILE': os.path.join(tempfile.gettempdir(), 'dnd-bench.log'),
+        'LOG_LEVEL': 'silent',
+        'TELEGRAM_ENABLED': 'true',
+        'TELEGRAM_API_KEY': 'benchmark',
+        'TELEGRAM_CHAT_ID': '1',
+        'TELEGRAM_API_URL': telegram.url,
+        'TELEGRAM_GLOBAL_RATE_PER_SECOND': '100000',
+        'TELEGRAM_CHAT_RATE_PER_MINUTE': '6000000',
+        'RUNE_GOLDBERG_URL': fixtures.url('/goldberg'),
+        'RUNE_GOLDBERG_RENDER_BACKEND': 'native',
+    })
+
+
+def _as_filepath(flags: Dict[str, Any], filepath: str) -> Dict[str, Any]:
+    """
+    Convert flags to the previous file based form.
+    """
+    if not flags.get('image'):
+        return flags
+    with open(filepath, 'wb') as f:
+        f.write(flags['image_data'])
+    return {'image': True, 'filepath': filepath}
+
+
+def _measure(execute: Callable[[], Tuple[str, Dict[str, Any]]], notify: Callable, mode: str, filepath: str,
+             iterations: int) -> Dict[str, Any]:
+    timings: List[float] = []
+    _opened.clear()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        message, flags = execute()
+        if mode == 'filepath':
+            flags = _as_filepath(flags, filepath)
+        notify(message, flags)
+        timings.append((time.perf_counter() - start) * 1000)
+    image_opens = sum(1 for path in _opened if path.endswith('.png'))
+    return {
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'file_opens_per_run': round(len(_opened) / iterations, 2),
+        'image_file_opens_per_run': round(image_opens / iterations, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    fixtures = FixtureServer().start()
+    telegram = FakeTelegramServer().start()
+    _configure_environment(fixtures, telegram)
+
+    from daily_dnds.rune_goldberg.rune_goldberg import RuneGoldberg
+    from hourly_dnds.wilderness_flash_events.wilderness_flash_events import WildernessFlashEvents
+    from social_media_connectors.telegram_api import TelegramAPI
+
+    api = TelegramAPI()
+    goldberg, flash_events = RuneGoldberg(), WildernessFlashEvents()
+    # Warm up the caches, so that only the steady state is measured
+    goldberg.daily_exec()
+    flash_events.hourly_exec()
+    filepath = os.path.join(tempfile.mkdtemp(prefix='dnd-bench-'), 'generated.png')
+
+    sys.addaudithook(_audit)
+    results: Dict[str, Any] = {}
+    for mode in ('filepath', 'buffer'):
+        results[mode] = {
+            'rune_goldberg': _measure(goldberg.daily_exec, api.notify, mode, filepath, args.iterations),
+            'wilderness_flash_events': _measure(flash_events.hourly_exec, api.notify, mode, filepath,
+                                                args.iterations),
+        }
+    fixtures.stop()
+    telegram.stop()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the closed-form flash event schedule against the previous string based implementation
+and checks that both agree on the next event for random points in time.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_flash_event_schedule [--samples 20000] [--seed 1]
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Tuple, List
+
+from hourly_dnds.wilderness_flash_events.schedule import FlashEventSchedule, HOUR_MS
+from hourly_dnds.wilderness_flash_events.wilderness_flash_events import WildernessFlashEvents
+
+EVENTS: List[str] = list(WildernessFlashEvents.ROTATION.keys())
+START_MS: int = WildernessFlashEvents.START_EPOCH_MS
+FULL_PERIOD_HOURS: int = WildernessFlashEvents.FULL_PERIOD_HOURS
+ITEM_PERIOD_HOURS: int = WildernessFlashEvents.ITEM_PERIOD_HOURS
+
+
+def legacy_events_dictionary(now: datetime) -> Dict[str, str]:
+    """
+    The previous WildernessFlashEvents._get_events_dictionary, with an explicit current time.
+    """
+    events: Dict[str, str] = {}
+    start_time = datetime.fromtimestamp(START_MS / 1000, tz=timezone.utc)
+    for i, name in enumerate(EVENTS):
+        event_time = start_time + timedelta(hours=i * ITEM_PERIOD_HOURS)
+        elapsed = now - event_time
+        cycles = int(elapsed.total_seconds() // (FULL_PERIOD_HOURS * 3600))
+        if elapsed.total_seconds() % (FULL_PERIOD_HOURS * 3600) != 0:
+            cycles += 1
+        next_time = event_time + timedelta(hours=cycles * FULL_PERIOD_HOURS)
+        events[name] = next_time.strftime("%H:%M")
+    return events
+
+
+def legacy_candidates(now: datetime) -> List[Tuple[str, datetime]]:
+    """
+    The events the previous WildernessFlashEvents._get_next_event accepted, with an explicit current time.
+    It returned the first candidate in rotation order, so exactly on a slot boundary it could pick the event
+    starting an hour later. The earliest candidate is the correct answer.
+    """
+    candidates = []
+    for event_name, event_timestamp in legacy_events_dictionary(now).items():
+        event_time = datetime.strptime(event_timestamp, "%H:%M").replace(
+            year=now.year, month=now.month, day=now.day, tzinfo=timezone.utc
+        )
+        if event_time < now:
+            event_time += timedelta(days=1)
+        if now <= event_time <= now + timedelta(hours=1):
+            candidates.append((event_name, event_time))
+    if not candidates:
+        raise Exception("Could not fetch next wilderness flash event.")
+    return candidates
+
+
+def legacy_next_event(now: datetime) -> Tuple[str, datetime]:
+    """
+    The previous WildernessFlashEvents._get_next_event, with an explicit current time.
+    """
+    return legacy_candidates(now)[0]
+
+
+def check_agreement(schedule: FlashEventSchedule, samples: List[int]) -> List[Dict[str, str]]:
+    """
+    Compare the next event of both implementations, and the range query against next_events.
+    :return: the mismatches found.
+    """
+    mismatches = []
+    for t_ms in samples:
+        now = datetime.fromtimestamp(t_ms / 1000, tz=timezone.utc)
+        legacy_name, legacy_time = min(legacy_candidates(now), key=lambda candidate: candidate[1])
+        name, event_ms = schedule.next_events(t_ms)[0]
+        if (name, event_ms) != (legacy_name, int(legacy_time.timestamp() * 1000)):
+            mismatches.append({'now': now.isoformat(), 'legacy': legacy_name, 'schedule': name})
+        window = schedule.next_events(t_ms, 2 * len(EVENTS))
+        occurrences = schedule.occurrences(name, t_ms, window[-1][1] + 1)
+        if occurrences != [start for event, start in window if event == name]:
+            mismatches.append({'now': now.isoformat(), 'range_query': name})
+    return mismatches
+
+
+def _time_per_call_us(fn, samples: List[int]) -> float:
+    start = time.perf_counter()
+    for t_ms in samples:
+        fn(t_ms)
+    return (time.perf_counter() - start) / len(samples) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--samples', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    schedule = FlashEventSchedule(EVENTS, START_MS, FULL_PERIOD_HOURS, ITEM_PERIOD_HOURS)
+    year_ms = 366 * 24 * HOUR_MS
+    samples = [START_MS + rng.randrange(-year_ms, 3 * year_ms) for _ in range(args.samples)]
+    # Slot boundaries and the instants around midnight are where string round trips used to break.
+    samples += [START_MS + i * HOUR_MS + delta for i in range(-48, 48) for delta in (-1, 0, 1)]
+
+    mismatches = check_agreement(schedule, samples)
+    results = {
+        'samples': len(samples),
+        'mismatches': len(mismatches),
+        'legacy_next_event_us': round(_time_per_call_us(
+            lambda t: legacy_next_event(datetime.fromtimestamp(t / 1000, tz=timezone.utc)), samples), 3),
+        'next_event_us': round(_time_per_call_us(lambda t: schedule.next_events(t), samples), 3),
+        'event_at_us': round(_time_per_call_us(schedule.event_at, samples), 3),
+        'occurrences_one_year_us': round(_time_per_call_us(
+            lambda t: schedule.occurrences('Infernal Star', t, t + year_ms), samples[:1000]), 3),
+    }
+    print(json.dumps(results, indent=2))
+    for mismatch in mismatches[:10]:
+        print('Mismatch:', mismatch, file=sys.stderr)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
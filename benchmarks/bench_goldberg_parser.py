@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the single-pass Rune Goldberg page parser against the previous split based extraction,
+using saved copies of the warbandtracker page. The large variant repeats the report history below the
+table, as on busy days, to show the effect of stopping once the table has been read.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_goldberg_parser [--iterations 2000] [--chunk-size 8192]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import List, Tuple, Dict, Any
+
+from daily_dnds.rune_goldberg.page_parser import GoldbergPageParser
+
+_fixture_filepath: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures',
+                                      'warbandtracker_goldberg.html')
+
+
+def legacy_parse(html: str) -> Tuple[str, List[str]]:
+    """
+    The previous RuneGoldberg._get_html_table table extraction and RuneGoldberg._get_daily_runes.
+    """
+    table: str = html.split('<h2>Correct Rune Combinations</h2>')[1].split('</div>')[0]
+    runes = []
+    for val in html.split('.gif'):
+        if len(runes) >= 4:
+            break
+        if 'rune' in val:
+            _possible = val.split('rune')[0]
+            if 'input' in _possible or 'html' in _possible:
+                continue
+            _rune = _possible.split('title=\'')[1].split('\'')[0]
+            if 'Rune' in _rune:
+                runes.append(_rune)
+    return table, runes
+
+
+def streaming_parse(html: str, chunk_size: int) -> GoldbergPageParser:
+    chunks = (html[i:i + chunk_size] for i in range(0, len(html), chunk_size))
+    return GoldbergPageParser().feed_all(chunks)
+
+
+def _build_pages() -> Dict[str, str]:
+    with open(_fixture_filepath, 'r', encoding='utf-8') as f:
+        page = f.read()
+    start = page.index('<div class="contentBlock">\n\t\t\t<h2>Latest Reports</h2>')
+    end = page.index('</div>', start) + len('</div>')
+    history = page[start:end]
+    return {'fixture': page, 'large': page[:end] + history * 500 + page[end:]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--chunk-size', type=int, default=8192)
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    failed = False
+    for name, page in _build_pages().items():
+        table, runes = legacy_parse(page)
+        parsed = streaming_parse(page, args.chunk_size)
+        identical = parsed.table == table and parsed.runes == runes
+        failed = failed or not identical
+
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            legacy_parse(page)
+        legacy_us = (time.perf_counter() - start) / args.iterations * 1e6
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            streaming_parse(page, args.chunk_size)
+        streaming_us = (time.perf_counter() - start) / args.iterations * 1e6
+
+        results.append({
+            'page': name,
+            'page_chars': len(page),
+            'chars_read': parsed.chars_read,
+            'identical': identical,
+            'legacy_us': round(legacy_us, 2),
+            'streaming_us': round(streaming_us, 2)
+        })
+    print(json.dumps(results, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
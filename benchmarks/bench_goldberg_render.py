@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Compares wall time and peak rss of the Rune Goldberg render backends.
+Each backend runs in its own process so that peak memory values do not mix.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_goldberg_render [--renders 20] [--backend native|chromium]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+from typing import Dict, Any, List
+
+_fixture_filepath: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures',
+                                      'warbandtracker_goldberg.html')
+BACKENDS: List[str] = ['native', 'chromium']
+
+
+def _run_backend(backend: str, renders: int) -> Dict[str, Any]:
+    """
+    Render the fixture table repeatedly with a single backend.
+    :param backend: the backend to measure.
+    :param renders: number of renders.
+    :return: the measurements.
+    """
+    from daily_dnds.rune_goldberg import native_renderer
+    from daily_dnds.rune_goldberg.rune_goldberg import RuneGoldberg
+    from rendering.chromium_render_service import render_service
+
+    with open(_fixture_filepath, 'r', encoding='utf-8') as f:
+        html = f.read()
+    goldberg = RuneGoldberg()
+    timings: List[float] = []
+    browser_rss: int = 0
+    for _ in range(renders):
+        start = time.perf_counter()
+        if backend == 'native':
+            native_renderer.render_table(goldberg._get_table_fragment(html))
+        else:
+            render_service.render_element(html=goldberg._get_html_table(goldberg._get_table_fragment(html)),
+                                          selector='table.worldTable')
+            browser_rss = max(browser_rss, render_service._get_rss_bytes())
+        timings.append(time.perf_counter() - start)
+    render_service.shutdown()
+    warm = timings[1:] or timings
+    return {
+        'backend': backend,
+        'renders': renders,
+        'first_render_ms': round(timings[0] * 1000, 2),
+        'warm_avg_ms': round(sum(warm) / len(warm) * 1000, 2),
+        'total_s': round(sum(timings), 3),
+        # ru_maxrss is reported in KB on linux.
+        'peak_rss_mb': round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 + browser_rss) / 2 ** 20, 1)
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--renders', type=int, default=20)
+    parser.add_argument('--backend', choices=BACKENDS, default=None)
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(_run_backend(args.backend, args.renders)))
+        return
+    results = []
+    for backend in BACKENDS:
+        proc = subprocess.run([sys.executable, '-m', 'benchmarks.bench_goldberg_render', '--backend', backend,
+                               '--renders', str(args.renders)], capture_output=True, text=True)
+        if proc.returncode != 0:
+            results.append({'backend': backend, 'error': proc.stderr.strip().splitlines()[-1:]})
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the image variants sent to Telegram: for every flash event map and the rendered Rune Goldberg table,
+the payload size and upload time of the source image ('before') and of the variant the adapter sends now
+('after'). Uploads go to the local fake bot api, so the upload times mostly reflect the payload handling;
+'uplink_ms' estimates the transfer time over a link of --uplink-mbit.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_image_variants [--iterations 10] [--uplink-mbit 10]
+"""
+import os
+import json
+import time
+import uuid
+import argparse
+import tempfile
+from typing import Dict, Any, List
+
+from benchmarks.fake_telegram_api import FakeTelegramServer
+from benchmarks.fixture_server import FixtureServer
+
+
+def _configure_environment(fixtures: FixtureServer, telegram: FakeTelegramServer) -> None:
+    """
+    Point the application at the local servers. Must run before the application modules are imported.
+    """
+    os.environ.update({
+        'DATA_DIR': tempfile.mkdtemp(prefix='dnd-bench-'),
+        'LOGFILE': os.path.join(tempfile.gettempdir(), 'dnd-bench.log'),
+        'LOG_LEVEL': 'silent',
+        'TELEGRAM_ENABLED': 'true',
+        'TELEGRAM_API_KEY': 'benchmark',
+        'TELEGRAM_CHAT_ID': '1',
+        'TELEGRAM_API_URL': telegram.url,
+        'TELEGRAM_GLOBAL_RATE_PER_SECOND': '100000',
+        'TELEGRAM_CHAT_RATE_PER_MINUTE': '6000000',
+        'RUNE_GOLDBERG_URL': fixtures.url('/goldberg'),
+        'RUNE_GOLDBERG_RENDER_BACKEND': 'native',
+    })
+
+
+def _upload_ms(api, variant, iterations: int) -> float:
+    """
+    Mean time of a photo upload, bypassing the file id cache.
+    """
+    timings: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        api._send_photo('1', 'benchmark', variant, uuid.uuid4().hex)
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(sum(timings) / len(timings), 3)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--uplink-mbit', type=float, default=10)
+    args = parser.parse_args()
+
+    fixtures = FixtureServer().start()
+    telegram = FakeTelegramServer().start()
+    _configure_environment(fixtures, telegram)
+
+    from daily_dnds.rune_goldberg.rune_goldberg import RuneGoldberg
+    from hourly_dnds.wilderness_flash_events.wilderness_flash_events import WildernessFlashEvents
+    from rendering.image_variants import ImageVariant, image_optimiser, _detect_format
+    from social_media_connectors.telegram_api import TelegramAPI
+
+    api = TelegramAPI()
+    flash_events = WildernessFlashEvents()
+    images: Dict[str, bytes] = {'Rune Goldberg': RuneGoldberg().daily_exec()[1]['image_data']}
+    for event_name in flash_events.ROTATION:
+        image_data = flash_events._get_map(event_name)
+        if image_data is not None:
+            images[event_name] = image_data
+
+    def uplink_ms(size: int) -> float:
+        return round(size * 8 / (args.uplink_mbit * 1000 * 1000) * 1000, 1)
+
+    results: Dict[str, Any] = {}
+    totals = {'before_bytes': 0, 'after_bytes': 0}
+    for name, image_data in images.items():
+        start = time.perf_counter()
+        variant = image_optimiser.get_variant(image_data, api.image_profile)
+        encode_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        image_optimiser.get_variant(image_data, api.image_profile)
+        cached_ms = (time.perf_counter() - start) * 1000
+        source = ImageVariant(image_data, _detect_format(image_data))
+        results[name] = {
+            'before': {'format': source.format, 'bytes': len(image_data), 'uplink_ms': uplink_ms(len(image_data)),
+                       'upload_ms': _upload_ms(api, source, args.iterations)},
+            'after': {'format': variant.format, 'bytes': len(variant.data), 'uplink_ms': uplink_ms(len(variant.data)),
+                      'upload_ms': _upload_ms(api, variant, args.iterations)},
+            'encode_ms': round(encode_ms, 1),
+            'cached_lookup_ms': round(cached_ms, 3),
+        }
+        totals['before_bytes'] += len(image_data)
+        totals['after_bytes'] += len(variant.data)
+    fixtures.stop()
+    telegram.stop()
+    totals['saved_percent'] = round(100 - totals['after_bytes'] * 100 / max(1, totals['before_bytes']), 1)
+    print(json.dumps({'uplink_mbit': args.uplink_mbit, 'images': results, 'total': totals}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmarks rendering a flash event notification for many recipients in their own timezone and language.
+'zoneinfo' converts the event time with a new ZoneInfo and datetime for every recipient, as hourly_exec did for its
+single Europe/Berlin message. 'table' looks the offset up in the precomputed transition table and formats the
+message for every recipient, 'table_shared' additionally renders each timezone and locale only once, as the
+Telegram adapter does.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_localised_messages [--recipients 5000] [--zones 50]
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import zoneinfo
+from datetime import datetime
+from typing import Dict, Any, List, Callable
+
+_LOCALES: List[str] = ['en', 'en_US', 'de', 'en_AU']
+
+
+def _measure(render: Callable[[], Any], recipients: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    render()
+    elapsed = time.perf_counter() - start
+    return {'total_ms': round(elapsed * 1000, 2), 'per_recipient_us': round(elapsed * 1000 * 1000 / recipients, 2)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--recipients', type=int, default=5000)
+    parser.add_argument('--zones', type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ.update({
+        'DATA_DIR': tempfile.mkdtemp(prefix='dnd-bench-'),
+        'LOGFILE': os.path.join(tempfile.gettempdir(), 'dnd-bench.log'),
+        'LOG_LEVEL': 'silent',
+    })
+    from localisation.localised_message import LocalisedMessage, RecipientSettings, get_zone_table
+    from hourly_dnds.wilderness_flash_events.wilderness_flash_events import WildernessFlashEvents
+
+    random.seed(1)
+    zones: List[str] = random.sample(sorted(zoneinfo.available_timezones()), args.zones)
+    recipients: List[RecipientSettings] = [RecipientSettings(random.choice(zones), random.choice(_LOCALES))
+                                           for _ in range(args.recipients)]
+    now_ms: int = int(time.time() * 1000)
+    event_ms: int = (now_ms // 3600000 + 1) * 3600000
+    message = LocalisedMessage(WildernessFlashEvents._get_templates('Spider Swarm'), event_ms)
+
+    def render_zoneinfo() -> List[str]:
+        texts = []
+        for settings in recipients:
+            event_time = datetime.fromtimestamp(event_ms / 1000, tz=zoneinfo.ZoneInfo(settings.timezone))
+            template = message.templates.get(settings.language) or message.templates['en']
+            texts.append(template.format(time=event_time.strftime('%I:%M %p' if settings.twelve_hour_clock
+                                                                  else '%H:%M'),
+                                         zone=event_time.tzname(), minutes=(event_ms - now_ms) // 60000))
+        return texts
+
+    def render_table_shared() -> List[str]:
+        rendered: Dict[Any, str] = {}
+        texts = []
+        for settings in recipients:
+            text = rendered.get(settings.key)
+            if text is None:
+                text = rendered[settings.key] = message.render(settings, now_ms)
+            texts.append(text)
+        return texts
+
+    start = time.perf_counter()
+    for zone in zones:
+        get_zone_table(zone, now_ms)
+    build_ms = (time.perf_counter() - start) * 1000
+    results: Dict[str, Any] = {
+        'recipients': args.recipients,
+        'zones': args.zones,
+        'table_build_ms': round(build_ms, 2),
+        'zoneinfo': _measure(render_zoneinfo, args.recipients),
+        'table': _measure(lambda: [message.render(settings, now_ms) for settings in recipients], args.recipients),
+        'table_shared': _measure(render_table_shared, args.recipients),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
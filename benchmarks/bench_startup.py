@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmarks application startup: the time to import app.py and the resident memory afterwards, each measured
+in a fresh interpreter. 'lazy' is the current startup, where events and adapters are imported on first use.
+'eager' additionally imports every plugin module and the browser libraries, as app.py did before the plugin registry.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup [--runs 5] [--telegram-enabled]
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, Any, List
+
+# Modules that were imported at startup before the plugin registry
+_EAGER_IMPORTS: List[str] = [
+    'html2image',
+    'rendering.chromium_render_service',
+    'daily_dnds.rune_goldberg.rune_goldberg',
+    'hourly_dnds.wilderness_flash_events.wilderness_flash_events',
+    'social_media_connectors.telegram_api',
+]
+_HEAVY_MODULES: List[str] = ['selenium', 'html2image', 'PIL', 'social_media_connectors.telegram_api']
+
+_MEASURE_SCRIPT: str = '''
+import sys, time, json, importlib
+start = time.perf_counter()
+import app
+for module in {imports!r}:
+    importlib.import_module(module)
+elapsed_ms = (time.perf_counter() - start) * 1000
+rss_kb = 0
+with open('/proc/self/status') as f:
+    for line in f:
+        if line.startswith('VmRSS:'):
+            rss_kb = int(line.split()[1])
+print(json.dumps({{'import_ms': elapsed_ms, 'rss_mb': rss_kb / 1024, 'modules': len(sys.modules),
+                  'heavy_modules': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def _measure(imports: List[str], runs: int, env: Dict[str, str]) -> Dict[str, Any]:
+    samples: List[Dict[str, Any]] = []
+    script = _MEASURE_SCRIPT.format(imports=imports, heavy=_HEAVY_MODULES)
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', script], env=env, capture_output=True, text=True, check=True)
+        samples.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    import_ms = sorted(sample['import_ms'] for sample in samples)
+    rss_mb = sorted(sample['rss_mb'] for sample in samples)
+    return {
+        'import_ms_p50': round(import_ms[len(import_ms) // 2], 1),
+        'import_ms_min': round(import_ms[0], 1),
+        'rss_mb_p50': round(rss_mb[len(rss_mb) // 2], 1),
+        'modules': samples[-1]['modules'],
+        'heavy_modules': samples[-1]['heavy_modules'],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--telegram-enabled', action='store_true')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.update({
+        'DATA_DIR': tempfile.mkdtemp(prefix='dnd-bench-'),
+        'LOGFILE': os.path.join(tempfile.gettempdir(), 'dnd-bench.log'),
+        'LOG_LEVEL': 'silent',
+        'TELEGRAM_ENABLED': 'true' if args.telegram_enabled else 'false',
+        'TELEGRAM_API_KEY': 'benchmark',
+        'TELEGRAM_CHAT_ID': '1',
+        'TELEGRAM_API_URL': 'http://127.0.0.1:9',
+    })
+    print(json.dumps({
+        'telegram_enabled': args.telegram_enabled,
+        'lazy': _measure([], args.runs, env),
+        'eager': _measure(_EAGER_IMPORTS, args.runs, env),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmarks broadcasting notifications to many Telegram chats against the local stand-in with rate limits enabled.
+Compares the rate limited send scheduler of the Telegram adapter with sending to all chats as fast as possible,
+which runs into flood control and loses messages.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_telegram_broadcast [--chats 200] [--rounds 2] [--global-rate 100]
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List
+
+from benchmarks.fake_telegram_api import FakeTelegramServer
+
+
+def _configure_environment(telegram: FakeTelegramServer, chat_ids: List[str], global_rate: float,
+                           chat_rate_per_minute: float) -> None:
+    """
+    Point the application at the stand-in. Must run before the application modules are imported.
+    """
+    os.environ.update({
+        'DATA_DIR': tempfile.mkdtemp(prefix='dnd-bench-'),
+        'LOGFILE': os.path.join(tempfile.gettempdir(), 'dnd-bench.log'),
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'silent'),
+        'TELEGRAM_ENABLED': 'true',
+        'TELEGRAM_API_KEY': 'benchmark',
+        'TELEGRAM_CHAT_ID': ','.join(chat_ids),
+        'TELEGRAM_API_URL': telegram.url,
+        'TELEGRAM_GLOBAL_RATE_PER_SECOND': str(global_rate),
+        'TELEGRAM_CHAT_RATE_PER_MINUTE': str(chat_rate_per_minute),
+    })
+
+
+def _summarize(telegram: FakeTelegramServer, first_call: int, seconds: float, messages: int) -> Dict[str, Any]:
+    sends = [call for call in telegram.calls[first_call:] if call['method'] == 'sendMessage']
+    delivered = sum(1 for call in sends if not call.get('rate_limited'))
+    return {
+        'messages': messages,
+        'delivered': delivered,
+        'rate_limited_responses': len(sends) - delivered,
+        'seconds': round(seconds, 3),
+        'delivered_per_second': round(delivered / seconds, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chats', type=int, default=200)
+    parser.add_argument('--rounds', type=int, default=2, help='notifications sent to every chat')
+    parser.add_argument('--global-rate', type=float, default=100, help='allowed calls per second over all chats')
+    parser.add_argument('--chat-rate-per-minute', type=float, default=20)
+    parser.add_argument('--chat-burst', type=float, default=3)
+    args = parser.parse_args()
+
+    chat_ids = [str(-1000000000000 - i) for i in range(args.chats)]
+    telegram = FakeTelegramServer(global_rate=args.global_rate, chat_rate=args.chat_rate_per_minute / 60,
+                                  chat_burst=args.chat_burst).start()
+    _configure_environment(telegram, chat_ids, args.global_rate, args.chat_rate_per_minute)
+
+    from networking.http_client import http_client
+    from social_media_connectors.telegram_api import TelegramAPI
+
+    # Unpaced: every chat at once from as many threads as the scheduler uses, giving up on 429
+    first_call = len(telegram.calls)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for i in range(args.rounds):
+            list(executor.map(lambda chat_id: http_client.post(f'{telegram.url}/botbenchmark/sendMessage', data={
+                'chat_id': chat_id, 'text': f'Unpaced notification {i}'
+            }), chat_ids))
+    unpaced = _summarize(telegram, first_call, time.perf_counter() - start, args.chats * args.rounds)
+
+    # Let the stand-in's buckets refill before the next run
+    time.sleep(max(1.0, 60 * args.chat_burst / args.chat_rate_per_minute))
+
+    api = TelegramAPI()
+    first_call = len(telegram.calls)
+    start = time.perf_counter()
+    for i in range(args.rounds):
+        api.notify(f'Scheduled notification {i}', {}, delete_previous_key='benchmark')
+    scheduled = _summarize(telegram, first_call, time.perf_counter() - start, args.chats * args.rounds)
+    # Previous messages are deleted in the background
+    deadline = time.monotonic() + 30
+    while len(telegram.deleted) < args.chats * (args.rounds - 1) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    scheduled['deleted'] = len(telegram.deleted)
+    telegram.stop()
+
+    print(json.dumps({
+        'chats': args.chats,
+        'rounds': args.rounds,
+        'global_rate_limit': args.global_rate,
+        'chat_rate_limit_per_minute': args.chat_rate_per_minute,
+        'unpaced': unpaced,
+        'scheduled': scheduled,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Telegram Bot API, implementing sendMessage, sendPhoto, deleteMessage and deleteMessages.
+Point the bot at it with TELEGRAM_API_URL=http://127.0.0.1:<port>.
+Optionally enforces rate limits like telegram's flood control, answering 429 with a retry_after.
+
+Usage (from the repository root):
+    python -m benchmarks.fake_telegram_api [--port 8081] [--global-rate 30] [--chat-rate 1]
+"""
+import re
+import json
+import math
+import time
+import uuid
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Tuple, Optional
+
+_PATH_PATTERN = re.compile(r'^/bot[^/]+/(\w+)$')
+
+
+def _parse_multipart(body: bytes, content_type: str) -> Dict[str, Any]:
+    """
+    Minimal multipart/form-data parser. File fields are returned as bytes, other fields as strings.
+    """
+    boundary = content_type.split('boundary=', 1)[1].strip('"').encode('utf-8')
+    fields: Dict[str, Any] = {}
+    for part in body.split(b'--' + boundary):
+        if b'\r\n\r\n' not in part:
+            continue
+        head, value = part.split(b'\r\n\r\n', 1)
+        name = re.search(rb'name="([^"]*)"', head)
+        if name is None:
+            continue
+        value = value[:-2] if value.endswith(b'\r\n') else value
+        fields[name.group(1).decode('utf-8')] = value if b'filename=' in head else value.decode('utf-8')
+    return fields
+
+
+class _RateLimit:
+    """
+    Token bucket that rejects calls instead of queueing them.
+    """
+
+    def take(self) -> float:
+        """
+        :return: 0 if the call is allowed, otherwise the seconds until it would be.
+        """
+        now = time.monotonic()
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        if self._tokens < 1:
+            return (1 - self._tokens) / self._rate
+        self._tokens -= 1
+        return 0
+
+    def __init__(self, rate: float, capacity: float):
+        self._rate: float = rate
+        self._capacity: float = capacity
+        self._tokens: float = capacity
+        self._updated: float = time.monotonic()
+
+
+class FakeTelegramServer:
+    """
+    In-process fake bot api server recording every call.
+    """
+
+    def _handle(self, method: str, params: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """
+        Handle a single api call.
+        :param method: the bot api method.
+        :param params: the request parameters.
+        :return: the status code and the json response.
+        """
+        with self._lock:
+            photo = params.get('photo')
+            chat_id = str(params.get('chat_id'))
+            self.calls.append({
+                'method': method,
+                'chat_id': chat_id,
+                'upload_bytes': len(photo) if isinstance(photo, bytes) else 0,
+                'text': params.get('text') or params.get('caption')
+            })
+            retry_after = self._check_rate_limits(method, chat_id)
+            if retry_after:
+                self.rate_limited += 1
+                self.calls[-1]['rate_limited'] = True
+                return 429, {'ok': False, 'error_code': 429,
+                             'description': f'Too Many Requests: retry after {retry_after}',
+                             'parameters': {'retry_after': retry_after}}
+            if method in ('sendMessage', 'sendPhoto'):
+                if method == 'sendPhoto' and isinstance(photo, str) and photo not in self._file_ids:
+                    return 400, {'ok': False, 'error_code': 400,
+                                 'description': 'Bad Request: wrong file identifier/HTTP URL specified'}
+                self._message_id += 1
+                result: Dict[str, Any] = {'message_id': self._message_id, 'chat': {'id': params.get('chat_id')}}
+                if method == 'sendPhoto':
+                    file_id = photo if isinstance(photo, str) else uuid.uuid4().hex
+                    self._file_ids.add(file_id)
+                    result['photo'] = [{'file_id': f'{file_id}-thumb'}, {'file_id': file_id}]
+                else:
+                    result['text'] = params.get('text')
+                return 200, {'ok': True, 'result': result}
+            if method in ('deleteMessage', 'deleteMessages'):
+                ids = params.get('message_ids') or [params.get('message_id')]
+                self.deleted += [int(msg_id) for msg_id in ids]
+                return 200, {'ok': True, 'result': True}
+            return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+
+    def _check_rate_limits(self, method: str, chat_id: str) -> int:
+        """
+        Must be called with the lock held.
+        :return: 0 if the call is within the limits, otherwise the retry_after in whole seconds.
+        """
+        wait: float = 0
+        if self._global_limit is not None:
+            wait = self._global_limit.take()
+        if not wait and self._chat_rate is not None and method in ('sendMessage', 'sendPhoto'):
+            limit = self._chat_limits.setdefault(chat_id, _RateLimit(self._chat_rate, self._chat_burst))
+            wait = limit.take()
+        return math.ceil(wait)
+
+    def _create_handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def _respond(self, params: Dict[str, Any]) -> None:
+                match = _PATH_PATTERN.match(urlsplit(self.path).path)
+                if match is None:
+                    status, response = 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+                else:
+                    status, response = server._handle(match.group(1), params)
+                body = json.dumps(response).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                query = parse_qs(urlsplit(self.path).query)
+                self._respond({key: values[0] for key, values in query.items()})
+
+            def do_POST(self) -> None:
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                content_type = self.headers.get('Content-Type') or ''
+                if content_type.startswith('multipart/form-data'):
+                    params = _parse_multipart(body, content_type)
+                elif content_type.startswith('application/json'):
+                    params = json.loads(body or b'{}')
+                else:
+                    params = {key: values[0] for key, values in parse_qs(body.decode('utf-8')).items()}
+                self._respond(params)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return _Handler
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def count(self, method: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(1 for call in self.calls if method is None or call['method'] == method)
+
+    def start(self) -> 'FakeTelegramServer':
+        threading.Thread(target=self._server.serve_forever, name='fake-telegram', daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, global_rate: Optional[float] = None,
+                 chat_rate: Optional[float] = None, chat_burst: float = 1):
+        """
+        Default constructor.
+        :param host: the interface to bind.
+        :param port: the port, 0 picks a free one.
+        :param global_rate: optional limit of calls per second, with a burst of one second's worth of calls.
+        :param chat_rate: optional limit of messages per second to the same chat.
+        :param chat_burst: messages that may be sent to the same chat at once.
+        """
+        self.calls: List[Dict[str, Any]] = []
+        self.deleted: List[int] = []
+        # Number of calls answered with 429
+        self.rate_limited: int = 0
+        self._global_limit: Optional[_RateLimit] = \
+            _RateLimit(global_rate, max(1.0, global_rate)) if global_rate else None
+        self._chat_rate: Optional[float] = chat_rate
+        self._chat_burst: float = chat_burst
+        self._chat_limits: Dict[str, _RateLimit] = {}
+        self._message_id: int = 0
+        self._file_ids = set()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._create_handler())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--global-rate', type=float, default=None, help='calls per second over all chats')
+    parser.add_argument('--chat-rate', type=float, default=None, help='messages per second to the same chat')
+    args = parser.parse_args()
+    server = FakeTelegramServer(args.host, args.port, global_rate=args.global_rate, chat_rate=args.chat_rate)
+    print(f'Fake telegram bot api listening on {server.url}')
+    server._server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
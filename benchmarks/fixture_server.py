@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict
+
+_fixtures_filepath: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Request path -> recorded page.
+FIXTURES: Dict[str, str] = {
+    '/goldberg': 'warbandtracker_goldberg.html'
+}
+
+
+class FixtureServer:
+    """
+    Serves the recorded pages in benchmarks/fixtures, standing in for the D&D source websites.
+    """
+
+    def _create_handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                server.requests += 1
+                page = server._pages.get(self.path.split('?')[0])
+                if page is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return _Handler
+
+    def url(self, path: str) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{path}'
+
+    def start(self) -> 'FixtureServer':
+        threading.Thread(target=self._server.serve_forever, name='fixture-server', daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        # Number of pages requested
+        self.requests: int = 0
+        self._pages: Dict[str, bytes] = {}
+        for path, filename in FIXTURES.items():
+            with open(os.path.join(_fixtures_filepath, filename), 'rb') as f:
+                self._pages[path] = f.read()
+        self._server = ThreadingHTTPServer((host, port), self._create_handler())
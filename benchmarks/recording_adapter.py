@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+import threading
+from typing import Dict, Any, List, Optional
+
+from localisation.localised_message import LocalisedMessage, default_settings
+from scheduling.clock import clock
+from social_media_connectors.AbstractSocialMediaAdapter import AbstractSocialMediaAdapter
+
+
+class RecordingAdapter(AbstractSocialMediaAdapter):
+    """
+    In-process adapter recording every notification instead of sending it, stamped with the (virtual) time
+    it was delivered. Localised messages are rendered for the default timezone and locale, as the Telegram
+    adapter does for chats without settings.
+    Registered by the replay runner as 'benchmarks.recording_adapter:recorder'.
+    """
+
+    name: str = 'Recorder'
+
+    def notify(
+            self,
+            message: str,
+            flags: Dict[str, Any],
+            delete_previous_key: Optional[str] = None
+    ) -> Optional[bool]:
+        now_ms: int = clock.now_ms()
+        if flags.get('localised'):
+            message = LocalisedMessage.from_dict(flags['localised']).render(default_settings, now_ms)
+        image = self.get_image(flags)
+        with self._lock:
+            self.notifications.append({
+                'time_ms': now_ms,
+                'event': delete_previous_key,
+                'message': message,
+                'image_bytes': 0 if image is None else len(image),
+            })
+        return True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.notifications: List[Dict[str, Any]] = []
+
+
+recorder: RecordingAdapter = RecordingAdapter()
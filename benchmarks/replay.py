@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Replays the daily and hourly schedules through a virtual time range at full speed. The application clock is set
+to every time a schedule is due, the events run against the recorded fixtures and their notifications are delivered
+to an in-process recording adapter, so days, DST changes and the flash event rotation can be checked without waiting.
+Prints every notification that would have been sent, followed by a summary with the throughput in virtual hours
+per second.
+
+Usage (from the repository root):
+    python -m benchmarks.replay [--start 2025-01-01] [--days 30] [--scheduler-mode cron] [--output replay.jsonl]
+                                [--scheduler-timezone Europe/Berlin]
+"""
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+import itertools
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Tuple, Optional
+
+from benchmarks.fixture_server import FixtureServer
+
+HOUR_MS: int = 60 * 60 * 1000
+DAY_MS: int = 24 * HOUR_MS
+# Schedules in the replay queue
+_DAILY: str = 'daily'
+_HOURLY: str = 'hourly'
+
+
+def _configure_environment(fixtures: FixtureServer, render_backend: str, scheduler_timezone: Optional[str]) -> None:
+    """
+    Point the application at the fixtures, without any real adapter. Must run before the application modules
+    are imported.
+    """
+    os.environ.update({
+        'DATA_DIR': tempfile.mkdtemp(prefix='dnd-replay-'),
+        'LOGFILE': os.path.join(tempfile.gettempdir(), 'dnd-replay.log'),
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'silent'),
+        'TELEGRAM_ENABLED': 'false',
+        'RUNE_GOLDBERG_URL': fixtures.url('/goldberg'),
+        'RUNE_GOLDBERG_RENDER_BACKEND': render_backend,
+    })
+    if scheduler_timezone:
+        os.environ['SCHEDULER_TIMEZONE'] = scheduler_timezone
+
+
+def _parse_start(value: Optional[str]) -> int:
+    """
+    :param value: an ISO date or time, UTC unless it has an offset. None is the start of the current UTC day.
+    :return: the start as epoch milliseconds.
+    """
+    if value is None:
+        return int(time.time() * 1000) // DAY_MS * DAY_MS
+    start = datetime.fromisoformat(value)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    return int(start.timestamp() * 1000)
+
+
+def _format_ms(timestamp_ms: int) -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start', default=None, help='ISO date or time (UTC), defaults to today')
+    parser.add_argument('--days', type=float, default=30)
+    parser.add_argument('--scheduler-mode', choices=['cron', 'event'], default='cron')
+    parser.add_argument('--render-backend', choices=['native', 'chromium'], default='native')
+    parser.add_argument('--scheduler-timezone', default=None,
+                        help='timezone of the cron schedules, defaults to SCHEDULER_TIMEZONE or the local timezone')
+    parser.add_argument('--output', default=None, help='write every notification to this jsonl file')
+    parser.add_argument('--quiet', action='store_true', help='only print the summary')
+    args = parser.parse_args()
+
+    fixtures = FixtureServer().start()
+    _configure_environment(fixtures, args.render_backend, args.scheduler_timezone)
+
+    import app
+    from plugins.registry import registry, HOURLY, ADAPTER
+    from scheduling.clock import clock
+    # The triggers of the cron schedules in app.py, so due times follow the same timezone and DST changes
+    from scheduling.triggers import daily_trigger, hourly_trigger, get_next_fire_ms
+    from benchmarks.recording_adapter import recorder
+    registry.register(ADAPTER, recorder.name, 'benchmarks.recording_adapter:recorder')
+
+    start_ms: int = _parse_start(args.start)
+    end_ms: int = start_ms + int(args.days * DAY_MS)
+    order = itertools.count()
+    # (due time, insertion order, schedule, event or None for all cron events)
+    queue: List[Tuple[int, int, str, Optional[str]]] = []
+    heapq.heappush(queue, (get_next_fire_ms(daily_trigger, start_ms), next(order), _DAILY, None))
+    cron_events: List[str] = registry.names(HOURLY)
+    if args.scheduler_mode == 'event':
+        cron_events = []
+        for event_name in registry.names(HOURLY):
+            fire_ms: Optional[int] = registry.get(HOURLY, event_name).get_next_fire_time(start_ms)
+            if fire_ms is None:
+                cron_events.append(event_name)
+            else:
+                heapq.heappush(queue, (fire_ms, next(order), _HOURLY, event_name))
+    if cron_events:
+        heapq.heappush(queue, (get_next_fire_ms(hourly_trigger, start_ms), next(order), _HOURLY, None))
+
+    runs: int = 0
+    failed_events: List[Dict[str, Any]] = []
+    wall_start = time.perf_counter()
+    while queue and queue[0][0] < end_ms:
+        due_ms, _, schedule, event_name = heapq.heappop(queue)
+        clock.set_virtual(due_ms)
+        if schedule == _DAILY:
+            summary = app.daily_schedule()
+            heapq.heappush(queue, (get_next_fire_ms(daily_trigger, due_ms + 1), next(order), _DAILY, None))
+        elif event_name is None:
+            summary = app.hourly_schedule(cron_events)
+            heapq.heappush(queue, (get_next_fire_ms(hourly_trigger, due_ms + 1), next(order), _HOURLY, None))
+        else:
+            summary = app.hourly_schedule([event_name])
+            fire_ms = registry.get(HOURLY, event_name).get_next_fire_time(due_ms)
+            if fire_ms is not None and fire_ms > due_ms:
+                heapq.heappush(queue, (fire_ms, next(order), _HOURLY, event_name))
+        # Deliver before the clock moves on, so every notification is stamped with the time it was due
+        app.outbox.wait_until_empty(timeout=30)
+        runs += 1
+        failed_events.extend({'time': _format_ms(due_ms), 'event': result.event, 'status': result.status,
+                              'error': result.error} for result in summary.results if result.status != 'ok')
+    wall_seconds: float = time.perf_counter() - wall_start
+    clock.set_virtual(None)
+    fixtures.stop()
+
+    notifications: List[Dict[str, Any]] = sorted(recorder.notifications, key=lambda n: n['time_ms'])
+    if not args.quiet:
+        for notification in notifications:
+            print(f'{_format_ms(notification["time_ms"])}  {notification["event"]}: '
+                  f'{notification["message"].strip().splitlines()[0]}')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps({**notification, 'time': _format_ms(notification['time_ms'])}) + '\n'
+                         for notification in notifications)
+
+    per_event: Dict[str, int] = {}
+    for notification in notifications:
+        per_event[notification['event']] = per_event.get(notification['event'], 0) + 1
+    virtual_hours: float = (end_ms - start_ms) / HOUR_MS
+    print(json.dumps({
+        'start': _format_ms(start_ms),
+        'end': _format_ms(end_ms),
+        'scheduler_mode': args.scheduler_mode,
+        'scheduler_timezone': str(daily_trigger.timezone),
+        'virtual_hours': round(virtual_hours, 2),
+        'wall_seconds': round(wall_seconds, 3),
+        'virtual_hours_per_second': round(virtual_hours / wall_seconds, 1) if wall_seconds else None,
+        'schedule_runs': runs,
+        'notifications': len(notifications),
+        'notifications_per_event': per_event,
+        'failed_events': failed_events,
+        'fixture_requests': fixtures.requests,
+    }, indent=2))
+    sys.exit(1 if failed_events else 0)
+
+
+if __name__ == '__main__':
+    main()
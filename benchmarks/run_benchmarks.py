@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite. Runs the D&D events and the full schedules against the recorded fixtures
+and a local Telegram stand-in, and writes the timings to json so runs can be compared between commits.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks [--iterations 20] [--output results.json] [--compare baseline.json]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, Any, Callable, List, Optional
+
+from benchmarks.fake_telegram_api import FakeTelegramServer
+from benchmarks.fixture_server import FixtureServer
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _configure_environment(fixtures: FixtureServer, telegram: FakeTelegramServer, render_backend: str) -> None:
+    """
+    Point the application at the local servers. Must run before the application modules are imported.
+    """
+    os.environ.update({
+        'DATA_DIR': tempfile.mkdtemp(prefix='dnd-bench-'),
+        'LOGFILE': os.path.join(tempfile.gettempdir(), 'dnd-bench.log'),
+        'LOG_LEVEL': os.environ.get('LOG_LEVEL', 'silent'),
+        'TELEGRAM_ENABLED': 'true',
+        'TELEGRAM_API_KEY': 'benchmark',
+        'TELEGRAM_CHAT_ID': '1',
+        'TELEGRAM_API_URL': telegram.url,
+        # Every run notifies the same chat, pacing would dominate the timings
+        'TELEGRAM_GLOBAL_RATE_PER_SECOND': '100000',
+        'TELEGRAM_CHAT_RATE_PER_MINUTE': '6000000',
+        'RUNE_GOLDBERG_URL': fixtures.url('/goldberg'),
+        'RUNE_GOLDBERG_RENDER_BACKEND': render_backend,
+    })
+
+
+def measure(fn: Callable[[], Any], iterations: int, setup: Optional[Callable[[], Any]] = None) -> Dict[str, float]:
+    """
+    Time a function.
+    :param fn: the function.
+    :param iterations: number of runs. The first run is reported separately as it fills the caches.
+    :param setup: optionally run before every run, not included in the timings.
+    :return: the timings in milliseconds.
+    """
+    timings: List[float] = []
+    for _ in range(iterations):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    warm = sorted(timings[1:] or timings)
+    return {
+        'iterations': iterations,
+        'first_ms': round(timings[0], 3),
+        'mean_ms': round(sum(warm) / len(warm), 3),
+        'p50_ms': round(warm[len(warm) // 2], 3),
+        'p95_ms': round(warm[min(len(warm) - 1, int(len(warm) * 0.95))], 3),
+        'max_ms': round(warm[-1], 3),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """
+    Print the change of the mean timings relative to a previous run.
+    """
+    print(f'Compared to {baseline.get("commit")}:', file=sys.stderr)
+    for name, timing in results['benchmarks'].items():
+        previous = baseline.get('benchmarks', {}).get(name)
+        if not previous or not previous.get('mean_ms'):
+            continue
+        ratio = timing['mean_ms'] / previous['mean_ms']
+        print(f'  {name}: {previous["mean_ms"]:.3f} ms -> {timing["mean_ms"]:.3f} ms ({ratio:.2f}x)', file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--render-backend', choices=['native', 'chromium'], default='native')
+    parser.add_argument('--output', default=None, help='write the results to this json file')
+    parser.add_argument('--compare', default=None, help='a previous results file to compare against')
+    args = parser.parse_args()
+
+    fixtures = FixtureServer().start()
+    telegram = FakeTelegramServer().start()
+    _configure_environment(fixtures, telegram, args.render_backend)
+
+    import app
+    from daily_dnds.rune_goldberg.rune_goldberg import RuneGoldberg
+    from hourly_dnds.wilderness_flash_events.wilderness_flash_events import WildernessFlashEvents
+
+    goldberg, flash_events = RuneGoldberg(), WildernessFlashEvents()
+
+    def reset_deliveries() -> None:
+        # Without this, every schedule run after the first skips the already delivered notifications
+        app.outbox.wait_until_empty(timeout=30)
+        app.state_store.clear_deliveries()
+
+    benchmarks = {
+        # The combination is stored per game day, so daily_exec only fetches the page once
+        'rune_goldberg.fetch': measure(goldberg._get_base, args.iterations),
+        'rune_goldberg.daily_exec': measure(goldberg.daily_exec, args.iterations),
+        'wilderness_flash_events.hourly_exec': measure(flash_events.hourly_exec, args.iterations),
+        'app.daily_schedule': measure(app.daily_schedule, args.iterations, setup=reset_deliveries),
+        'app.hourly_schedule': measure(app.hourly_schedule, args.iterations, setup=reset_deliveries),
+    }
+    # Notifications are delivered in the background, wait for them before counting the api calls
+    app.outbox.wait_until_empty(timeout=30)
+    results = {
+        'commit': _git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'render_backend': args.render_backend,
+        'benchmarks': benchmarks,
+        'telegram_calls': {method: telegram.count(method)
+                           for method in ('sendMessage', 'sendPhoto', 'deleteMessage', 'deleteMessages')},
+        'telegram_upload_bytes': sum(call['upload_bytes'] for call in telegram.calls),
+        'fixture_requests': fixtures.requests,
+    }
+    fixtures.stop()
+    telegram.stop()
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
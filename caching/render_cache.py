@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Tuple
+
+import config
+from logging_framework.log_handler import log, Module
+
+
+class RenderCache:
+    """
+    Content addressed on-disk cache for rendered images.
+    Entries are keyed by the sha256 of their source and evicted by age and total size. The age counts from
+    when an entry was written (its mtime), the size limit evicts the least recently used entries (their atime).
+    The most recently used entries are also kept in memory, so repeated lookups do not touch the disk.
+    """
+
+    def _get_path(self, source: str) -> str:
+        """
+        Get the cache file path for the given source.
+        :param source: the content the image was rendered from.
+        :return: the cache file path.
+        """
+        digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+        return os.path.join(self._directory, f'{digest}.png')
+
+    def _remember(self, path: str, data: bytes, created_at: float) -> None:
+        """
+        Keep an entry in memory, dropping the least recently used one if full. Must be called with the lock held.
+        """
+        self._memory[path] = (data, created_at, time.time())
+        self._memory.move_to_end(path)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self._max_age_seconds > 0 and time.time() - created_at > self._max_age_seconds
+
+    def _evict(self) -> None:
+        """
+        Remove expired entries, then the least recently used ones until the cache fits its size limit.
+        :return:
+        """
+        entries: List[Tuple[float, int, str]] = []
+        for name in os.listdir(self._directory):
+            path = os.path.join(self._directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if self._is_expired(stat.st_mtime):
+                os.remove(path)
+                self._memory.pop(path, None)
+                continue
+            remembered = self._memory.get(path)
+            # Hits served from memory do not touch the file, their last use is only known in memory
+            last_used: float = stat.st_atime if remembered is None else max(stat.st_atime, remembered[2])
+            entries.append((last_used, stat.st_size, path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self._max_bytes:
+                break
+            os.remove(path)
+            self._memory.pop(path, None)
+            total_size -= size
+
+    def get(self, source: str) -> Optional[bytes]:
+        """
+        Look up a previously rendered image.
+        :param source: the content the image was rendered from.
+        :return: the image bytes, or None on a miss.
+        """
+        path = self._get_path(source)
+        with self._lock:
+            data: Optional[bytes] = None
+            remembered: Optional[Tuple[bytes, float, float]] = self._memory.get(path)
+            if remembered is not None and not self._is_expired(remembered[1]):
+                data = remembered[0]
+                self._memory[path] = (data, remembered[1], time.time())
+                self._memory.move_to_end(path)
+            else:
+                self._memory.pop(path, None)
+                try:
+                    mtime = os.path.getmtime(path)
+                    if not self._is_expired(mtime):
+                        with open(path, 'rb') as f:
+                            data = f.read()
+                        # Refresh the last use for the least recently used eviction, keeping the creation time
+                        os.utime(path, (time.time(), mtime))
+                        self._remember(path, data, mtime)
+                except OSError:
+                    data = None
+            if data is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            log.debug(f'{self._name} {"hit" if data is not None else "miss"}. '
+                      f'Hits: {self._hits}, misses: {self._misses}.', module=Module.CACHE)
+            return data
+
+    def put(self, source: str, data: bytes) -> None:
+        """
+        Store a rendered image.
+        :param source: the content the image was rendered from.
+        :param data: the image bytes.
+        :return:
+        """
+        path = self._get_path(source)
+        with self._lock:
+            try:
+                tmp_path = f'{path}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                self._remember(path, data, time.time())
+                self._evict()
+            except OSError as e:
+                log.error('Error writing render cache entry. Trace:', e, module=Module.CACHE)
+
+    def __init__(self, directory: str, max_bytes: int, max_age_seconds: int, memory_entries: int = 4,
+                 name: str = 'Render cache'):
+        """
+        Default constructor.
+        :param directory: the cache directory, created if missing.
+        :param max_bytes: the maximum total size of all entries.
+        :param max_age_seconds: entries older than this are discarded. 0 disables the age limit.
+        :param memory_entries: number of entries also kept in memory.
+        :param name: used in the logs.
+        """
+        self._name: str = name
+        self._memory_entries: int = memory_entries
+        self._memory: OrderedDict = OrderedDict()
+        self._directory: str = directory
+        self._max_bytes: int = max_bytes
+        self._max_age_seconds: int = max_age_seconds
+        self._hits: int = 0
+        self._misses: int = 0
+        self._lock = threading.Lock()
+        os.makedirs(self._directory, exist_ok=True)
+
+
+render_cache: RenderCache = RenderCache(
+    directory=os.path.join(config.data_dir, 'render_cache'),
+    max_bytes=config.render_cache_max_mb * 1024 * 1024,
+    max_age_seconds=config.render_cache_max_age_hours * 3600
+)
@@ -1,30 +1,111 @@
 #!/usr/bin/env python3
 import os
-from typing import Optional
+from typing import Optional, List, Dict, Tuple
 from logging_framework.log_handler import log, Module
 
 import dotenv
 
 dotenv.load_dotenv()
 
+# Persistent application data such as caches
+data_dir: str = os.getenv('DATA_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+# Shared http client
+http_connect_timeout_seconds: float = float(os.getenv('HTTP_CONNECT_TIMEOUT_SECONDS', '5'))
+http_read_timeout_seconds: float = float(os.getenv('HTTP_READ_TIMEOUT_SECONDS', '30'))
+http_max_retries: int = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+
+# Prometheus metrics endpoint
+metrics_enabled: bool = os.getenv('METRICS_ENABLED', 'false').lower() == 'true'
+metrics_host: str = os.getenv('METRICS_HOST', '127.0.0.1')
+metrics_port: int = int(os.getenv('METRICS_PORT', '9100'))
+
 # See https://googlechromelabs.github.io/chrome-for-testing
 chromium_executable_path: str = os.getenv('CHROMIUM_EXECUTABLE_PATH', './chrome-win32/chrome.exe')
+# Optional, selenium resolves the driver on its own if not set
+chromedriver_executable_path: Optional[str] = os.getenv('CHROMEDRIVER_EXECUTABLE_PATH') or None
+# The warm render service restarts chromium after this many renders or once it exceeds the rss limit
+chromium_max_renders: int = int(os.getenv('CHROMIUM_MAX_RENDERS', '50'))
+chromium_max_rss_mb: int = int(os.getenv('CHROMIUM_MAX_RSS_MB', '512'))
+# Rendered images are cached on disk, keyed by the html they were rendered from
+render_cache_max_mb: int = int(os.getenv('RENDER_CACHE_MAX_MB', '16'))
+render_cache_max_age_hours: int = int(os.getenv('RENDER_CACHE_MAX_AGE_HOURS', '72'))
+# Images are re-encoded once to the smallest format and size each platform accepts
+image_optimisation_enabled: bool = os.getenv('IMAGE_OPTIMISATION_ENABLED', 'true').lower() == 'true'
+# Rune images and event maps, built from the source folders with python -m assets.asset_pack
+asset_pack_filepath: str = os.getenv('ASSET_PACK_FILEPATH') or \
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'assets.pack')
 # Html2Image requires a temp path in linux with rw permissions, so use /tmp
 linux_tmp_path_hti: bool = True
 
 if os.name == "nt":
     linux_tmp_path_hti = False
 
+# Timezone and locale of notifications about points in time, unless set per recipient
+default_timezone: str = os.getenv('DEFAULT_TIMEZONE', 'Europe/Berlin')
+default_locale: str = os.getenv('DEFAULT_LOCALE', 'en')
+
+# Can be pointed at a local bot api server, for instance the stand-in used by the benchmarks
+telegram_api_url: str = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org').rstrip('/')
 telegram_api_key: Optional[str] = None
-telegram_chat_id: Optional[str] = None
+# Comma separated, every chat receives every notification
+telegram_chat_ids: List[str] = []
 telegram_enabled = os.getenv('TELEGRAM_ENABLED', 'false').lower() == 'true'
 if telegram_enabled:
     telegram_api_key = os.getenv('TELEGRAM_API_KEY')
-    telegram_chat_id = os.getenv('TELEGRAM_CHAT_ID')
-    if not len(telegram_api_key) or not len(telegram_chat_id):
+    telegram_chat_ids = [chat_id.strip() for chat_id in os.getenv('TELEGRAM_CHAT_ID', '').split(',') if chat_id.strip()]
+    if not len(telegram_api_key) or not len(telegram_chat_ids):
         log.error('Telegram API Key and Chat ID are required if telegram is enabled. Disabling telegram api.')
         telegram_enabled = False
 
+# Optional timezone and locale per chat, comma separated chat_id:timezone[:locale], for instance
+# '-100123:America/New_York:en_US,-100456:Asia/Tokyo'. Other chats use the defaults
+telegram_chat_settings: Dict[str, Tuple[str, str]] = {}
+for _entry in os.getenv('TELEGRAM_CHAT_SETTINGS', '').split(','):
+    _parts = [part.strip() for part in _entry.split(':')]
+    if len(_parts) >= 2 and _parts[0]:
+        telegram_chat_settings[_parts[0]] = (_parts[1], _parts[2] if len(_parts) > 2 else default_locale)
+
+# Telegram allows about 30 messages per second overall and 20 messages per minute to the same group
+telegram_global_rate_per_second: float = float(os.getenv('TELEGRAM_GLOBAL_RATE_PER_SECOND', '30'))
+telegram_chat_rate_per_minute: float = float(os.getenv('TELEGRAM_CHAT_RATE_PER_MINUTE', '20'))
+telegram_chat_burst: int = int(os.getenv('TELEGRAM_CHAT_BURST', '3'))
+
+# 'cron' runs hourly events at minute 30 of every hour, 'event' runs them exactly when they are due
+scheduler_mode: str = os.getenv('SCHEDULER_MODE', 'cron').lower()
+# Timezone of the daily and hourly cron schedules, the local timezone (TZ) if not set
+scheduler_timezone: Optional[str] = os.getenv('SCHEDULER_TIMEZONE') or None
+# Events run concurrently, each bounded by a deadline covering its fetch, render and queueing its notification
+event_workers: int = int(os.getenv('EVENT_WORKERS', '4'))
+event_deadline_seconds: float = float(os.getenv('EVENT_DEADLINE_SECONDS', '120'))
+# 'skip' does not start an event while its previous run is still in progress, 'allow' runs it regardless
+event_overlap_policy: str = os.getenv('EVENT_OVERLAP_POLICY', 'skip').lower()
+# Runs missed by at most this many seconds, for instance while the host was suspended, are still executed.
+# Several missed runs of the same job are coalesced into one
+event_misfire_grace_seconds: int = int(os.getenv('EVENT_MISFIRE_GRACE_SECONDS', '300'))
+
+# Comma separated names of D&D events that are never loaded, for instance 'Rune Goldberg'
+disabled_events: List[str] = [name.strip() for name in os.getenv('DISABLED_EVENTS', '').split(',') if name.strip()]
+
+# Opt-in profiling of every event execution, can also be toggled at runtime with SIGUSR1.
+# Modes are comma separated, any of cprofile, tracemalloc and sampling
+profiling_enabled: bool = os.getenv('PROFILING_ENABLED', 'false').lower() == 'true'
+profiling_modes: List[str] = [mode.strip().lower() for mode in
+                              os.getenv('PROFILING_MODES', 'cprofile,tracemalloc,sampling').split(',') if mode.strip()]
+profiling_directory: str = os.getenv('PROFILING_DIR') or os.path.join(data_dir, 'profiles')
+profiling_sample_interval_ms: float = float(os.getenv('PROFILING_SAMPLE_INTERVAL_MS', '5'))
+
+# Notifications are stored in an outbox and delivered in the background. Failed deliveries are retried after
+# the base delay, doubled for every further attempt up to the maximum, and dropped once they are too old
+outbox_retry_base_seconds: float = float(os.getenv('OUTBOX_RETRY_BASE_SECONDS', '5'))
+outbox_retry_max_seconds: float = float(os.getenv('OUTBOX_RETRY_MAX_SECONDS', '900'))
+outbox_max_age_hours: float = float(os.getenv('OUTBOX_MAX_AGE_HOURS', '24'))
+
 # Event Specific
 wilderness_flash_events_favourites_only: bool = os.getenv('FLASH_EVENTS_FAVOURITES_ONLY', 'false').lower() == 'true'
 wilderness_flash_events_images_enabled: bool = os.getenv('FLASH_EVENTS_IMAGES_ENABLED', 'true').lower() == 'true'
+# Minutes before a flash event the notification is sent in the 'event' scheduler mode
+wilderness_flash_events_lead_minutes: int = int(os.getenv('FLASH_EVENTS_LEAD_MINUTES', '30'))
+rune_goldberg_url: str = os.getenv('RUNE_GOLDBERG_URL', 'https://warbandtracker.com/goldberg')
+# 'chromium' renders the html template in a browser, 'native' draws the table with Pillow and needs no browser
+rune_goldberg_render_backend: str = os.getenv('RUNE_GOLDBERG_RENDER_BACKEND', 'chromium').lower()
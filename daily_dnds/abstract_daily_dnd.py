@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 from abc import ABC
-from typing import Dict, Any, Tuple
+from datetime import datetime, timezone
+from typing import Dict, Any, Tuple, Optional
 
 
 class AbstractDailyDND(ABC):
@@ -8,10 +9,23 @@ class AbstractDailyDND(ABC):
     Abstract daily DND class.
     """
 
+    # Maximum run time until the notification is enqueued, None uses the EVENT_DEADLINE_SECONDS default.
+    deadline_seconds: Optional[float] = None
+
     def daily_exec(self) -> Tuple[str, Dict[str, Any]]:
         """
         Default public facing method.
-        :return: a string response for telegram/discord along with flags containing attachment files.
-        Example of the dict: {"image": true, "filepath": "/tmp/generated.png"}
+        :return: a string response for telegram/discord along with flags containing attachments.
+        Example of the dict: {"image": true, "image_data": b"<png bytes>"}
+        Images may also be given as file, {"image": true, "filepath": "/tmp/generated.png"}
         """
         pass
+
+    def get_period_key(self, now_ms: int) -> str:
+        """
+        Identifies the period a notification belongs to, so notifications already delivered before a restart
+        are not sent again.
+        :param now_ms: the current time as epoch milliseconds.
+        :return: by default the game day (UTC date), as the daily D&Ds reset at 00:00 UTC.
+        """
+        return datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+import io
+import os
+from html.parser import HTMLParser
+from typing import List, Dict, Optional, Tuple, Any
+
+from PIL import Image, ImageDraw, ImageFont
+
+from assets.asset_pack import asset_pack
+
+# Colours and sizes taken from template.html (table.worldTable).
+_TABLE_WIDTH: int = 500
+_BACKGROUND: str = '#EEEEEE'
+_TITLE_BACKGROUND: str = '#CCCCFF'
+_BORDER: str = '#000000'
+_TEXT: str = '#333333'
+_FONT_SIZE: int = 13
+_TITLE_FONT_SIZE: int = 15
+_MIN_CELL_HEIGHT: int = 25
+# Browser defaults for <table border="1">.
+_CELL_SPACING: int = 2
+_CELL_PADDING: int = 1
+_LINE_SPACING: float = 1.25
+
+_REGULAR_FONTS: List[str] = ['verdana.ttf', 'Verdana.ttf', 'LiberationSans-Regular.ttf', 'DejaVuSans.ttf']
+_BOLD_FONTS: List[str] = ['verdanab.ttf', 'Verdana_Bold.ttf', 'LiberationSans-Bold.ttf', 'DejaVuSans-Bold.ttf']
+
+_font_cache: Dict[Tuple[bool, int], Any] = {}
+_rune_cache: Dict[str, Image.Image] = {}
+
+
+class _Cell:
+    """
+    A single table cell. Lines are tuples of (kind, value, bold) where kind is either text or image.
+    """
+
+    def __init__(self, attrs: Dict[str, Optional[str]]):
+        self.title: bool = attrs.get('class') == 'title'
+        self.colspan: int = int(attrs.get('colspan') or 1)
+        self.width: Optional[str] = attrs.get('width')
+        self.lines: List[Tuple[str, str, bool]] = []
+
+
+class _TableParser(HTMLParser):
+    """
+    Parses the rune combination table into rows of cells.
+    """
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag == 'tr':
+            self.rows.append([])
+        elif tag == 'td' and self.rows:
+            self._cell = _Cell(dict(attrs))
+            self.rows[-1].append(self._cell)
+        elif tag == 'b':
+            self._bold = True
+        elif tag == 'br':
+            self._new_line = True
+        elif tag == 'img' and self._cell is not None:
+            self._cell.lines.append(('image', dict(attrs).get('src') or '', False))
+            self._new_line = True
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == 'td':
+            self._cell = None
+        elif tag == 'b':
+            self._bold = False
+
+    def handle_data(self, data: str) -> None:
+        text = ' '.join(data.split())
+        if self._cell is None or not text:
+            return
+        lines = self._cell.lines
+        if not self._new_line and lines and lines[-1][0] == 'text':
+            _, previous, bold = lines[-1]
+            lines[-1] = ('text', f'{previous} {text}', bold or self._bold)
+        else:
+            lines.append(('text', text, self._bold or self._cell.title))
+        self._new_line = False
+
+    def __init__(self):
+        super().__init__()
+        self.rows: List[List[_Cell]] = []
+        self._cell: Optional[_Cell] = None
+        self._bold: bool = False
+        self._new_line: bool = True
+
+
+def _get_font(bold: bool, size: int) -> Any:
+    """
+    Load a font close to the template's Verdana, falling back to the Pillow default font.
+    :param bold: whether to load the bold variant.
+    :param size: font size in pixels.
+    :return: the font.
+    """
+    key = (bold, size)
+    if key not in _font_cache:
+        font = None
+        for name in _BOLD_FONTS if bold else _REGULAR_FONTS:
+            try:
+                font = ImageFont.truetype(name, size)
+                break
+            except OSError:
+                continue
+        _font_cache[key] = font or ImageFont.load_default(size=size)
+    return _font_cache[key]
+
+
+def _get_rune(src: str) -> Image.Image:
+    """
+    Load a rune gif from the asset pack.
+    :param src: the image source from the table, for instance runes/1.gif.
+    :return: the rune as RGBA image.
+    """
+    name = os.path.basename(src)
+    if name not in _rune_cache:
+        data = asset_pack.get(f'runes/{name}')
+        if data is None:
+            raise FileNotFoundError(f'Unknown rune {src}')
+        with Image.open(io.BytesIO(data)) as img:
+            _rune_cache[name] = img.convert('RGBA')
+    return _rune_cache[name]
+
+
+def _line_height(line: Tuple[str, str, bool], font_size: int) -> int:
+    kind, value, _ = line
+    if kind == 'image':
+        return _get_rune(value).height
+    return int(font_size * _LINE_SPACING)
+
+
+def _column_widths(row: List[_Cell], inner_width: int) -> List[int]:
+    """
+    Distribute the table width over the row's cells, honouring percentage widths.
+    :param row: the cells of the row.
+    :param inner_width: the width available to the cells.
+    :return: the cell widths in pixels.
+    """
+    available = inner_width - _CELL_SPACING * (len(row) + 1)
+    total_span = sum(cell.colspan for cell in row)
+    widths = []
+    for cell in row:
+        if cell.width and cell.width.endswith('%'):
+            widths.append(available * int(cell.width[:-1]) // 100)
+        else:
+            widths.append(available * cell.colspan // total_span)
+    widths[-1] += available - sum(widths)
+    return widths
+
+
+def render_table(table_html: str) -> bytes:
+    """
+    Render the correct rune combinations table without a browser.
+    :param table_html: the table fragment from the rune goldberg tracker website.
+    :return: the rendered table as png bytes.
+    """
+    parser = _TableParser()
+    parser.feed(table_html)
+    rows = [row for row in parser.rows if row]
+    if not rows:
+        raise Exception('No table rows found in rune combinations table.')
+
+    row_heights = []
+    for row in rows:
+        height = _MIN_CELL_HEIGHT
+        for cell in row:
+            font_size = _TITLE_FONT_SIZE if cell.title else _FONT_SIZE
+            content = sum(_line_height(line, font_size) for line in cell.lines) + 2 * _CELL_PADDING + 2
+            height = max(height, content)
+        row_heights.append(height)
+
+    image_height = sum(row_heights) + _CELL_SPACING * (len(rows) + 1) + 2
+    image = Image.new('RGBA', (_TABLE_WIDTH, image_height), _BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, _TABLE_WIDTH - 1, image_height - 1), outline=_BORDER)
+
+    y = 1 + _CELL_SPACING
+    for row, row_height in zip(rows, row_heights):
+        x = 1 + _CELL_SPACING
+        for cell, width in zip(row, _column_widths(row, _TABLE_WIDTH - 2)):
+            draw.rectangle((x, y, x + width - 1, y + row_height - 1),
+                           fill=_TITLE_BACKGROUND if cell.title else None, outline=_BORDER)
+            font_size = _TITLE_FONT_SIZE if cell.title else _FONT_SIZE
+            content_height = sum(_line_height(line, font_size) for line in cell.lines)
+            line_y = y + (row_height - content_height) // 2
+            for line in cell.lines:
+                kind, value, bold = line
+                line_height = _line_height(line, font_size)
+                if kind == 'image':
+                    rune = _get_rune(value)
+                    image.paste(rune, (x + (width - rune.width) // 2, line_y), rune)
+                else:
+                    font = _get_font(bold, font_size)
+                    text_width = draw.textlength(value, font=font)
+                    draw.text((x + (width - text_width) / 2, line_y + line_height / 2), value,
+                              fill=_TEXT, font=font, anchor='lm')
+                line_y += line_height
+            x += width + _CELL_SPACING
+        y += row_height + _CELL_SPACING
+
+    output = io.BytesIO()
+    image.convert('RGB').save(output, format='PNG')
+    return output.getvalue()
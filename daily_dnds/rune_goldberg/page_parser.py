@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+import re
+import time
+from typing import List, Optional, Iterable
+
+_TABLE_START: str = '<h2>Correct Rune Combinations</h2>'
+_TABLE_END: str = '</div>'
+_TITLE_PATTERN = re.compile(r"title='([^']*)'")
+
+
+class GoldbergPageParser:
+    """
+    Incremental parser for the warbandtracker rune goldberg page.
+    Extracts the correct rune combinations table and its rune titles in a single pass over the page,
+    and reports completion as soon as the table has closed so the rest of the page need not be read.
+    """
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Feed the next chunk of the page.
+        :param chunk: the decoded chunk.
+        :return: true once the table has been parsed completely.
+        """
+        if self.done:
+            return True
+        self.chars_read += len(chunk)
+        self._buffer += chunk
+        marker = _TABLE_END if self._in_table else _TABLE_START
+        # Only look at new data, plus enough of the previous chunk for a marker split across chunks.
+        index = self._buffer.find(marker, max(0, self._scanned - len(marker) + 1))
+        if index < 0 and not self._in_table:
+            self._buffer = self._buffer[-(len(marker) - 1):]
+            self._scanned = len(self._buffer)
+            return False
+        if not self._in_table:
+            self._in_table = True
+            self._buffer = self._buffer[index + len(marker):]
+            self._scanned = 0
+            index = self._buffer.find(_TABLE_END)
+        if index < 0:
+            self._scanned = len(self._buffer)
+            return False
+        self.table = self._buffer[:index]
+        self.runes = [title for title in _TITLE_PATTERN.findall(self.table) if 'Rune' in title][:4]
+        self._buffer = ''
+        self.done = True
+        return True
+
+    def feed_all(self, chunks: Iterable[str]) -> 'GoldbergPageParser':
+        """
+        Feed chunks until the table is complete.
+        :param chunks: the decoded page chunks.
+        :return: the parser.
+        """
+        for chunk in chunks:
+            start = time.perf_counter()
+            done = self.feed(chunk)
+            self.parse_seconds += time.perf_counter() - start
+            if done:
+                break
+        if not self.done:
+            raise Exception('Correct rune combinations table not found in page.')
+        return self
+
+    def __init__(self):
+        self.table: Optional[str] = None
+        self.runes: List[str] = []
+        self.done: bool = False
+        self.chars_read: int = 0
+        # Time spent parsing, excluding the time waiting for the chunks
+        self.parse_seconds: float = 0.0
+        self._buffer: str = ''
+        self._scanned: int = 0
+        self._in_table: bool = False
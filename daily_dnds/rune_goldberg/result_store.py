@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Stores the Rune Goldberg combination of every game day.
+
+Query the history with (from the repository root):
+    python -m daily_dnds.rune_goldberg.result_store [--start 2025-01-01] [--end 2025-12-31] [--rune "Blood Rune"]
+"""
+import os
+import json
+import time
+import sqlite3
+import argparse
+import threading
+from typing import List, Optional, Dict
+
+import config
+from logging_framework.log_handler import log, Module
+
+_SCHEMA: str = '''
+CREATE TABLE IF NOT EXISTS goldberg_results (
+    game_day TEXT PRIMARY KEY,
+    runes TEXT NOT NULL,
+    table_html TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS goldberg_runes (
+    rune TEXT NOT NULL,
+    game_day TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (rune, game_day, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS goldberg_runes_by_day ON goldberg_runes (game_day, rune, position);
+'''
+
+# Game days are ISO dates, so they compare correctly as text
+_FIRST_DAY: str = '0000-00-00'
+_LAST_DAY: str = '9999-99-99'
+
+
+class GoldbergResult:
+    """
+    The rune combination of one game day.
+    """
+
+    @property
+    def first_rune(self) -> str:
+        return self.runes[0]
+
+    @property
+    def second_runes(self) -> List[str]:
+        return self.runes[1:]
+
+    def __init__(self, game_day: str, runes: List[str], table: str):
+        """
+        Default constructor.
+        :param game_day: the UTC date, for instance 2025-08-07.
+        :param runes: the first rune followed by the second runes.
+        :param table: the combination table from the tracker website, which the rendered image is cached by.
+        """
+        self.game_day: str = game_day
+        self.runes: List[str] = runes
+        self.table: str = table
+
+
+class GoldbergResultStore:
+    """
+    Embedded SQLite store of the Rune Goldberg combinations by game day. Each rune is indexed by rune and by day,
+    so history queries are answered from the indexes instead of reading every stored day.
+    """
+
+    def get(self, game_day: str) -> Optional[GoldbergResult]:
+        """
+        :param game_day: the UTC date.
+        :return: the stored combination, None if the day was not fetched yet.
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT runes, table_html FROM goldberg_results WHERE game_day = ?',
+                                           (game_day,)).fetchone()
+        return None if row is None else GoldbergResult(game_day, json.loads(row[0]), row[1])
+
+    def put(self, result: GoldbergResult) -> None:
+        """
+        Store the combination of a game day, replacing a previous one.
+        :param result: the combination.
+        :return:
+        """
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM goldberg_runes WHERE game_day = ?', (result.game_day,))
+            self._connection.execute('INSERT OR REPLACE INTO goldberg_results VALUES (?, ?, ?, ?)',
+                                     (result.game_day, json.dumps(result.runes), result.table, time.time()))
+            self._connection.executemany('INSERT OR IGNORE INTO goldberg_runes VALUES (?, ?, ?)',
+                                         [(rune, result.game_day, position)
+                                          for position, rune in enumerate(result.runes)])
+        log.debug(f'Stored rune combination of {result.game_day}: {", ".join(result.runes)}', module=Module.RUNE_GOLD)
+
+    def get_latest_before(self, game_day: str) -> Optional[GoldbergResult]:
+        """
+        :param game_day: the UTC date.
+        :return: the most recent stored combination before the given day, if any.
+        """
+        with self._lock:
+            row = self._connection.execute('SELECT game_day FROM goldberg_results WHERE game_day < ? '
+                                           'ORDER BY game_day DESC LIMIT 1', (game_day,)).fetchone()
+        return None if row is None else self.get(row[0])
+
+    def history(self, start_day: Optional[str] = None, end_day: Optional[str] = None,
+                rune: Optional[str] = None) -> List[GoldbergResult]:
+        """
+        Get the stored combinations of a date range.
+        :param start_day: the first UTC date, inclusive. None for no limit.
+        :param end_day: the last UTC date, inclusive. None for no limit.
+        :param rune: optionally only return days this rune was part of.
+        :return: the combinations, oldest first.
+        """
+        params = [start_day or _FIRST_DAY, end_day or _LAST_DAY]
+        if rune is None:
+            query = 'SELECT game_day, runes, table_html FROM goldberg_results WHERE game_day BETWEEN ? AND ?'
+        else:
+            query = ('SELECT game_day, runes, table_html FROM goldberg_results WHERE game_day IN '
+                     '(SELECT game_day FROM goldberg_runes WHERE rune = ? AND game_day BETWEEN ? AND ?)')
+            params.insert(0, rune)
+        with self._lock:
+            rows = self._connection.execute(query + ' ORDER BY game_day', params).fetchall()
+        return [GoldbergResult(game_day, json.loads(runes), table) for game_day, runes, table in rows]
+
+    def rune_counts(self, start_day: Optional[str] = None, end_day: Optional[str] = None,
+                    position: Optional[str] = None) -> Dict[str, int]:
+        """
+        Count how often each rune appeared.
+        :param start_day: the first UTC date, inclusive. None for no limit.
+        :param end_day: the last UTC date, inclusive. None for no limit.
+        :param position: 'first' or 'second' to only count runes in that position, None for both.
+        :return: rune -> number of days, most frequent first.
+        """
+        query = 'SELECT rune, COUNT(DISTINCT game_day) AS days FROM goldberg_runes WHERE game_day BETWEEN ? AND ?'
+        if position == 'first':
+            query += ' AND position = 0'
+        elif position == 'second':
+            query += ' AND position > 0'
+        with self._lock:
+            rows = self._connection.execute(query + ' GROUP BY rune ORDER BY days DESC, rune',
+                                            (start_day or _FIRST_DAY, end_day or _LAST_DAY)).fetchall()
+        return dict(rows)
+
+    def __init__(self, filepath: str):
+        """
+        Default constructor.
+        :param filepath: the database file, created if missing.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(filepath, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(_SCHEMA)
+
+
+result_store: GoldbergResultStore = GoldbergResultStore(os.path.join(config.data_dir, 'rune_goldberg.db'))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start', help='first game day, inclusive')
+    parser.add_argument('--end', help='last game day, inclusive')
+    parser.add_argument('--rune', help='only show days with this rune')
+    args = parser.parse_args()
+    for result in result_store.history(args.start, args.end, args.rune):
+        print(f'{result.game_day}  {result.first_rune:<14} {", ".join(result.second_runes)}')
+    print(json.dumps(result_store.rune_counts(args.start, args.end), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,33 @@
 #!/usr/bin/env python3
+import io
 import os
-import base64
+import re
+import time
 import uuid
 
-import requests
+from contextlib import closing
 from PIL import Image
-from typing import List, Tuple, Any, Dict
-from html2image import Html2Image
+from typing import List, Tuple, Any, Dict, Optional
 
 import config
 from logging_framework.log_handler import log, Module
+from metrics.metrics import metrics, STAGE_DURATION
+from networking.http_client import http_client
+from caching.render_cache import render_cache
+from assets.asset_pack import asset_pack
 from daily_dnds.abstract_daily_dnd import AbstractDailyDND
+from daily_dnds.rune_goldberg import native_renderer
+from daily_dnds.rune_goldberg.page_parser import GoldbergPageParser
+from daily_dnds.rune_goldberg.result_store import GoldbergResult, result_store
+from scheduling.clock import clock
+from scheduling.triggers import daily_trigger, get_next_fire_ms
 
-_generated_filepath: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generated.png')
-_runes_filepath: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runes')
 _html_filepath: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'template.html')
+_html_template: Optional[str] = None
+_RUNE_SRC_PATTERN = re.compile(r'runes/\d+\.gif')
+# Shortly after the daily reset the tracker may still show the previous day's combination
+_STALE_WINDOW_MS: int = 2 * 60 * 60 * 1000
+_DAY_MS: int = 24 * 60 * 60 * 1000
 
 
 class RuneGoldberg(AbstractDailyDND):
@@ -23,67 +36,62 @@ class RuneGoldberg(AbstractDailyDND):
     """
 
     @staticmethod
-    def _get_base() -> str:
+    def _get_base() -> GoldbergPageParser:
         """
         Make a request to warbandtracker to get the daily runes combinations.
-        :return: the html response.
+        The page is streamed and the download stops as soon as the rune combinations table has been read.
+        Unchanged pages are served from the http cache.
+        :return: the parsed page.
         """
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
                           '(KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36 OPR/120.0.0.0'
         }
-        url = 'https://warbandtracker.com/goldberg'
-        return requests.get(url, headers=headers).text
+        url = config.rune_goldberg_url
+        with closing(http_client.iter_text(url, headers=headers)) as chunks:
+            return GoldbergPageParser().feed_all(chunks)
 
     @staticmethod
-    def _get_html_table(html: str) -> str:
+    def _get_table_fragment(html: str) -> str:
         """
-        Generates the html for the  rune combination table.
+        Extract the rune combination table from a complete page.
         :param html: the html from the rune goldberg tracker website.
-        :return: the html template with the runes in place.
+        :return: the html of the table, with the rune images as relative paths.
         """
-        global _runes_filepath, _html_filepath
-        splitter: str = '<h2>Correct Rune Combinations</h2>'
-        table: str = html.split(splitter)[1].split('</div>')[0]
-        for rune in os.listdir(_runes_filepath):
-            if rune in table:
-                with open(os.path.join(_runes_filepath, rune), 'rb') as f:
-                    data = f.read()
-                b64 = base64.b64encode(data).decode('utf-8')
-                table = table.replace(f'runes/{rune}', f"data:image/gif;base64,{b64}")
-        with open(_html_filepath, 'r', encoding='utf-8') as f:
-            data = f.read()
-        return data.replace('[PLACEHOLDER]', table)
+        return GoldbergPageParser().feed_all([html]).table
 
     @staticmethod
-    def _get_daily_runes(html: str) -> List[str]:
+    def _get_rune_data_uri(match: re.Match) -> str:
         """
-        Get the daily rune combinations.
-        :param html: the html from the rune goldberg tracker website.
-        :return: the four available runes as a list. The first is the first rune, the latter 3 the second rune.
-        """
-        runes = []
-        for val in html.split('.gif'):
-            if len(runes) >= 4:
-                break
-            if 'rune' in val:
-                _possible = val.split('rune')[0]
-                if 'input' in _possible or 'html' in _possible:
-                    continue
-                _rune = _possible.split('title=\'')[1].split('\'')[0]
-                if 'Rune' in _rune:
-                    runes.append(_rune)
-        return runes
+        Replace a rune image path with the inline data uri from the asset pack.
+        :param match: the matched image path.
+        :return: the data uri, or the original path if the rune is unknown.
+        """
+        data_uri: Optional[str] = asset_pack.get_data_uri(match.group(0))
+        return match.group(0) if data_uri is None else data_uri
 
-    def _render_html(self, html: str) -> None:
+    def _get_html_table(self, table: str) -> str:
         """
-        Renders the daily runes table.
-        :param html: the html from the rune goldberg tracker website.
-        :return:
+        Generates the html for the  rune combination table.
+        :param table: the rune combination table from the rune goldberg tracker website.
+        :return: the html template with the runes in place.
         """
-        global _generated_filepath
-        output_path = uuid.uuid4().hex + os.path.basename(_generated_filepath)
-        new_html: str = self._get_html_table(html=html)
+        global _html_filepath, _html_template
+        if _html_template is None:
+            with open(_html_filepath, 'r', encoding='utf-8') as f:
+                _html_template = f.read()
+        return _html_template.replace('[PLACEHOLDER]', _RUNE_SRC_PATTERN.sub(self._get_rune_data_uri, table))
+
+    @staticmethod
+    def _render_html_hti(new_html: str) -> bytes:
+        """
+        Renders the daily runes table with a fresh Html2Image browser. Used as fallback for the render service.
+        :param new_html: the html template with the runes in place.
+        :return: the cropped table as png bytes.
+        """
+        # Imported on first use, the native backend needs no browser
+        from html2image import Html2Image
+        output_path = uuid.uuid4().hex + '.png'
         if config.linux_tmp_path_hti:
             hti = Html2Image(size=(600, 400), browser_executable=config.chromium_executable_path, temp_path='./tmp',
                              custom_flags=['--headless=new', '--virtual-time-budget=10000', '--hide-scrollbars',
@@ -101,25 +109,107 @@ class RuneGoldberg(AbstractDailyDND):
         right = left + crop_width
         bottom = top + crop_height
         cropped_img = img.crop((left, top, right, bottom))
-        cropped_img.save(_generated_filepath)
+        output = io.BytesIO()
+        cropped_img.save(output, format='PNG')
+        img.close()
         os.remove(output_path)
+        return output.getvalue()
+
+    def _render_html_chromium(self, new_html: str) -> bytes:
+        """
+        Renders the daily runes table using the warm chromium render service.
+        :param new_html: the html template with the runes in place.
+        :return: the table as png bytes.
+        """
+        try:
+            # Imported on first use, the native backend needs no browser
+            from rendering.chromium_render_service import render_service
+            return render_service.render_element(html=new_html, selector='table.worldTable')
+        except Exception as e:
+            log.error('Render service failed, falling back to Html2Image. Trace:', e, module=Module.RUNE_GOLD)
+            return self._render_html_hti(new_html=new_html)
+
+    def _render_image(self, table: str, new_html: str) -> bytes:
+        """
+        Renders the daily runes table with the configured backend.
+        :param table: the rune combination table from the rune goldberg tracker website.
+        :param new_html: the html template with the runes in place.
+        :return: the table as png bytes.
+        """
+        if config.rune_goldberg_render_backend == 'native':
+            try:
+                return native_renderer.render_table(table)
+            except Exception as e:
+                log.error('Native renderer failed, falling back to chromium. Trace:', e, module=Module.RUNE_GOLD)
+        return self._render_html_chromium(new_html=new_html)
+
+    def _render_html(self, table: str) -> bytes:
+        """
+        Renders the daily runes table, reusing the cached image if the table did not change.
+        :param table: the rune combination table from the rune goldberg tracker website.
+        :return: the table as png bytes.
+        """
+        with metrics.time(STAGE_DURATION, event='Rune Goldberg', stage='template'):
+            new_html: str = self._get_html_table(table=table)
+        cache_key: str = f'{config.rune_goldberg_render_backend}:{new_html}'
+        image_data: Optional[bytes] = render_cache.get(cache_key)
+        if image_data is None:
+            with metrics.time(STAGE_DURATION, event='Rune Goldberg', stage='render'):
+                image_data = self._render_image(table=table, new_html=new_html)
+            render_cache.put(cache_key, image_data)
+        return image_data
+
+    def _get_result(self, game_day: str, now_ms: int) -> GoldbergResult:
+        """
+        Get the rune combination of a game day, fetching it only if it is not stored yet.
+        Only combinations fetched at or after the daily schedule of the game day are stored.
+        :param game_day: the UTC date.
+        :param now_ms: the current time as epoch milliseconds.
+        :return: the combination.
+        """
+        result: Optional[GoldbergResult] = result_store.get(game_day)
+        if result is not None:
+            log.debug(f'Using stored rune combination of {game_day}.', module=Module.RUNE_GOLD)
+            return result
+        start = time.perf_counter()
+        page: GoldbergPageParser = self._get_base()
+        # The page is parsed while it streams in, the time spent in the parser is reported separately
+        metrics.observe(STAGE_DURATION, time.perf_counter() - start - page.parse_seconds,
+                        event='Rune Goldberg', stage='fetch')
+        metrics.observe(STAGE_DURATION, page.parse_seconds, event='Rune Goldberg', stage='parse')
+        result = GoldbergResult(game_day, page.runes, page.table)
+        previous: Optional[GoldbergResult] = result_store.get_latest_before(game_day)
+        if previous is not None and previous.runes == result.runes:
+            # Neither stored nor sent, a later run fetches the page again
+            if now_ms % _DAY_MS < _STALE_WINDOW_MS:
+                raise Exception(f'Rune combination of {game_day} equals the one of {previous.game_day}, '
+                                f'the tracker has not been updated since the reset yet.')
+            log.warning(f'Rune combination of {game_day} equals the one of {previous.game_day}.',
+                        module=Module.RUNE_GOLD)
+        if now_ms < get_next_fire_ms(daily_trigger, now_ms // _DAY_MS * _DAY_MS):
+            # Not confirmed by the community yet, the daily schedule fetches the page again
+            log.debug(f'Rune combination of {game_day} was fetched before the daily schedule, not storing it.',
+                      module=Module.RUNE_GOLD)
+            return result
+        result_store.put(result)
+        return result
 
     def daily_exec(self) -> Tuple[str, Dict[str, Any]]:
         """
-        Default public facing method.
+        Default public facing method. The combination is fetched once per game day and stored,
+        later runs on the same day, for instance after a restart, are answered from the store.
         :return: the daily rune combinations along with a screenshot of the rune's html table.
         """
-        global _generated_filepath
-        html: str = self._get_base()
-        render_success: bool = False
+        now_ms: int = clock.now_ms()
+        result: GoldbergResult = self._get_result(self.get_period_key(now_ms), now_ms)
+        image_data: Optional[bytes] = None
         try:
-            self._render_html(html=html)
-            render_success = True
+            image_data = self._render_html(table=result.table)
         except Exception as e:
             log.error('Error rendering as html. Trace: ' + str(e), module=Module.RUNE_GOLD)
         base: str = '== Rune Goldberg Report =='
-        runes: List[str] = self._get_daily_runes(html)
+        runes: List[str] = result.runes
         first: str = 'First Rune: ' + runes[0]
         second: str = f'Second Runes: {", ".join(runes[1:])}'
         end: str = '======================='
-        return f'{base}\n\n{first}\n{second}\n\n\n{end}', {"image": render_success, 'filepath': _generated_filepath}
+        return f'{base}\n\n{first}\n{second}\n\n\n{end}', {"image": image_data is not None, 'image_data': image_data}
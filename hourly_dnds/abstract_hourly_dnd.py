@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 from abc import ABC
-from typing import Dict, Any, Tuple
+from datetime import datetime, timezone
+from typing import Dict, Any, Tuple, Optional
 
 
 class AbstractHourlyDND(ABC):
@@ -8,10 +9,31 @@ class AbstractHourlyDND(ABC):
     Abstract hourly DND class.
     """
 
+    # Maximum run time until the notification is enqueued, None uses the EVENT_DEADLINE_SECONDS default.
+    deadline_seconds: Optional[float] = None
+
     def hourly_exec(self) -> Tuple[str, Dict[str, Any]]:
         """
         Default public facing method.
-        :return: a string response for telegram/discord along with flags containing attachment files.
-        Example of the dict: {"image": true, "filepath": "/tmp/generated.png"}
+        :return: a string response for telegram/discord along with flags containing attachments.
+        Example of the dict: {"image": true, "image_data": b"<png bytes>"}
+        Images may also be given as file, {"image": true, "filepath": "/tmp/generated.png"}
         """
         pass
+
+    def get_next_fire_time(self, now_ms: int) -> Optional[int]:
+        """
+        Optional, used by the event driven scheduler mode.
+        :param now_ms: the current time as epoch milliseconds.
+        :return: the next time (epoch milliseconds) hourly_exec should run, or None to run on the hourly cron schedule.
+        """
+        return None
+
+    def get_period_key(self, now_ms: int) -> str:
+        """
+        Identifies the period a notification belongs to, so notifications already delivered before a restart
+        are not sent again.
+        :param now_ms: the current time as epoch milliseconds.
+        :return: by default the current UTC hour.
+        """
+        return datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H')
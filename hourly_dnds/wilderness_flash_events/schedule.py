@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+from typing import List, Dict, Tuple, Optional
+
+HOUR_MS: int = 3600 * 1000
+
+
+class FlashEventSchedule:
+    """
+    Closed-form wilderness flash event rotation.
+    Event i of the rotation starts at start + i * item_period + k * full_period for every integer k.
+    All times are unix epoch milliseconds (UTC).
+    """
+
+    def _get_index(self, event_name: str) -> int:
+        index = self._index.get(event_name.lower())
+        if index is None:
+            raise Exception(f'Unknown wilderness flash event: {event_name}')
+        return index
+
+    def event_at(self, t_ms: int) -> Optional[Tuple[str, int]]:
+        """
+        Get the event running at the given time.
+        :param t_ms: the time to look up.
+        :return: the event name and its start time, or None if no event runs at that time.
+        """
+        offset = (t_ms - self._start_ms) % self._period_ms
+        i = offset // self._item_ms
+        if i >= len(self._events):
+            return None
+        return self._events[i], t_ms - offset + i * self._item_ms
+
+    def next_events(self, t_ms: int, count: int = 1) -> List[Tuple[str, int]]:
+        """
+        Get the next events starting at or after the given time.
+        :param t_ms: the time to search from.
+        :param count: the number of events to return.
+        :return: the event names and start times in chronological order.
+        """
+        offset = (t_ms - self._start_ms) % self._period_ms
+        cycle_start = t_ms - offset
+        # First slot starting at or after t, rounding the offset up to the next slot boundary.
+        i = -(-offset // self._item_ms)
+        events: List[Tuple[str, int]] = []
+        while len(events) < count:
+            if i >= len(self._events):
+                cycle_start += self._period_ms
+                i = 0
+            events.append((self._events[i], cycle_start + i * self._item_ms))
+            i += 1
+        return events
+
+    def next_occurrence(self, event_name: str, t_ms: int) -> int:
+        """
+        Get the next start of the given event at or after the given time.
+        :param event_name: the event name (case-insensitive).
+        :param t_ms: the time to search from.
+        :return: the start time.
+        """
+        first = self._start_ms + self._get_index(event_name) * self._item_ms
+        return first + -(-(t_ms - first) // self._period_ms) * self._period_ms
+
+    def occurrences(self, event_name: str, start_ms: int, end_ms: int) -> List[int]:
+        """
+        Get all starts of the given event in [start_ms, end_ms).
+        :param event_name: the event name (case-insensitive).
+        :param start_ms: the inclusive range start.
+        :param end_ms: the exclusive range end.
+        :return: the start times in chronological order.
+        """
+        return list(range(self.next_occurrence(event_name, start_ms), end_ms, self._period_ms))
+
+    def __init__(self, events: List[str], start_epoch_ms: int, full_period_hours: int, item_period_hours: int):
+        """
+        Default constructor.
+        :param events: the event names in rotation order.
+        :param start_epoch_ms: the start of the first event of a known rotation.
+        :param full_period_hours: the length of a full rotation.
+        :param item_period_hours: the time between two consecutive events.
+        """
+        self._events: List[str] = list(events)
+        self._index: Dict[str, int] = {name.lower(): i for i, name in enumerate(self._events)}
+        self._start_ms: int = start_epoch_ms
+        self._period_ms: int = full_period_hours * HOUR_MS
+        self._item_ms: int = item_period_hours * HOUR_MS
@@ -1,15 +1,17 @@
 #!/usr/bin/env python3
-import time
 import json
 import os.path
-from datetime import datetime, timedelta, timezone
-from zoneinfo import ZoneInfo
+from datetime import datetime, timezone
 from typing import Dict, Tuple, Any, Optional, List
 from hourly_dnds.abstract_hourly_dnd import AbstractHourlyDND
-from logging_framework.log_handler import log, Module
+from hourly_dnds.wilderness_flash_events.schedule import FlashEventSchedule, HOUR_MS
+from logging_framework.log_handler import log, Module, Lazy
+from metrics.metrics import metrics, STAGE_DURATION
+from localisation.localised_message import LocalisedMessage, default_settings
+from assets.asset_pack import asset_pack
+from scheduling.clock import clock
 
 import config
-import requests
 
 
 class WildernessFlashEvents(AbstractHourlyDND):
@@ -18,7 +20,6 @@ class WildernessFlashEvents(AbstractHourlyDND):
     """
 
     config_file_path: str = os.path.join(os.path.dirname(__file__), "config.json")
-    _maps_filepath: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'maps')
 
     START_EPOCH_MS: int = 1754542800000
     FULL_PERIOD_HOURS: int = 14
@@ -41,70 +42,49 @@ class WildernessFlashEvents(AbstractHourlyDND):
         "Evil Bloodwood Tree": "evil_bloodwood_tree.png",
     }
 
-    def _get_events_dictionary(self) -> Dict[str, str]:
+    def _get_events_dictionary(self, now_ms: int) -> Dict[str, int]:
         """
-        Build rotation from the fixed start timestamp.
-        Returns a dictionary of event → next occurrence (UTC, %H:%M).
+        Get the next occurrence of every event in the rotation.
+        :param now_ms: the current time as epoch milliseconds.
+        :return: a dictionary of event → next occurrence (UTC epoch milliseconds).
         """
-        events: Dict[str, str] = {}
+        return {name: self._schedule.next_occurrence(name, now_ms) for name in self.ROTATION.keys()}
 
-        start_time = datetime.fromtimestamp(self.START_EPOCH_MS / 1000, tz=timezone.utc)
-        now = datetime.now(timezone.utc)
-
-        for i, name in enumerate(self.ROTATION.keys()):
-            # time of this event in the very first cycle
-            event_time = start_time + timedelta(hours=i * self.ITEM_PERIOD_HOURS)
-
-            # compute how many full cycles have passed since anchor
-            elapsed = now - event_time
-            cycles = int(elapsed.total_seconds() // (self.FULL_PERIOD_HOURS * 3600))
-            if elapsed.total_seconds() % (self.FULL_PERIOD_HOURS * 3600) != 0:
-                cycles += 1
-
-            # roll forward to the next occurrence
-            next_time = event_time + timedelta(hours=cycles * self.FULL_PERIOD_HOURS)
-            events[name] = next_time.strftime("%H:%M")
-
-        return events
-
-    @staticmethod
-    def _get_next_event(events: Dict[str, str]) -> Tuple[str, str]:
+    def _get_next_event(self, now_ms: int) -> Tuple[str, int]:
         """
         Get the next wilderness flash event.
+        :param now_ms: the current time as epoch milliseconds.
+        :return: the event name and its start time as epoch milliseconds.
         """
-        now = datetime.now(timezone.utc)
-        for event_name, event_timestamp in events.items():
-            event_time = datetime.strptime(event_timestamp, "%H:%M").replace(
-                year=now.year, month=now.month, day=now.day, tzinfo=timezone.utc
-            )
-            if event_time < now:
-                event_time += timedelta(days=1)
-            if now <= event_time <= now + timedelta(hours=1):
-                return event_name, event_timestamp
-        raise Exception("Could not fetch next wilderness flash event.")
+        event_name, event_ms = self._schedule.next_events(now_ms)[0]
+        if event_ms > now_ms + self.ITEM_PERIOD_HOURS * HOUR_MS:
+            raise Exception("Could not fetch next wilderness flash event.")
+        return event_name, event_ms
 
     def print_all_events(self) -> None:
         """
         Print all upcoming events in human-readable format (UTC).
         """
-        events = self._get_events_dictionary()
+        events = self._get_events_dictionary(clock.now_ms())
         print("Upcoming Wilderness Flash Events (UTC):")
-        for name, ts in events.items():
-            print(f"- {name}: {ts.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+        for name, ts in sorted(events.items(), key=lambda item: item[1]):
+            print(f"- {name}: {datetime.fromtimestamp(ts / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S %Z')}")
 
     def hourly_exec(self) -> Tuple[str, Dict[str, Any]]:
         """
         Default public facing method.
         :return: a notification for the next wilderness flash event if it is on the favourite list.
         """
-        flash_events: Dict[str, str] = self._get_events_dictionary()
+        now_ms: int = clock.now_ms()
+        with metrics.time(STAGE_DURATION, event='Wilderness Flash Events', stage='compute'):
+            next_event, event_ms = self._get_next_event(now_ms)
         log.debug(
-            'Event schedule:', flash_events,
-            '| Current time:', datetime.now(tz=timezone.utc).strftime("%m/%d/%Y %H:%M:%S"),
+            'Next event:', next_event,
+            '| Current time:', Lazy(lambda: datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc)
+                                    .strftime("%m/%d/%Y %H:%M:%S")),
             module=Module.FLASH_EVENTS
         )
 
-        next_event, event_timestamp = self._get_next_event(flash_events)
         if self._favourites_only:
             if not self._is_favourite(next_event):
                 log.debug(f'Next flash event is {next_event} '
@@ -114,27 +94,61 @@ class WildernessFlashEvents(AbstractHourlyDND):
                 log.debug(f'Next flash event is {next_event}, sending notification...',
                           module=Module.FLASH_EVENTS)
 
-        # --- compute accurate countdown ---
-        now_utc = datetime.now(tz=timezone.utc)
-        cet = ZoneInfo("Europe/Berlin")
-        event_time_utc = datetime.strptime(event_timestamp, "%H:%M").replace(
-            year=now_utc.year, month=now_utc.month, day=now_utc.day, tzinfo=timezone.utc
-        )
-        if event_time_utc < now_utc:
-            event_time_utc += timedelta(days=1)
-
-        event_time_cet = event_time_utc.astimezone(cet)
-        now_cet = now_utc.astimezone(cet)
-        delta_minutes = int((event_time_cet - now_cet).total_seconds() // 60)
+        delta_minutes = (event_ms - now_ms) // 60000
         log.debug(
             f'Next flash event is {next_event}, sending notification in {delta_minutes} minutes...',
             module=Module.FLASH_EVENTS
         )
-        metadata = {}
-        filepath: str = os.path.join(self._maps_filepath, self.ROTATION.get(next_event))
-        if self._use_images and os.path.exists(filepath):
-            metadata = {"image": True, 'filepath': filepath}
-        return f'The next flash event is "{next_event}", starting in {delta_minutes} minutes at {event_time_cet.strftime("%H:%M")} CET', metadata
+        # Adapters render the message for each recipient's timezone and language, the text is the default rendering
+        localised = LocalisedMessage(self._get_templates(next_event), event_ms)
+        metadata: Dict[str, Any] = {'localised': localised.to_dict()}
+        image_data: Optional[memoryview] = self._get_map(next_event) if self._use_images else None
+        if image_data is not None:
+            metadata.update({"image": True, 'image_data': image_data})
+        return localised.render(default_settings, now_ms), metadata
+
+    @staticmethod
+    def _get_templates(event_name: str) -> Dict[str, str]:
+        """
+        :param event_name: the next event.
+        :return: the notification per language, see LocalisedMessage.
+        """
+        return {
+            'en': f'The next flash event is "{event_name}", starting in {{minutes}} minutes at {{time}} {{zone}}',
+            'de': f'Das nächste Flash-Event ist "{event_name}", es beginnt in {{minutes}} Minuten '
+                  f'um {{time}} {{zone}}',
+        }
+
+    def get_next_fire_time(self, now_ms: int) -> Optional[int]:
+        """
+        Get the time the notification for the next relevant event is due.
+        :param now_ms: the current time as epoch milliseconds.
+        :return: the configured lead time before the next event, or the next favourite event if enabled.
+        """
+        lead_ms: int = self._lead_minutes * 60 * 1000
+        for event_name, event_ms in self._schedule.next_events(now_ms + lead_ms + 1, len(self.ROTATION)):
+            if not self._favourites_only or self._is_favourite(event_name):
+                return event_ms - lead_ms
+        return None
+
+    def _get_map(self, event_name: str) -> Optional[memoryview]:
+        """
+        Get the map image of an event from the asset pack.
+        :param event_name: the event.
+        :return: the png bytes, None if the event has no map.
+        """
+        image: Optional[memoryview] = asset_pack.get(f'maps/{self.ROTATION.get(event_name)}')
+        if image is None:
+            log.error(f'Map of {event_name} is missing from the asset pack, sending without it.',
+                      module=Module.FLASH_EVENTS)
+        return image
+
+    def get_period_key(self, now_ms: int) -> str:
+        """
+        :param now_ms: the current time as epoch milliseconds.
+        :return: the start time of the next flash event, which the notification is about.
+        """
+        return str(self._get_next_event(now_ms)[1])
 
     def _is_favourite(self, event_name: str) -> bool:
         """
@@ -167,14 +181,22 @@ class WildernessFlashEvents(AbstractHourlyDND):
         """
         self._favourites_only: bool = config.wilderness_flash_events_favourites_only
         self._use_images: bool = config.wilderness_flash_events_images_enabled
+        self._lead_minutes: int = config.wilderness_flash_events_lead_minutes
+        # Notifications describe the next event to start, so the lead must be shorter than the time between events.
+        max_lead_minutes: int = self.ITEM_PERIOD_HOURS * 60 - 1
+        if not 0 < self._lead_minutes <= max_lead_minutes:
+            log.error(f'Flash event lead time must be between 1 and {max_lead_minutes} minutes. Using 30 minutes.',
+                      module=Module.FLASH_EVENTS)
+            self._lead_minutes = 30
+        self._schedule: FlashEventSchedule = FlashEventSchedule(
+            events=list(self.ROTATION.keys()),
+            start_epoch_ms=self.START_EPOCH_MS,
+            full_period_hours=self.FULL_PERIOD_HOURS,
+            item_period_hours=self.ITEM_PERIOD_HOURS
+        )
         if self._favourites_only:
             self._favourites: List[str] = self._load_config_file()
 
-    @staticmethod
-    def _append_event_if_valid(event: Optional[str], _time: Optional[str], events: Dict[str, str]) -> None:
-        if event is not None and _time is not None:
-            events[event] = _time
-
 
 if __name__ == '__main__':
     wilderness_flash = WildernessFlashEvents()
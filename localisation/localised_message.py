@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+import bisect
+import threading
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from typing import Dict, Any, List, Tuple, Optional
+
+import config
+from logging_framework.log_handler import log, Module
+
+HOUR_MS: int = 60 * 60 * 1000
+MINUTE_MS: int = 60 * 1000
+# Offset transitions are precomputed this far ahead, covering many flash event rotations
+_TABLE_SPAN_MS: int = 42 * 24 * HOUR_MS
+_PROBE_MS: int = 24 * HOUR_MS
+# Locales using the 12-hour clock, all others use the 24-hour clock
+_TWELVE_HOUR_LOCALES = {'en_US', 'en_CA', 'en_AU', 'en_NZ', 'en_IN', 'en_PH'}
+
+
+class RecipientSettings:
+    """
+    The timezone and locale a recipient reads notifications in.
+    """
+
+    @property
+    def language(self) -> str:
+        return self.locale.split('_')[0]
+
+    def __init__(self, timezone_name: str, locale: str):
+        """
+        Default constructor.
+        :param timezone_name: the IANA timezone, for instance Europe/Berlin.
+        :param locale: the locale, for instance en_US or de.
+        """
+        self.timezone: str = timezone_name
+        self.locale: str = locale
+        self.twelve_hour_clock: bool = locale in _TWELVE_HOUR_LOCALES
+        self.key: Tuple[str, str] = (timezone_name, locale)
+
+
+class ZoneOffsetTable:
+    """
+    The UTC offset transitions of a timezone over a time window. Looking up the offset of a timestamp is a
+    binary search over a handful of transitions, instead of a tz database conversion.
+    """
+
+    def _get_offset(self, timestamp_ms: int) -> Tuple[int, str]:
+        local = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).astimezone(self._zone)
+        return int(local.utcoffset().total_seconds() * 1000), local.tzname()
+
+    def _build(self, start_ms: int) -> None:
+        """
+        Find the transitions from the given time on, probing once a day and narrowing each change down to the minute.
+        Offset changes are months apart, so daily probes do not miss any.
+        :param start_ms: the start of the window.
+        :return:
+        """
+        start_ms = start_ms // HOUR_MS * HOUR_MS
+        starts: List[int] = [start_ms]
+        offsets: List[Tuple[int, str]] = [self._get_offset(start_ms)]
+        probe_ms: int = start_ms
+        while probe_ms < start_ms + _TABLE_SPAN_MS:
+            next_ms: int = probe_ms + _PROBE_MS
+            offset = self._get_offset(next_ms)
+            if offset != offsets[-1]:
+                low, high = probe_ms, next_ms
+                while high - low > MINUTE_MS:
+                    middle = (low + high) // 2 // MINUTE_MS * MINUTE_MS
+                    if middle <= low:
+                        break
+                    if self._get_offset(middle) == offsets[-1]:
+                        low = middle
+                    else:
+                        high = middle
+                starts.append(high)
+                offsets.append(self._get_offset(high))
+            probe_ms = next_ms
+        # Replaced at once, so concurrent lookups never see a partially rebuilt table
+        self._table = (starts, offsets, start_ms + _TABLE_SPAN_MS)
+
+    def lookup(self, timestamp_ms: int) -> Tuple[int, str]:
+        """
+        :param timestamp_ms: epoch milliseconds.
+        :return: the UTC offset in milliseconds and the zone abbreviation at that time.
+        """
+        starts, offsets, end_ms = self._table
+        if not starts[0] <= timestamp_ms < end_ms:
+            with self._lock:
+                self._build(timestamp_ms - 24 * HOUR_MS)
+            starts, offsets, end_ms = self._table
+        return offsets[bisect.bisect_right(starts, timestamp_ms) - 1]
+
+    def __init__(self, zone: ZoneInfo, start_ms: int):
+        """
+        Default constructor.
+        :param zone: the timezone.
+        :param start_ms: the start of the precomputed window. Lookups outside the window rebuild it.
+        """
+        self._zone: ZoneInfo = zone
+        self._lock = threading.Lock()
+        self._table: Tuple[List[int], List[Tuple[int, str]], int] = ([], [], 0)
+        self._build(start_ms)
+
+
+_zone_tables: Dict[str, ZoneOffsetTable] = {}
+_zone_tables_lock = threading.Lock()
+
+
+def get_zone_table(timezone_name: str, now_ms: int) -> ZoneOffsetTable:
+    """
+    Get the offset table of a timezone, built once per timezone. Unknown timezones use UTC.
+    :param timezone_name: the IANA timezone.
+    :param now_ms: the current time, the table starts shortly before it.
+    :return: the table.
+    """
+    table: Optional[ZoneOffsetTable] = _zone_tables.get(timezone_name)
+    if table is None:
+        with _zone_tables_lock:
+            if timezone_name not in _zone_tables:
+                try:
+                    zone = ZoneInfo(timezone_name)
+                except (ZoneInfoNotFoundError, ValueError):
+                    log.error(f'Unknown timezone {timezone_name}, using UTC.', module=Module.LOCALISATION)
+                    zone = ZoneInfo('UTC')
+                _zone_tables[timezone_name] = ZoneOffsetTable(zone, now_ms - 24 * HOUR_MS)
+            table = _zone_tables[timezone_name]
+    return table
+
+
+def format_time(timestamp_ms: int, settings: RecipientSettings) -> Tuple[str, str]:
+    """
+    Format the local time of day of a timestamp.
+    :param timestamp_ms: epoch milliseconds.
+    :param settings: the recipient's timezone and locale.
+    :return: the time, for instance 18:00 or 6:00 PM, and the zone abbreviation, for instance CEST.
+    """
+    offset_ms, abbreviation = get_zone_table(settings.timezone, timestamp_ms).lookup(timestamp_ms)
+    hours, minutes = divmod((timestamp_ms + offset_ms) // MINUTE_MS % (24 * 60), 60)
+    if settings.twelve_hour_clock:
+        return f'{(hours - 1) % 12 + 1}:{minutes:02d} {"AM" if hours < 12 else "PM"}', abbreviation
+    return f'{hours:02d}:{minutes:02d}', abbreviation
+
+
+class LocalisedMessage:
+    """
+    A notification about a point in time, rendered per recipient in their own language and timezone at the time
+    it is sent. Templates are keyed by language and use the placeholders {time}, {zone} and {minutes},
+    the minutes left until the point in time.
+    Passed to adapters as flags['localised'] in its dictionary form, so it can be stored in the outbox.
+    """
+
+    def render(self, settings: RecipientSettings, now_ms: int) -> str:
+        """
+        :param settings: the recipient's timezone and locale.
+        :param now_ms: the current time, for the countdown.
+        :return: the message for the recipient.
+        """
+        template: str = self.templates.get(settings.language) or self.templates['en']
+        time_of_day, zone = format_time(self.timestamp_ms, settings)
+        minutes: int = max(0, (self.timestamp_ms - now_ms) // MINUTE_MS)
+        return template.format(time=time_of_day, zone=zone, minutes=minutes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'templates': self.templates, 'timestamp_ms': self.timestamp_ms}
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]) -> 'LocalisedMessage':
+        return LocalisedMessage(data['templates'], data['timestamp_ms'])
+
+    def __init__(self, templates: Dict[str, str], timestamp_ms: int):
+        """
+        Default constructor.
+        :param templates: language -> template, must contain 'en'.
+        :param timestamp_ms: the point in time the message is about, as epoch milliseconds.
+        """
+        self.templates: Dict[str, str] = templates
+        self.timestamp_ms: int = timestamp_ms
+
+
+default_settings: RecipientSettings = RecipientSettings(config.default_timezone, config.default_locale)
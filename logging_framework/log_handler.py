@@ -5,13 +5,23 @@ Provided in accords with the MIT License.
 More on GitHub at https://leolion.tk/
 """
 import os
+import time
+import queue
+import atexit
+import threading
 from enum import Enum
-from typing import TextIO, Optional
+from typing import TextIO, Optional, List, Callable, Any
 from loguru import logger
 
 LOGFILE: str = os.getenv('LOGFILE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'application.log')
 LOG_LEVEL: str = os.getenv('LOG_LEVEL') or 'DEBUG'
+# The logfile is written in batches by a background thread and rotated by size.
+LOG_BATCH_SIZE: int = int(os.getenv('LOG_BATCH_SIZE') or 100)
+LOG_FLUSH_INTERVAL: float = float(os.getenv('LOG_FLUSH_INTERVAL') or 1.0)
+LOG_MAX_BYTES: int = int(os.getenv('LOG_MAX_BYTES') or 5 * 1024 * 1024)
+LOG_BACKUP_COUNT: int = int(os.getenv('LOG_BACKUP_COUNT') or 3)
 _instance = None
+_STOP = object()
 
 
 def get_instance():
@@ -32,6 +42,18 @@ class Module(Enum):
     TEL = 'Telegram API'
     RUNE_GOLD = 'Rune Goldberg Tracker'
     FLASH_EVENTS = 'Wilderness Flash Events'
+    RENDER = 'Render Service'
+    CACHE = 'Cache'
+    DISPATCH = 'Notification Dispatcher'
+    HTTP = 'HTTP Client'
+    METRICS = 'Metrics'
+    SCHEDULER = 'Scheduler'
+    PLUGINS = 'Plugin Registry'
+    STATE = 'State Store'
+    ASSETS = 'Asset Pack'
+    OUTBOX = 'Outbox'
+    LOCALISATION = 'Localisation'
+    PROFILING = 'Profiler'
 
 
 class LogType(Enum):
@@ -41,6 +63,93 @@ class LogType(Enum):
     WARN = '[WARNING]'
 
 
+class Lazy:
+    """
+    Log argument that is only evaluated if the message is actually logged.
+    Example: log.debug('Event schedule:', Lazy(build_schedule_table, events))
+    """
+
+    def __init__(self, func: Callable[..., Any], *args, **kwargs):
+        self.__func = func
+        self.__args = args
+        self.__kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self.__func(*self.__args, **self.__kwargs))
+
+
+class LogWriter:
+    """
+    Writes log lines to the logfile from a background thread.
+    Lines are flushed in batches, once the batch is full or the flush interval elapsed.
+    """
+
+    def __rotate(self) -> None:
+        """
+        Rotate the logfile: application.log -> application.log.1 -> ... -> application.log.<backup count>.
+        """
+        self.__fp.close()
+        if LOG_BACKUP_COUNT > 0:
+            for i in range(LOG_BACKUP_COUNT - 1, 0, -1):
+                if os.path.exists(f'{self.__filepath}.{i}'):
+                    os.replace(f'{self.__filepath}.{i}', f'{self.__filepath}.{i + 1}')
+            os.replace(self.__filepath, f'{self.__filepath}.1')
+            self.__fp = open(self.__filepath, 'a+')
+        else:
+            self.__fp = open(self.__filepath, 'w+')
+
+    def __flush(self, lines: List[str]) -> None:
+        if not lines:
+            return
+        self.__fp.write(''.join(lines))
+        self.__fp.flush()
+        if self.__fp.tell() >= LOG_MAX_BYTES:
+            self.__rotate()
+
+    def __run(self) -> None:
+        batch: List[str] = []
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while True:
+            try:
+                line = self.__queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                line = None
+            try:
+                if line is _STOP:
+                    self.__flush(batch)
+                    self.__fp.close()
+                    return
+                if line is not None:
+                    batch.append(line)
+                if len(batch) >= LOG_BATCH_SIZE or time.monotonic() >= deadline:
+                    self.__flush(batch)
+                    batch = []
+                    deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            except Exception as e:
+                batch = []
+                logger.error('Error writing logfile. Trace: {}'.format(e))
+
+    def write(self, line: str) -> None:
+        self.__queue.put(line)
+
+    def close(self) -> None:
+        """
+        Flush all pending lines and stop the writer.
+        """
+        if not self.__thread.is_alive():
+            return
+        self.__queue.put(_STOP)
+        self.__thread.join(timeout=5)
+
+    def __init__(self, filepath: str):
+        self.__filepath: str = filepath
+        self.__fp: TextIO = open(filepath, 'a+')
+        self.__queue: queue.Queue = queue.Queue()
+        self.__thread = threading.Thread(target=self.__run, name='log-writer', daemon=True)
+        self.__thread.start()
+        atexit.register(self.close)
+
+
 class Logger:
 
     @staticmethod
@@ -89,15 +198,16 @@ class Logger:
 
     @staticmethod
     def __handle_args(*args) -> str:
+        # Lazy arguments are evaluated by str(), other callables are logged as they are
         return ' '.join([str(val) for val in args])
 
     def __open_fp(self) -> None:
         """
-        Opens the file pointer to the specified log file.
+        Starts the background writer for the specified log file.
         """
         if not LOGFILE:
             raise Exception('Logfile not specified! Running in console-mode only.')
-        self.__fp: TextIO = open(LOGFILE, 'a+')
+        self.__writer: LogWriter = LogWriter(LOGFILE)
 
     def __write_log(self, message: str, mtype: LogType) -> None:
         """
@@ -105,11 +215,10 @@ class Logger:
         :param message: Message to write.
         :param mtype: The log message type.
         """
-        if self.__fp is None:
+        if self.__writer is None:
             return
         message = ' '.join([mtype.value, message])
-        self.__fp.write(f'{message}\n')
-        self.__fp.flush()
+        self.__writer.write(f'{message}\n')
 
     @staticmethod
     def __build_message(message: str, module: Module) -> str:
@@ -190,7 +299,7 @@ class Logger:
             self.error('Error writing debug log. Trace:', e, module=Module.LOGGER)
 
     def __init__(self):
-        self.__fp: Optional[TextIO] = None
+        self.__writer: Optional[LogWriter] = None
         logger.info(self.__build_message(message='Initialising logger...', module=Module.LOGGER))
         self.__log_level = self.__get_log_level()
         try:
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+import time
+import bisect
+import threading
+from contextlib import contextmanager, nullcontext
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Tuple, Iterator, ContextManager
+
+import config
+from logging_framework.log_handler import log, Module
+
+Labels = Tuple[Tuple[str, str], ...]
+
+_BUCKETS: List[float] = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+_NULL_CONTEXT = nullcontext()
+
+# Metric names and their help texts.
+STAGE_DURATION: str = 'dnd_stage_duration_seconds'
+ADAPTER_DURATION: str = 'adapter_request_duration_seconds'
+EVENT_RUNS: str = 'dnd_event_runs_total'
+EVENT_FAILURES: str = 'dnd_event_failures_total'
+ADAPTER_FAILURES: str = 'adapter_failures_total'
+_HELP: Dict[str, str] = {
+    STAGE_DURATION: 'Duration of D&D event stages (fetch, parse, template, render, ...).',
+    ADAPTER_DURATION: 'Duration of social media adapter api calls.',
+    EVENT_RUNS: 'Number of D&D event executions.',
+    EVENT_FAILURES: 'Number of failed D&D event executions.',
+    ADAPTER_FAILURES: 'Number of failed social media adapter api calls.',
+}
+
+
+class _Histogram:
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(_BUCKETS, value)] += 1
+        self.sum += value
+
+    def __init__(self):
+        # One counter per bucket plus the +Inf bucket, not cumulative.
+        self.counts: List[int] = [0] * (len(_BUCKETS) + 1)
+        self.sum: float = 0
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class MetricsRegistry:
+    """
+    Counters and latency histograms, exposed in the Prometheus text format.
+    All recording methods return immediately if metrics are disabled.
+    """
+
+    @staticmethod
+    def _labels(labels: Dict[str, str]) -> Labels:
+        return tuple((key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in labels.items())
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = self._labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = self._labels(labels)
+        with self._lock:
+            self._histograms.setdefault(name, {}).setdefault(key, _Histogram()).observe(value)
+
+    @contextmanager
+    def _timer(self, name: str, labels: Dict[str, str]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def time(self, name: str, **labels: str) -> ContextManager:
+        """
+        Time a block of code into a histogram.
+        Example: with metrics.time(STAGE_DURATION, event='Rune Goldberg', stage='fetch'): ...
+        :param name: the histogram name.
+        :param labels: the labels of the series.
+        :return: the timing context manager, a shared no-op if metrics are disabled.
+        """
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timer(name, labels)
+
+    def render(self) -> str:
+        """
+        Render all metrics in the Prometheus text format.
+        :return: the exposition text.
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines += [f'# HELP {name} {_HELP.get(name, name)}', f'# TYPE {name} counter']
+                lines += [f'{name}{_format_labels(labels)} {value}' for labels, value in sorted(series.items())]
+            for name, series in sorted(self._histograms.items()):
+                lines += [f'# HELP {name} {_HELP.get(name, name)}', f'# TYPE {name} histogram']
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(_BUCKETS + ['+Inf'], histogram.counts):
+                        cumulative += count
+                        le = f'le="{bound}"'
+                        lines.append(f'{name}_bucket{_format_labels(labels, le)} {cumulative}')
+                    lines.append(f'{name}_sum{_format_labels(labels)} {histogram.sum}')
+                    lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    def start_server(self, host: str, port: int) -> None:
+        """
+        Serve the metrics on http://host:port/metrics from a background thread.
+        :param host: the interface to bind.
+        :param port: the port.
+        :return:
+        """
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        log.info(f'Serving metrics on http://{host}:{port}/metrics', module=Module.METRICS)
+
+    def __init__(self, enabled: bool):
+        self.enabled: bool = enabled
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, _Histogram]] = {}
+        self._lock = threading.Lock()
+
+
+metrics: MetricsRegistry = MetricsRegistry(enabled=config.metrics_enabled)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+import os
+import time
+import codecs
+import hashlib
+import threading
+from urllib.parse import urlsplit
+from typing import Dict, Any, Optional, Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+from logging_framework.log_handler import log, Module
+from storage.json_file import load_json, save_json
+
+
+class HostStats:
+    """
+    Request counters and latencies for a single host.
+    """
+
+    def record(self, latency_ms: float, failed: bool) -> None:
+        self.requests += 1
+        self.failures += int(failed)
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+
+    def __str__(self) -> str:
+        average = self.total_ms / self.requests if self.requests else 0
+        return f'{self.requests} requests, {self.failures} failed, avg {average:.0f} ms, max {self.max_ms:.0f} ms'
+
+    def __init__(self):
+        self.requests: int = 0
+        self.failures: int = 0
+        self.total_ms: float = 0
+        self.max_ms: float = 0
+
+
+class HttpClient:
+    """
+    Shared http client for all D&D modules and adapters.
+    Provides a pooled keep-alive session with default timeouts, bounded exponential backoff retries,
+    an on-disk ETag/Last-Modified cache for conditional GETs and per-host request statistics.
+    """
+
+    def _record(self, url: str, start: float, failed: bool) -> None:
+        host = urlsplit(url).hostname or url
+        with self._lock:
+            self._stats.setdefault(host, HostStats()).record((time.perf_counter() - start) * 1000, failed)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the shared session.
+        :param method: the http method.
+        :param url: the url.
+        :param kwargs: passed on to requests. The default timeout applies unless one is given.
+        :return: the response.
+        """
+        kwargs.setdefault('timeout', self._timeout)
+        start = time.perf_counter()
+        try:
+            response = self._session.request(method, url, **kwargs)
+        except requests.RequestException:
+            self._record(url, start, failed=True)
+            raise
+        self._record(url, start, failed=response.status_code >= 400)
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def _get_cache_path(self, url: str) -> str:
+        return os.path.join(self._cache_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + '.json')
+
+    def iter_text(self, url: str, headers: Optional[Dict[str, str]] = None,
+                  chunk_size: int = 8192) -> Iterator[str]:
+        """
+        Stream a GET response as decoded text chunks, revalidating against the on-disk cache.
+        If the server answers 304 Not Modified, the cached text is replayed without downloading the body.
+        The cache stores only the text the caller consumed before closing the iterator, so it suits
+        consumers that read the same prefix of identical content, such as page parsers that stop early.
+        :param url: the url.
+        :param headers: optional request headers.
+        :param chunk_size: the size of the downloaded chunks.
+        :return: an iterator over the decoded chunks.
+        """
+        cache_path = self._get_cache_path(url)
+        try:
+            cached: Dict[str, Any] = load_json(cache_path, {})
+        except Exception as e:
+            log.error('Error reading http cache entry. Trace:', e, module=Module.HTTP)
+            cached = {}
+        request_headers = dict(headers or {})
+        if 'text' in cached and cached.get('etag'):
+            request_headers['If-None-Match'] = cached['etag']
+        if 'text' in cached and cached.get('last_modified'):
+            request_headers['If-Modified-Since'] = cached['last_modified']
+
+        with self.get(url, headers=request_headers, stream=True) as r:
+            if r.status_code == 304:
+                log.debug('Http cache hit for', url, module=Module.HTTP)
+                yield cached['text']
+                return
+            r.raise_for_status()
+            etag, last_modified = r.headers.get('ETag'), r.headers.get('Last-Modified')
+            decoder = codecs.getincrementaldecoder(r.encoding or 'utf-8')(errors='replace')
+            consumed = []
+            # Only a body read to the end or closed early by the caller is cached. A download that failed midway
+            # would be replayed truncated on every later 304.
+            complete = False
+            try:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    text = decoder.decode(chunk)
+                    consumed.append(text)
+                    yield text
+                complete = True
+            except GeneratorExit:
+                complete = True
+                raise
+            finally:
+                if complete and (etag or last_modified):
+                    try:
+                        save_json(cache_path, {'etag': etag, 'last_modified': last_modified,
+                                               'text': ''.join(consumed)})
+                    except OSError as e:
+                        log.error('Error writing http cache entry. Trace:', e, module=Module.HTTP)
+
+    def get_stats(self) -> Dict[str, HostStats]:
+        with self._lock:
+            return dict(self._stats)
+
+    def log_stats(self) -> None:
+        """
+        Log the per-host request statistics.
+        :return:
+        """
+        for host, stats in self.get_stats().items():
+            log.info(f'{host}: {stats}', module=Module.HTTP)
+
+    def __init__(self):
+        """
+        Default constructor.
+        """
+        retry = Retry(
+            total=config.http_max_retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=retry)
+        self._session: requests.Session = requests.Session()
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._timeout = (config.http_connect_timeout_seconds, config.http_read_timeout_seconds)
+        self._cache_dir: str = os.path.join(config.data_dir, 'http_cache')
+        self._stats: Dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+
+http_client: HttpClient = HttpClient()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import importlib
+import threading
+from typing import Dict, Any, List, Optional
+
+import config
+from logging_framework.log_handler import log, Module
+
+# Plugin kinds
+DAILY: str = 'daily'
+HOURLY: str = 'hourly'
+ADAPTER: str = 'adapter'
+
+
+class PluginSpec:
+    """
+    A registered plugin, referenced by the import path of its module and attribute.
+    """
+
+    def __init__(self, kind: str, name: str, target: str, enabled: bool):
+        """
+        Default constructor.
+        :param kind: the plugin kind.
+        :param name: the plugin name, used as event name and delete key.
+        :param target: 'package.module:attribute'. A class is instantiated on load, other attributes are used as is.
+        :param enabled: disabled plugins are never imported.
+        """
+        self.kind: str = kind
+        self.name: str = name
+        self.target: str = target
+        self.enabled: bool = enabled
+
+
+class PluginRegistry:
+    """
+    Registry of D&D events and social media adapters. Plugins are registered by name and their modules are
+    imported on first use, so disabled plugins and the libraries they depend on are never loaded.
+    """
+
+    def register(self, kind: str, name: str, target: str, enabled: bool = True) -> None:
+        """
+        Register a plugin without importing it.
+        :param kind: DAILY, HOURLY or ADAPTER.
+        :param name: the plugin name.
+        :param target: 'package.module:attribute' of the plugin class or instance.
+        :param enabled: whether the plugin may be loaded.
+        :return:
+        """
+        self._specs.setdefault(kind, {})[name] = PluginSpec(kind, name, target, enabled)
+
+    def names(self, kind: str) -> List[str]:
+        """
+        :param kind: the plugin kind.
+        :return: the names of the enabled plugins of the given kind, without loading them.
+        """
+        return [name for name, spec in self._specs.get(kind, {}).items() if spec.enabled]
+
+    def get(self, kind: str, name: str) -> Optional[Any]:
+        """
+        Get a plugin, importing it on first use.
+        :param kind: the plugin kind.
+        :param name: the plugin name.
+        :return: the plugin, None if it is unknown, disabled or could not be loaded.
+        """
+        spec: Optional[PluginSpec] = self._specs.get(kind, {}).get(name)
+        if spec is None or not spec.enabled:
+            return None
+        with self._lock:
+            key = (kind, name)
+            if key not in self._loaded:
+                try:
+                    module_name, attribute = spec.target.split(':')
+                    plugin = getattr(importlib.import_module(module_name), attribute)
+                    self._loaded[key] = plugin() if isinstance(plugin, type) else plugin
+                    log.debug(f'Loaded {kind} plugin {name} from {spec.target}', module=Module.PLUGINS)
+                except Exception as e:
+                    log.error(f'Error loading {kind} plugin {name}. Trace:', e, module=Module.PLUGINS)
+                    return None
+            return self._loaded[key]
+
+    def load_all(self, kind: str) -> List[Any]:
+        """
+        :param kind: the plugin kind.
+        :return: all enabled plugins of the given kind that could be loaded.
+        """
+        plugins = [self.get(kind, name) for name in self.names(kind)]
+        return [plugin for plugin in plugins if plugin is not None]
+
+    def __init__(self):
+        self._specs: Dict[str, Dict[str, PluginSpec]] = {}
+        self._loaded: Dict[tuple, Any] = {}
+        self._lock = threading.RLock()
+
+
+registry: PluginRegistry = PluginRegistry()
+
+# Add new D&D events and adapters here
+registry.register(DAILY, 'Rune Goldberg', 'daily_dnds.rune_goldberg.rune_goldberg:RuneGoldberg',
+                  enabled='Rune Goldberg' not in config.disabled_events)
+registry.register(HOURLY, 'Wilderness Flash Events',
+                  'hourly_dnds.wilderness_flash_events.wilderness_flash_events:WildernessFlashEvents',
+                  enabled='Wilderness Flash Events' not in config.disabled_events)
+registry.register(ADAPTER, 'Telegram', 'social_media_connectors.telegram_api:api', enabled=config.telegram_enabled)
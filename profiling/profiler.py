@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+import os
+import re
+import sys
+import json
+import time
+import signal
+import cProfile
+import threading
+import tracemalloc
+from datetime import datetime
+from contextlib import contextmanager, nullcontext, ExitStack
+from typing import Dict, List, Iterator, ContextManager, Optional
+
+import config
+from logging_framework.log_handler import log, Module
+
+_NULL_CONTEXT = nullcontext()
+
+# Profiling modes
+CPROFILE: str = 'cprofile'
+TRACEMALLOC: str = 'tracemalloc'
+SAMPLING: str = 'sampling'
+
+# Dump file suffixes, read by the summary cli
+CPROFILE_SUFFIX: str = '.prof'
+TRACEMALLOC_SUFFIX: str = '.alloc.json'
+SAMPLING_SUFFIX: str = '.folded'
+
+# Allocation sites kept per dump
+_TOP_ALLOCATIONS: int = 100
+
+
+class _StackSampler(threading.Thread):
+    """
+    Samples the stack of one thread at a fixed interval, counting identical stacks.
+    """
+
+    def run(self) -> None:
+        while not self._stopped.wait(self._interval_seconds):
+            frame = sys._current_frames().get(self._thread_id)
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                key = ';'.join(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+    def __init__(self, thread_id: int, interval_seconds: float):
+        super().__init__(name='profile-sampler', daemon=True)
+        self._thread_id: int = thread_id
+        self._interval_seconds: float = interval_seconds
+        self._stopped = threading.Event()
+        # Folded stack, root first -> number of samples
+        self.stacks: Dict[str, int] = {}
+
+
+class Profiler:
+    """
+    Opt-in profiling of event executions with cProfile, tracemalloc and wall-time stack sampling.
+    Every profiled execution writes its dumps to the profile directory, named by time, run and event.
+    Profiling is enabled with PROFILING_ENABLED or toggled at runtime with SIGUSR1.
+    """
+
+    def _get_basename(self, run_name: str, event_name: str) -> str:
+        timestamp: str = datetime.now().strftime('%Y%m%d-%H%M%S-%f')[:-3]
+        name: str = re.sub(r'[^A-Za-z0-9]+', '-', f'{run_name}_{event_name}').strip('-').lower()
+        return os.path.join(self._directory, f'{timestamp}_{name}')
+
+    @staticmethod
+    def _dump_allocations(filepath: str, start: tracemalloc.Snapshot, end: tracemalloc.Snapshot,
+                          peak_bytes: int) -> None:
+        """
+        Write the allocation sites that grew the most between two snapshots.
+        """
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__),
+                   tracemalloc.Filter(False, cProfile.__file__)]
+        stats = end.filter_traces(filters).compare_to(start.filter_traces(filters), 'lineno')
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump({
+                'peak_bytes': peak_bytes,
+                'sites': [{'site': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                           'size_diff': stat.size_diff, 'count_diff': stat.count_diff}
+                          for stat in stats[:_TOP_ALLOCATIONS]]
+            }, f, indent=1)
+
+    @contextmanager
+    def _profile(self, run_name: str, event_name: str) -> Iterator[None]:
+        basename: str = self._get_basename(run_name, event_name)
+        profile: Optional[cProfile.Profile] = None
+        sampler: Optional[_StackSampler] = None
+        start_snapshot: Optional[tracemalloc.Snapshot] = None
+        # Unwound in reverse, after the dumps were written or as soon as the setup fails
+        with ExitStack() as cleanup:
+            # cProfile can only be active once at a time on newer interpreters, concurrent events are not profiled
+            if CPROFILE in self._modes and self._cprofile_lock.acquire(blocking=False):
+                cleanup.callback(self._cprofile_lock.release)
+                profile = cProfile.Profile()
+            # The traced peak is global, so allocations are only profiled for one execution at a time as well
+            if TRACEMALLOC in self._modes and self._tracemalloc_lock.acquire(blocking=False):
+                cleanup.callback(self._tracemalloc_lock.release)
+                # Tracing started by someone else, for instance with PYTHONTRACEMALLOC, is left running
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    cleanup.callback(tracemalloc.stop)
+                tracemalloc.reset_peak()
+                start_snapshot = tracemalloc.take_snapshot()
+            # Stopped before the dumps are written
+            collectors: ExitStack = cleanup.enter_context(ExitStack())
+            if SAMPLING in self._modes:
+                sampler = _StackSampler(threading.get_ident(), self._sample_interval_seconds)
+                sampler.start()
+                collectors.callback(sampler.stop)
+            start = time.perf_counter()
+            if profile is not None:
+                profile.enable()
+                collectors.callback(profile.disable)
+            try:
+                yield
+            finally:
+                collectors.close()
+                duration_ms: float = (time.perf_counter() - start) * 1000
+                # Taken before writing the other dumps, so their allocations are not included
+                end_snapshot: Optional[tracemalloc.Snapshot] = None
+                peak_bytes: int = 0
+                if start_snapshot is not None:
+                    end_snapshot = tracemalloc.take_snapshot()
+                    peak_bytes = tracemalloc.get_traced_memory()[1]
+                try:
+                    os.makedirs(self._directory, exist_ok=True)
+                    if profile is not None:
+                        profile.dump_stats(basename + CPROFILE_SUFFIX)
+                    if sampler is not None:
+                        with open(basename + SAMPLING_SUFFIX, 'w', encoding='utf-8') as f:
+                            f.writelines(f'{stack} {count}\n' for stack, count in sampler.stacks.items())
+                    if end_snapshot is not None:
+                        self._dump_allocations(basename + TRACEMALLOC_SUFFIX, start_snapshot, end_snapshot,
+                                               peak_bytes)
+                    log.info(f'Profiled {event_name} ({duration_ms:.0f} ms), dumps written to {basename}.*',
+                             module=Module.PROFILING)
+                except Exception as e:
+                    log.error(f'Error writing profile of {event_name}. Trace:', e, module=Module.PROFILING)
+
+    def profile(self, run_name: str, event_name: str) -> ContextManager:
+        """
+        Profile a block of code, typically one event execution.
+        Example: with profiler.profile('daily', 'Rune Goldberg'): ...
+        :param run_name: the schedule the event runs in, used in the dump names.
+        :param event_name: the event name, used in the dump names.
+        :return: the profiling context manager, a shared no-op if profiling is disabled.
+        """
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._profile(run_name, event_name)
+
+    def _toggle(self, signum, frame) -> None:
+        self.enabled = not self.enabled
+        log.info(f'Profiling {"enabled" if self.enabled else "disabled"}, modes: {", ".join(self._modes)}.',
+                 module=Module.PROFILING)
+
+    def install_signal_handler(self) -> None:
+        """
+        Toggle profiling with SIGUSR1, for instance 'kill -USR1 <pid>'. Must be called from the main thread.
+        Not available on Windows.
+        :return:
+        """
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self._toggle)
+
+    def __init__(self, enabled: bool, modes: List[str], directory: str, sample_interval_ms: float):
+        """
+        Default constructor.
+        :param enabled: whether executions are profiled from the start.
+        :param modes: any of cprofile, tracemalloc and sampling.
+        :param directory: the directory the dumps are written to.
+        :param sample_interval_ms: the interval of the stack sampling.
+        """
+        self.enabled: bool = enabled
+        self._modes: List[str] = [mode for mode in modes if mode in (CPROFILE, TRACEMALLOC, SAMPLING)]
+        self._directory: str = directory
+        self._sample_interval_seconds: float = sample_interval_ms / 1000
+        self._cprofile_lock = threading.Lock()
+        self._tracemalloc_lock = threading.Lock()
+
+
+profiler: Profiler = Profiler(
+    enabled=config.profiling_enabled,
+    modes=config.profiling_modes,
+    directory=config.profiling_directory,
+    sample_interval_ms=config.profiling_sample_interval_ms
+)
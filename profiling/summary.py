@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Summarises the profiles written with PROFILING_ENABLED across runs: the functions with the most cumulative time
+(cProfile), the allocation sites that grew the most (tracemalloc) and the functions the wall-time samples were
+taken in.
+
+Usage (from the repository root):
+    python -m profiling.summary [--directory data/profiles] [--event "Rune Goldberg"] [--top 20]
+"""
+import io
+import os
+import re
+import json
+import pstats
+import argparse
+from typing import Dict, List, Optional
+
+import config
+from profiling.profiler import CPROFILE_SUFFIX, TRACEMALLOC_SUFFIX, SAMPLING_SUFFIX
+
+
+def _list_dumps(directory: str, suffix: str, event: Optional[str]) -> List[str]:
+    """
+    :param directory: the profile directory.
+    :param suffix: the dump type.
+    :param event: optionally only include dumps of this event.
+    :return: the dump files, oldest first.
+    """
+    if not os.path.isdir(directory):
+        return []
+    pattern: Optional[str] = None if event is None else re.sub(r'[^A-Za-z0-9]+', '-', event).strip('-').lower()
+    return sorted(os.path.join(directory, filename) for filename in os.listdir(directory)
+                  if filename.endswith(suffix) and (pattern is None or filename[:-len(suffix)].endswith(pattern)))
+
+
+def summarise_cprofile(files: List[str], top: int) -> str:
+    output = io.StringIO()
+    stats = pstats.Stats(*files, stream=output)
+    stats.strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    return output.getvalue()
+
+
+def summarise_allocations(files: List[str], top: int) -> str:
+    sizes: Dict[str, int] = {}
+    counts: Dict[str, int] = {}
+    peak_bytes: int = 0
+    for filepath in files:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            dump = json.load(f)
+        peak_bytes = max(peak_bytes, dump['peak_bytes'])
+        for site in dump['sites']:
+            sizes[site['site']] = sizes.get(site['site'], 0) + site['size_diff']
+            counts[site['site']] = counts.get(site['site'], 0) + site['count_diff']
+    lines: List[str] = [f'Highest peak of traced memory: {peak_bytes / 1024:.1f} KiB', '',
+                        f'{"size KiB":>10} {"blocks":>8}  site']
+    for site, size in sorted(sizes.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f'{size / 1024:>10.1f} {counts[site]:>8}  {site}')
+    return '\n'.join(lines)
+
+
+def summarise_samples(files: List[str], top: int) -> str:
+    inclusive: Dict[str, int] = {}
+    leaf: Dict[str, int] = {}
+    total: int = 0
+    for filepath in files:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            for line in f:
+                stack, _, count = line.rstrip('\n').rpartition(' ')
+                frames: List[str] = stack.split(';')
+                total += int(count)
+                leaf[frames[-1]] = leaf.get(frames[-1], 0) + int(count)
+                for frame in set(frames):
+                    inclusive[frame] = inclusive.get(frame, 0) + int(count)
+    lines: List[str] = [f'{total} samples', '', f'{"self %":>7} {"total %":>8}  function']
+    # Functions the samples ended in first, those are where the wall time is spent, including waiting for I/O
+    for frame, count in sorted(inclusive.items(), key=lambda item: (-leaf.get(item[0], 0), -item[1]))[:top]:
+        lines.append(f'{leaf.get(frame, 0) * 100 / total:>7.1f} {count * 100 / total:>8.1f}  {frame}')
+    return '\n'.join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--directory', default=config.profiling_directory)
+    parser.add_argument('--event', default=None, help='only include profiles of this event')
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    sections = [
+        ('cProfile: top functions by cumulative time', CPROFILE_SUFFIX, summarise_cprofile),
+        ('tracemalloc: top allocation sites', TRACEMALLOC_SUFFIX, summarise_allocations),
+        ('Wall-time samples: top functions by samples', SAMPLING_SUFFIX, summarise_samples),
+    ]
+    for title, suffix, summarise in sections:
+        files: List[str] = _list_dumps(args.directory, suffix, args.event)
+        print(f'== {title} ({len(files)} profiles) ==')
+        print(summarise(files, args.top) if files else 'No profiles found.')
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+import os
+import atexit
+import base64
+import threading
+from typing import Optional, Dict, List
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+
+import config
+from logging_framework.log_handler import log, Module
+
+_WAIT_FOR_IMAGES_JS: str = """
+const done = arguments[arguments.length - 1];
+const pending = Array.from(document.images).filter(img => !img.complete);
+if (!pending.length) { done(true); return; }
+let remaining = pending.length;
+const finish = () => { if (--remaining === 0) { done(true); } };
+pending.forEach(img => {
+    img.addEventListener('load', finish);
+    img.addEventListener('error', finish);
+});
+"""
+
+_ELEMENT_RECT_JS: str = """
+const element = document.querySelector(arguments[0]);
+if (!element) { return null; }
+const rect = element.getBoundingClientRect();
+return [rect.left + window.scrollX, rect.top + window.scrollY, rect.width, rect.height];
+"""
+
+
+class ChromiumRenderService:
+    """
+    Keeps a single headless chromium process warm and renders html over the DevTools protocol.
+    Screenshots are clipped to a single element and returned in memory as png bytes.
+    """
+
+    def _build_options(self) -> Options:
+        """
+        Build the chromium launch options.
+        :return: the chrome options.
+        """
+        options = Options()
+        if self._browser_path and os.path.exists(self._browser_path):
+            options.binary_location = self._browser_path
+        for flag in ['--headless=new', '--hide-scrollbars', '--no-sandbox', '--disable-gpu',
+                     '--disable-dev-shm-usage', '--disable-extensions', '--mute-audio',
+                     f'--window-size={self._window_size[0]},{self._window_size[1]}']:
+            options.add_argument(flag)
+        return options
+
+    def _start(self) -> None:
+        """
+        Launch the browser and open a blank page to render into.
+        :return:
+        """
+        log.info('Starting warm chromium render service...', module=Module.RENDER)
+        service = Service(executable_path=config.chromedriver_executable_path)
+        self._driver = webdriver.Chrome(options=self._build_options(), service=service)
+        self._driver.set_script_timeout(self._timeout_seconds)
+        self._driver.get('about:blank')
+        frame_tree = self._driver.execute_cdp_cmd('Page.getFrameTree', {})
+        self._frame_id = frame_tree['frameTree']['frame']['id']
+        self._renders = 0
+
+    def _stop(self) -> None:
+        """
+        Shut the browser down, if running.
+        :return:
+        """
+        if self._driver is None:
+            return
+        try:
+            self._driver.quit()
+        except Exception as e:
+            log.error('Error stopping chromium render service. Trace:', e, module=Module.RENDER)
+        self._driver = None
+        self._frame_id = None
+
+    @staticmethod
+    def _get_process_tree(root_pid: int) -> List[int]:
+        """
+        Collect the given pid and all of its descendants from /proc.
+        :param root_pid: the root process id.
+        :return: the list of process ids in the tree.
+        """
+        children: Dict[int, List[int]] = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat', 'r') as f:
+                    # The command name may contain spaces, the parent pid follows the closing bracket.
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+        pids, stack = [], [root_pid]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            stack.extend(children.get(pid, []))
+        return pids
+
+    def _get_rss_bytes(self) -> int:
+        """
+        Get the resident memory of chromedriver and all browser processes (linux only).
+        :return: the rss in bytes, or 0 if unavailable.
+        """
+        if self._driver is None or not os.path.isdir('/proc'):
+            return 0
+        process = getattr(self._driver.service, 'process', None)
+        if process is None:
+            return 0
+        rss_kb = 0
+        for pid in self._get_process_tree(process.pid):
+            try:
+                with open(f'/proc/{pid}/status', 'r') as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            rss_kb += int(line.split()[1])
+                            break
+            except (OSError, ValueError):
+                continue
+        return rss_kb * 1024
+
+    def _recycle_if_required(self) -> None:
+        """
+        Restart the browser after the configured number of renders or once it exceeds the rss limit.
+        :return:
+        """
+        if self._renders >= self._max_renders:
+            log.debug(f'Recycling chromium after {self._renders} renders.', module=Module.RENDER)
+            self._stop()
+            return
+        rss = self._get_rss_bytes()
+        if self._max_rss_bytes and rss > self._max_rss_bytes:
+            log.debug(f'Recycling chromium, rss of {rss // (1024 * 1024)} MB exceeds limit.', module=Module.RENDER)
+            self._stop()
+
+    def render_element(self, html: str, selector: str) -> bytes:
+        """
+        Render the given html and screenshot the first element matching the selector.
+        :param html: the html document to render.
+        :param selector: css selector of the element to capture.
+        :return: the png bytes of the element.
+        """
+        with self._lock:
+            if self._driver is None:
+                self._start()
+            try:
+                self._driver.execute_cdp_cmd('Page.setDocumentContent', {'frameId': self._frame_id, 'html': html})
+                self._driver.execute_async_script(_WAIT_FOR_IMAGES_JS)
+                rect: Optional[List[float]] = self._driver.execute_script(_ELEMENT_RECT_JS, selector)
+                if rect is None:
+                    raise Exception(f'Element {selector} not found in rendered html.')
+                x, y, width, height = rect
+                screenshot = self._driver.execute_cdp_cmd('Page.captureScreenshot', {
+                    'format': 'png',
+                    'captureBeyondViewport': True,
+                    'clip': {'x': x, 'y': y, 'width': width, 'height': height, 'scale': 1}
+                })
+                self._renders += 1
+            except Exception:
+                # Browser is in an unknown state, start a fresh one on the next render.
+                self._stop()
+                raise
+            self._recycle_if_required()
+            return base64.b64decode(screenshot['data'])
+
+    def shutdown(self) -> None:
+        """
+        Stop the browser. It is restarted on the next render.
+        :return:
+        """
+        with self._lock:
+            self._stop()
+
+    def __init__(self):
+        """
+        Default constructor. The browser is started lazily on the first render.
+        """
+        self._browser_path: str = config.chromium_executable_path
+        self._window_size = (600, 400)
+        self._timeout_seconds: int = 10
+        self._max_renders: int = config.chromium_max_renders
+        self._max_rss_bytes: int = config.chromium_max_rss_mb * 1024 * 1024
+        self._driver: Optional[webdriver.Chrome] = None
+        self._frame_id: Optional[str] = None
+        self._renders: int = 0
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+
+render_service: ChromiumRenderService = ChromiumRenderService()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+import io
+import os
+import time
+import hashlib
+from typing import Tuple, List, Optional, Union
+
+from PIL import Image
+
+import config
+from caching.render_cache import RenderCache
+from logging_framework.log_handler import log, Module
+
+_MIME_TYPES = {'png': 'image/png', 'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+
+
+class ImageProfile:
+    """
+    The image formats and limits a platform accepts.
+    """
+
+    @property
+    def key(self) -> str:
+        return f'{"-".join(self.formats)}:{self.max_side}:{self.max_bytes}:{self.quality}'
+
+    def __init__(self, formats: Tuple[str, ...], max_side: int, max_bytes: int, quality: int = 85):
+        """
+        Default constructor.
+        :param formats: the accepted formats, any of png, jpeg and webp.
+        :param max_side: larger images are scaled down to fit.
+        :param max_bytes: the maximum upload size.
+        :param quality: the quality of the lossy formats.
+        """
+        self.formats: Tuple[str, ...] = formats
+        self.max_side: int = max_side
+        self.max_bytes: int = max_bytes
+        self.quality: int = quality
+
+
+class ImageVariant:
+    """
+    An encoded image.
+    """
+
+    @property
+    def mime_type(self) -> str:
+        return _MIME_TYPES[self.format]
+
+    @property
+    def filename(self) -> str:
+        return f'image.{"jpg" if self.format == "jpeg" else self.format}'
+
+    def __init__(self, data: Union[bytes, memoryview], image_format: str):
+        self.data: Union[bytes, memoryview] = data
+        self.format: str = image_format
+
+
+def _detect_format(data: Union[bytes, memoryview]) -> Optional[str]:
+    header = bytes(data[:12])
+    if header.startswith(b'\x89PNG'):
+        return 'png'
+    if header.startswith(b'\xff\xd8'):
+        return 'jpeg'
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def _has_transparency(image: Image.Image) -> bool:
+    if image.mode in ('RGBA', 'LA'):
+        return image.getchannel('A').getextrema()[0] < 255
+    return image.mode == 'P' and 'transparency' in image.info
+
+
+def _encode(image: Image.Image, image_format: str, quality: int) -> bytes:
+    output = io.BytesIO()
+    if image_format == 'png':
+        image.save(output, format='PNG', optimize=True)
+    elif image_format == 'jpeg':
+        image.convert('RGB').save(output, format='JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(output, format='WEBP', quality=quality, method=6)
+    return output.getvalue()
+
+
+class ImageOptimiser:
+    """
+    Builds the smallest encoding of an image a platform accepts, once per image and platform.
+    Variants are cached by the hash of the source image, so a changed source file gets new variants.
+    """
+
+    def _build(self, image_data: Union[bytes, memoryview], profile: ImageProfile) -> ImageVariant:
+        """
+        Encode the image in all accepted formats and pick the smallest one within the size limit.
+        :param image_data: the source image.
+        :param profile: the platform's limits.
+        :return: the variant.
+        """
+        start = time.perf_counter()
+        with Image.open(io.BytesIO(image_data)) as image:
+            image.load()
+            resized: bool = max(image.size) > profile.max_side
+            if resized:
+                image.thumbnail((profile.max_side, profile.max_side), Image.LANCZOS)
+            transparent: bool = _has_transparency(image)
+            candidates: List[ImageVariant] = []
+            source_format: Optional[str] = _detect_format(image_data)
+            if not resized and source_format in profile.formats:
+                candidates.append(ImageVariant(image_data, source_format))
+            for image_format in profile.formats:
+                # JPEG cannot represent transparent pixels
+                if image_format == 'jpeg' and transparent:
+                    continue
+                candidates.append(ImageVariant(_encode(image, image_format, profile.quality), image_format))
+        fitting = [variant for variant in candidates if len(variant.data) <= profile.max_bytes] or candidates
+        best: ImageVariant = min(fitting, key=lambda variant: len(variant.data))
+        log.debug(f'Encoded image variant in {(time.perf_counter() - start) * 1000:.0f} ms:',
+                  f'{len(image_data)} -> {len(best.data)} bytes ({best.format}).', module=Module.RENDER)
+        return best
+
+    def get_variant(self, image_data: Union[bytes, memoryview], profile: Optional[ImageProfile]) -> ImageVariant:
+        """
+        Get the smallest variant of an image the platform accepts.
+        :param image_data: the source image.
+        :param profile: the platform's limits. None, or a disabled optimisation, returns the source image.
+        :return: the variant.
+        """
+        source_format: str = _detect_format(image_data) or 'png'
+        if profile is None or not self._enabled:
+            return ImageVariant(image_data, source_format)
+        cache_key: str = f'{hashlib.sha256(image_data).hexdigest()}:{profile.key}'
+        cached: Optional[bytes] = self._cache.get(cache_key)
+        if cached is not None:
+            return ImageVariant(cached, _detect_format(cached) or source_format)
+        try:
+            variant = self._build(image_data, profile)
+        except Exception as e:
+            log.error('Error encoding image variant, sending the source image. Trace:', e, module=Module.RENDER)
+            return ImageVariant(image_data, source_format)
+        self._cache.put(cache_key, bytes(variant.data))
+        return variant
+
+    def __init__(self, enabled: bool):
+        self._enabled: bool = enabled
+        self._cache: RenderCache = RenderCache(
+            directory=os.path.join(config.data_dir, 'image_variants'),
+            max_bytes=config.render_cache_max_mb * 1024 * 1024,
+            max_age_seconds=0,
+            memory_entries=32,
+            name='Image variant cache'
+        )
+
+
+image_optimiser: ImageOptimiser = ImageOptimiser(enabled=config.image_optimisation_enabled)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+
+class Clock:
+    """
+    The current time as seen by the schedule and the D&D events. Real time by default; the replay runner sets a
+    virtual time instead, to drive the events through any time range without waiting.
+    Delivery bookkeeping (outbox retries, state retention, cache ages) always uses real time.
+    """
+
+    @property
+    def is_virtual(self) -> bool:
+        return self._virtual_ms is not None
+
+    def now_ms(self) -> int:
+        """
+        :return: the current time as epoch milliseconds.
+        """
+        virtual_ms: Optional[int] = self._virtual_ms
+        return int(time.time() * 1000) if virtual_ms is None else virtual_ms
+
+    def now(self) -> datetime:
+        """
+        :return: the current time in UTC.
+        """
+        return datetime.fromtimestamp(self.now_ms() / 1000, tz=timezone.utc)
+
+    def set_virtual(self, now_ms: Optional[int]) -> None:
+        """
+        Freeze the clock at a virtual time, which only changes when it is set again.
+        :param now_ms: the virtual time as epoch milliseconds, None returns to real time.
+        :return:
+        """
+        self._virtual_ms = now_ms
+
+    def __init__(self):
+        self._virtual_ms: Optional[int] = None
+
+
+clock: Clock = Clock()
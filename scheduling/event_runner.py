@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from typing import Callable, List, Optional, Tuple
+
+import config
+from logging_framework.log_handler import log, Module
+from metrics.metrics import metrics, EVENT_FAILURES
+
+# Runs an event. The event is passed set to stop early, for instance before sending a late notification.
+EventTask = Callable[[threading.Event], None]
+
+# Overlap policies, applied if an event is due while its previous run has not finished yet
+OVERLAP_SKIP: str = 'skip'
+OVERLAP_ALLOW: str = 'allow'
+
+
+class EventResult:
+    """
+    Outcome of a single event in a run.
+    """
+
+    def __init__(self, event: str, status: str, duration_ms: float, error: Optional[str] = None):
+        self.event: str = event
+        # One of ok, failed, timed out, skipped
+        self.status: str = status
+        self.duration_ms: float = duration_ms
+        self.error: Optional[str] = error
+
+    def __str__(self) -> str:
+        status = self.status if self.error is None else f'{self.status} ({self.error})'
+        return f'{self.event}: {status} in {self.duration_ms:.0f} ms'
+
+
+class RunSummary:
+    """
+    Outcome of all events of a run.
+    """
+
+    @property
+    def succeeded(self) -> bool:
+        return all(result.status == 'ok' for result in self.results)
+
+    def __str__(self) -> str:
+        return ', '.join(str(result) for result in self.results)
+
+    def __init__(self, results: List[EventResult], duration_ms: float):
+        self.results: List[EventResult] = results
+        self.duration_ms: float = duration_ms
+
+
+class EventRunner:
+    """
+    Runs D&D events concurrently in a bounded worker pool, so a slow or hung event does not delay the others
+    or block the scheduler thread. Every event has its own deadline; once it passes, the event is reported as
+    timed out and told to stop, and is not started at all if it was still waiting for a worker.
+    """
+
+    def _execute(self, event_name: str, task: EventTask, cancelled: threading.Event) -> Tuple[float, Optional[str]]:
+        """
+        Run an event in a worker.
+        :return: the duration in ms and the error, if any.
+        """
+        start = time.perf_counter()
+        error: Optional[str] = None
+        try:
+            task(cancelled)
+        except Exception as e:
+            metrics.inc(EVENT_FAILURES, event=event_name)
+            log.error(f'Error executing event {event_name}. Trace: {e}', module=Module.SCHEDULER)
+            error = str(e)
+        finally:
+            with self._lock:
+                self._running.discard(event_name)
+        return (time.perf_counter() - start) * 1000, error
+
+    def _submit(self, event_name: str, task: EventTask, cancelled: threading.Event) -> Optional[Future]:
+        """
+        Submit an event unless the overlap policy skips it.
+        :return: the future, None if the event was skipped.
+        """
+        with self._lock:
+            if self._overlap_policy == OVERLAP_SKIP and event_name in self._running:
+                return None
+            self._running.add(event_name)
+        return self._executor.submit(self._execute, event_name, task, cancelled)
+
+    def run(self, run_name: str, events: List[Tuple[str, EventTask, float]]) -> RunSummary:
+        """
+        Run the events and wait for each until it finished or its deadline passed.
+        :param run_name: the name of the run, for logging.
+        :param events: the event name, the task and its deadline in seconds, for every event.
+        :return: the summary of the run, which is also logged.
+        """
+        start = time.perf_counter()
+        submitted: List[Tuple[str, Optional[Future], threading.Event, float]] = []
+        for event_name, task, deadline_seconds in events:
+            cancelled = threading.Event()
+            submitted.append((event_name, self._submit(event_name, task, cancelled), cancelled,
+                              start + deadline_seconds))
+
+        results: List[EventResult] = []
+        for event_name, future, cancelled, deadline in submitted:
+            if future is None:
+                log.warning(f'Previous run of event {event_name} is still in progress, skipping.',
+                            module=Module.SCHEDULER)
+                results.append(EventResult(event_name, 'skipped', 0, 'previous run in progress'))
+                continue
+            try:
+                duration_ms, error = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+                results.append(EventResult(event_name, 'ok' if error is None else 'failed', duration_ms, error))
+            except FutureTimeoutError:
+                cancelled.set()
+                if future.cancel():
+                    with self._lock:
+                        self._running.discard(event_name)
+                    log.error(f'Event {event_name} missed its deadline before it could start.', module=Module.SCHEDULER)
+                else:
+                    log.error(f'Event {event_name} missed its deadline, abandoning it.', module=Module.SCHEDULER)
+                metrics.inc(EVENT_FAILURES, event=event_name)
+                results.append(EventResult(event_name, 'timed out', (time.perf_counter() - start) * 1000))
+
+        summary = RunSummary(results, (time.perf_counter() - start) * 1000)
+        log.info(f'{run_name} finished in {summary.duration_ms:.0f} ms: {summary}', module=Module.SCHEDULER)
+        return summary
+
+    def __init__(self, workers: int, overlap_policy: str = OVERLAP_SKIP):
+        """
+        Default constructor.
+        :param workers: maximum number of events running at the same time.
+        :param overlap_policy: OVERLAP_SKIP to skip an event while its previous run is in progress,
+        OVERLAP_ALLOW to run it regardless.
+        """
+        self._overlap_policy: str = overlap_policy
+        self._running = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dnd-event')
+
+
+event_runner: EventRunner = EventRunner(workers=config.event_workers, overlap_policy=config.event_overlap_policy)
@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+from datetime import datetime, timezone
+
+from apscheduler.triggers.cron import CronTrigger
+
+import config
+
+# 6 AM to ensure community events have correct information.
+daily_trigger: CronTrigger = CronTrigger(hour=6, minute=0, timezone=config.scheduler_timezone)
+# 30 minutes to next hour.
+hourly_trigger: CronTrigger = CronTrigger(minute=30, timezone=config.scheduler_timezone)
+
+
+def get_next_fire_ms(trigger: CronTrigger, now_ms: int) -> int:
+    """
+    :param trigger: a schedule's trigger.
+    :param now_ms: the time to start from as epoch milliseconds.
+    :return: the first time at or after the given time the schedule is due, as epoch milliseconds.
+    """
+    fire_time: datetime = trigger.get_next_fire_time(None, datetime.fromtimestamp(now_ms / 1000, tz=timezone.utc))
+    return int(fire_time.timestamp() * 1000)
@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
 from abc import ABC
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # Only needed by adapters sending images, which import it themselves
+    from rendering.image_variants import ImageProfile
 
 
 class AbstractSocialMediaAdapter(ABC):
@@ -8,12 +12,44 @@ class AbstractSocialMediaAdapter(ABC):
     Template for social media adapters.
     """
 
-    def notify(self, message: str, flags: Dict[str, Any], delete_previous_key: Optional[str] = None) -> None:
+    # Name used in dispatch results and logs.
+    name: str = 'Adapter'
+    # Maximum time the dispatcher waits for a single notification to be delivered.
+    notify_timeout_seconds: float = 30
+    # Image formats and limits of the platform, used to pick the smallest image variant. None sends images as is.
+    image_profile: Optional['ImageProfile'] = None
+
+    @staticmethod
+    def get_image(flags: Dict[str, Any]) -> Optional[Union[bytes, memoryview]]:
+        """
+        Get the image attachment of a notification.
+        :param flags: the notification flags. The image is given as in-memory buffer in flags['image_data'],
+        or, for backward compatibility, as file in flags['filepath'].
+        :return: the image, None if the notification has none.
+        """
+        if not flags.get('image'):
+            return None
+        if flags.get('image_data') is not None:
+            return flags['image_data']
+        with open(flags['filepath'], 'rb') as f:
+            return f.read()
+
+    def notify(
+            self,
+            message: str,
+            flags: Dict[str, Any],
+            delete_previous_key: Optional[str] = None,
+            recipients: Optional[List[str]] = None
+    ) -> Optional[Union[bool, List[str]]]:
         """
         Default public facing method, used to send D&D notifications.
         :param message: the message to send.
-        :param flags: Dictionary with optional file attachments.
+        :param flags: Dictionary with optional attachments, see get_image.
         :param delete_previous_key: optional key name for deleting previously sent message. Key name = event type.
-        :return:
+        :param recipients: only send to these recipients, for instance chat ids, when retrying the ones a previous
+        attempt returned as failed. Only passed to adapters returning failed recipients. None sends to all.
+        :return: optionally whether the notification was delivered. None counts as delivered.
+        Adapters with several recipients may instead return the recipients it was not delivered to, so only those
+        are retried. An empty list counts as delivered.
         """
         pass
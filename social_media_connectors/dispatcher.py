@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional, List, Tuple
+
+from logging_framework.log_handler import log, Module
+from social_media_connectors.AbstractSocialMediaAdapter import AbstractSocialMediaAdapter
+
+
+class AdapterResult:
+    """
+    Outcome of a single adapter's notification.
+    """
+
+    def __init__(self, adapter: str, success: bool, latency_ms: float, error: Optional[str] = None,
+                 failed_recipients: Optional[List[str]] = None, running: Optional[Future] = None):
+        self.adapter: str = adapter
+        self.success: bool = success
+        self.latency_ms: float = latency_ms
+        self.error: Optional[str] = error
+        # The recipients the notification was not delivered to, if the adapter reports them
+        self.failed_recipients: Optional[List[str]] = failed_recipients
+        # Set if the adapter timed out, resolves to the result of _notify once the adapter finished after all
+        self.running: Optional[Future] = running
+
+    def __str__(self) -> str:
+        status = 'ok' if self.success else f'failed ({self.error})'
+        return f'{self.adapter}: {status} in {self.latency_ms:.0f} ms'
+
+
+class DispatchResult:
+    """
+    Outcome of a notification sent to all adapters.
+    """
+
+    @property
+    def succeeded(self) -> bool:
+        return all(result.success for result in self.results)
+
+    def __str__(self) -> str:
+        return ', '.join(str(result) for result in self.results)
+
+    def __init__(self, results: List[AdapterResult]):
+        self.results: List[AdapterResult] = results
+
+
+class NotificationDispatcher:
+    """
+    Sends notifications to all adapters concurrently, so a slow platform does not delay the others.
+    """
+
+    @staticmethod
+    def _notify(
+            adapter: AbstractSocialMediaAdapter,
+            message: str,
+            flags: Dict[str, Any],
+            delete_previous_key: Optional[str],
+            recipients: Optional[List[str]]
+    ) -> Tuple[bool, float, Optional[str], Optional[List[str]]]:
+        """
+        Run a single adapter's notify and time it.
+        :return: whether the notification was delivered, the latency in ms, the error, if any, and the recipients
+        it was not delivered to, if the adapter reports them.
+        """
+        start = time.perf_counter()
+        failed_recipients: Optional[List[str]] = None
+        try:
+            # Only adapters reporting failed recipients are ever given recipients
+            kwargs: Dict[str, Any] = {} if recipients is None else {'recipients': recipients}
+            delivered = adapter.notify(message=message, flags=flags, delete_previous_key=delete_previous_key,
+                                       **kwargs)
+            if isinstance(delivered, list):
+                failed_recipients = delivered
+                error = f'not delivered to {len(delivered)} recipients' if delivered else None
+            else:
+                error = None if delivered is not False else 'not delivered'
+        except Exception as e:
+            error = str(e)
+        return error is None, (time.perf_counter() - start) * 1000, error, failed_recipients
+
+    def dispatch(
+            self,
+            adapters: List[AbstractSocialMediaAdapter],
+            message: str,
+            flags: Dict[str, Any],
+            delete_previous_key: Optional[str] = None,
+            recipients: Optional[Dict[str, List[str]]] = None
+    ) -> DispatchResult:
+        """
+        Send a notification to all adapters and wait for each up to its own timeout.
+        :param adapters: the adapters to notify.
+        :param message: the message to send.
+        :param flags: Dictionary with optional file attachments.
+        :param delete_previous_key: optional key name for deleting previously sent message.
+        :param recipients: optionally the recipients per adapter name, see AbstractSocialMediaAdapter.notify.
+        :return: the per-adapter results.
+        """
+        start = time.perf_counter()
+        futures: List[Tuple[AbstractSocialMediaAdapter, Future]] = [
+            (adapter, self._executor.submit(self._notify, adapter, message, flags, delete_previous_key,
+                                            (recipients or {}).get(adapter.name)))
+            for adapter in adapters
+        ]
+        results: List[AdapterResult] = []
+        for adapter, future in futures:
+            remaining = adapter.notify_timeout_seconds - (time.perf_counter() - start)
+            try:
+                success, latency_ms, error, failed_recipients = future.result(timeout=max(0.0, remaining))
+                results.append(AdapterResult(adapter.name, success, latency_ms, error, failed_recipients))
+            except FutureTimeoutError:
+                # The worker keeps running in the background, it cannot be interrupted.
+                log.error(f'Adapter {adapter.name} did not finish within {adapter.notify_timeout_seconds}s.',
+                          module=Module.DISPATCH)
+                results.append(AdapterResult(adapter.name, False, (time.perf_counter() - start) * 1000, 'timeout',
+                                             running=future))
+        return DispatchResult(results)
+
+    def __init__(self, max_workers: int = 8):
+        """
+        Default constructor.
+        :param max_workers: the maximum number of concurrently running notifications.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='notify')
+
+
+dispatcher: NotificationDispatcher = NotificationDispatcher()
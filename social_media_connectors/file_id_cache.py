@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+import os
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from logging_framework.log_handler import log, Module
+from storage.json_file import load_json, save_json
+
+
+class FileIdCache:
+    """
+    Persistent mapping of file content hashes to the ids a platform assigned to previous uploads.
+    Lets adapters reference already uploaded files instead of sending the bytes again.
+    """
+
+    @staticmethod
+    def get_content_hash(data: bytes) -> str:
+        """
+        Hash the given file content.
+        :param data: the file content.
+        :return: the hex digest.
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    def _load(self) -> Dict[str, str]:
+        """
+        Load the cache file, if present.
+        :return: the cached content hash to file id mapping.
+        """
+        try:
+            return load_json(self._filepath, {})
+        except Exception as e:
+            log.error('Error loading file id cache, starting empty. Trace:', e, module=Module.CACHE)
+            return {}
+
+    def _save(self) -> None:
+        """
+        Write the cache file.
+        :return:
+        """
+        try:
+            save_json(self._filepath, self._file_ids)
+        except OSError as e:
+            log.error('Error saving file id cache. Trace:', e, module=Module.CACHE)
+
+    def get(self, content_hash: str) -> Optional[str]:
+        with self._lock:
+            return self._file_ids.get(content_hash)
+
+    def put(self, content_hash: str, file_id: str) -> None:
+        """
+        Remember the file id of an upload. The oldest entries are dropped once the cache is full.
+        :param content_hash: the hash of the uploaded content.
+        :param file_id: the id assigned by the platform.
+        :return:
+        """
+        with self._lock:
+            self._file_ids.pop(content_hash, None)
+            self._file_ids[content_hash] = file_id
+            while len(self._file_ids) > self._max_entries:
+                del self._file_ids[next(iter(self._file_ids))]
+            self._save()
+
+    def invalidate(self, content_hash: str) -> None:
+        """
+        Forget a file id, for instance after the platform rejected it.
+        :param content_hash: the hash of the content.
+        :return:
+        """
+        with self._lock:
+            if self._file_ids.pop(content_hash, None) is not None:
+                self._save()
+
+    def __init__(self, filepath: str, max_entries: int = 256):
+        """
+        Default constructor.
+        :param filepath: the json file the cache is persisted to.
+        :param max_entries: the maximum number of cached file ids.
+        """
+        self._filepath: str = filepath
+        self._max_entries: int = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self._filepath), exist_ok=True)
+        self._file_ids: Dict[str, str] = self._load()
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+import config
+from logging_framework.log_handler import log, Module
+from plugins.registry import registry, ADAPTER
+from scheduling.clock import clock
+from social_media_connectors.AbstractSocialMediaAdapter import AbstractSocialMediaAdapter
+from social_media_connectors.dispatcher import dispatcher, DispatchResult, AdapterResult
+from storage.state_store import state_store
+
+_SCHEMA: str = '''
+CREATE TABLE IF NOT EXISTS notifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event TEXT NOT NULL,
+    period TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    delete_key TEXT,
+    message TEXT NOT NULL,
+    image BLOB,
+    flags TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    notification_id INTEGER NOT NULL,
+    adapter TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    recipients TEXT,
+    PRIMARY KEY (notification_id, adapter)
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+'''
+
+# Outbox entry states
+PENDING: str = 'pending'
+# An attempt that outlived the dispatcher's timeout and is still running, it is not retried until it finished
+SENDING: str = 'sending'
+SENT: str = 'sent'
+DROPPED: str = 'dropped'
+# (error, the recipients it was not delivered to) per adapter
+_Outcomes = Dict[str, Tuple[Optional[str], Optional[List[str]]]]
+
+
+class Outbox:
+    """
+    Durable outbox of notifications. Notifications are stored per adapter before they are sent, and a background
+    worker delivers them, retrying failed deliveries with exponential backoff. Pending deliveries survive restarts.
+    Adapters reporting the recipients a notification was not delivered to are retried for those recipients only.
+    A notification still pending when a newer one with the same delete key is enqueued is superseded and dropped.
+    Notifications about a point in time, such as the next flash event, are dropped once that time has passed.
+    Once every adapter delivered a notification, it is recorded in the state store and removed from the outbox.
+    """
+
+    def _get_backoff(self, attempts: int) -> float:
+        """
+        :param attempts: the failed attempts so far.
+        :return: the seconds until the next attempt.
+        """
+        return min(self._retry_max_seconds, self._retry_base_seconds * 2 ** (attempts - 1))
+
+    def _settle(self, notification_ids: List[int]) -> None:
+        """
+        Remove notifications without pending deliveries, recording those delivered by every adapter.
+        Must be called with the lock held.
+        :param notification_ids: the notifications to check.
+        :return:
+        """
+        for notification_id in set(notification_ids):
+            statuses = [row[0] for row in self._connection.execute(
+                'SELECT status FROM outbox WHERE notification_id = ?', (notification_id,))]
+            if PENDING in statuses or SENDING in statuses:
+                continue
+            if statuses and all(status == SENT for status in statuses):
+                event, period, content_hash = self._connection.execute(
+                    'SELECT event, period, content_hash FROM notifications WHERE id = ?', (notification_id,)
+                ).fetchone()
+                state_store.record_delivery(event, period, content_hash)
+            self._connection.execute('DELETE FROM outbox WHERE notification_id = ?', (notification_id,))
+            self._connection.execute('DELETE FROM notifications WHERE id = ?', (notification_id,))
+
+    def enqueue(
+            self,
+            adapters: List[str],
+            event: str,
+            period: str,
+            content_hash: str,
+            message: str,
+            image: Optional[Union[bytes, memoryview]],
+            flags: Optional[Dict[str, Any]] = None,
+            delete_key: Optional[str] = None
+    ) -> None:
+        """
+        Store a notification for delivery by the background worker and return immediately.
+        :param adapters: the names of the adapters to deliver to.
+        :param event: the event name.
+        :param period: the period the notification belongs to.
+        :param content_hash: the content hash, recorded once the notification was delivered.
+        :param message: the message.
+        :param image: the image attachment, if any.
+        :param flags: the other notification flags, passed on to the adapters. Must be json serializable.
+        :param delete_key: optional key name for deleting previously sent message. Also used to drop superseded
+        notifications that are still pending.
+        :return:
+        """
+        now: float = time.time()
+        extra_flags: Dict[str, Any] = {key: value for key, value in (flags or {}).items()
+                                       if key not in ('image', 'image_data', 'filepath')}
+        with self._lock, self._connection:
+            if delete_key is not None:
+                superseded = self._connection.execute(
+                    'SELECT o.notification_id, o.adapter FROM outbox o '
+                    'JOIN notifications n ON n.id = o.notification_id '
+                    'WHERE n.delete_key = ? AND o.status = ?', (delete_key, PENDING)
+                ).fetchall()
+                superseded = [(notification_id, adapter) for notification_id, adapter in superseded
+                              if adapter in adapters]
+                if superseded:
+                    self._connection.executemany(
+                        'UPDATE outbox SET status = ? WHERE notification_id = ? AND adapter = ?',
+                        [(DROPPED, notification_id, adapter) for notification_id, adapter in superseded])
+                    self._settle([notification_id for notification_id, _ in superseded])
+                    log.info(f'Dropped {len(superseded)} superseded pending deliveries of {delete_key}.',
+                             module=Module.OUTBOX)
+            notification_id = self._connection.execute(
+                'INSERT INTO notifications '
+                '(event, period, content_hash, delete_key, message, image, flags, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (event, period, content_hash, delete_key, message, None if image is None else bytes(image),
+                 json.dumps(extra_flags), now)
+            ).lastrowid
+            self._connection.executemany(
+                'INSERT INTO outbox (notification_id, adapter, status, next_attempt_at) VALUES (?, ?, ?, ?)',
+                [(notification_id, adapter, PENDING, now) for adapter in adapters])
+            if not adapters:
+                self._settle([notification_id])
+        self.start()
+        self._wakeup.set()
+
+    def is_pending(self, event: str, period: str, content_hash: Optional[str] = None) -> bool:
+        """
+        Check whether a notification is waiting for delivery.
+        :param event: the event name.
+        :param period: the period the notification belongs to.
+        :param content_hash: optionally only match this content.
+        :return: true if a (matching) notification has pending deliveries.
+        """
+        query = ('SELECT 1 FROM notifications n JOIN outbox o ON o.notification_id = n.id '
+                 'WHERE n.event = ? AND n.period = ? AND o.status IN (?, ?)')
+        params = [event, period, PENDING, SENDING]
+        if content_hash is not None:
+            query += ' AND n.content_hash = ?'
+            params.append(content_hash)
+        with self._lock:
+            return self._connection.execute(query + ' LIMIT 1', params).fetchone() is not None
+
+    def get_stats(self) -> Tuple[int, float]:
+        """
+        :return: the number of pending deliveries, including those still being sent, and the age of the oldest one
+        in seconds.
+        """
+        with self._lock:
+            depth, oldest = self._connection.execute(
+                'SELECT COUNT(*), MIN(n.created_at) FROM outbox o JOIN notifications n ON n.id = o.notification_id '
+                'WHERE o.status IN (?, ?)', (PENDING, SENDING)
+            ).fetchone()
+        return depth, 0.0 if oldest is None else max(0.0, time.time() - oldest)
+
+    def _log_stats(self) -> None:
+        depth, age = self.get_stats()
+        if depth:
+            log.info(f'Outbox: {depth} pending deliveries, oldest {age:.0f}s.', module=Module.OUTBOX)
+        self._stats_logged_at = time.monotonic()
+
+    def _get_due(self) -> List[Tuple[int, Dict[str, Any], Dict[str, Optional[List[str]]]]]:
+        """
+        :return: the notifications with due deliveries and their adapters with the recipients to send to
+        (None for all), oldest first.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                'SELECT notification_id, adapter, recipients FROM outbox WHERE status = ? AND next_attempt_at <= ? '
+                'ORDER BY notification_id', (PENDING, time.time())
+            ).fetchall()
+            due: Dict[int, Dict[str, Optional[List[str]]]] = {}
+            for notification_id, adapter, recipients in rows:
+                due.setdefault(notification_id, {})[adapter] = None if recipients is None else json.loads(recipients)
+            notifications = []
+            for notification_id, adapters in due.items():
+                event, delete_key, message, image, flags = self._connection.execute(
+                    'SELECT event, delete_key, message, image, flags FROM notifications WHERE id = ?',
+                    (notification_id,)
+                ).fetchone()
+                notifications.append((notification_id, {
+                    'event': event, 'delete_key': delete_key, 'message': message, 'image': image,
+                    'flags': json.loads(flags) if flags else {}
+                }, adapters))
+        return notifications
+
+    def _deliver(self, notification_id: int, notification: Dict[str, Any],
+                 adapter_recipients: Dict[str, Optional[List[str]]]) -> None:
+        """
+        Send a notification to its due adapters and update the outbox with the outcome.
+        :param notification_id: the notification.
+        :param notification: the stored notification.
+        :param adapter_recipients: the adapters to send to, with the recipients to send to (None for all).
+        :return:
+        """
+        localised: Optional[Dict[str, Any]] = notification['flags'].get('localised')
+        if localised is not None and clock.now_ms() >= localised['timestamp_ms']:
+            # The countdown would be rendered for a point in time that has passed
+            log.error(f'Dropping notification for event {notification["event"]} to '
+                      f'{", ".join(adapter_recipients)}, the time it announces has passed.', module=Module.OUTBOX)
+            self._drop(notification_id, list(adapter_recipients))
+            return
+        adapters: Dict[str, Optional[AbstractSocialMediaAdapter]] = {
+            name: registry.get(ADAPTER, name) for name in adapter_recipients
+        }
+        available: Dict[str, AbstractSocialMediaAdapter] = {
+            name: adapter for name, adapter in adapters.items() if adapter is not None
+        }
+        image: Optional[bytes] = notification['image']
+        result: DispatchResult = dispatcher.dispatch(
+            list(available.values()),
+            message=notification['message'],
+            flags={**notification['flags'], 'image': image is not None, 'image_data': image},
+            delete_previous_key=notification['delete_key'],
+            recipients={adapter.name: adapter_recipients[name] for name, adapter in available.items()
+                        if adapter_recipients[name] is not None}
+        )
+        log.info(f'Notified adapters for event {notification["event"]}: {result}', module=Module.OUTBOX)
+        results: Dict[str, AdapterResult] = {result.adapter: result for result in result.results}
+        outcomes: _Outcomes = {}
+        running: Dict[str, Future] = {}
+        for name, adapter in adapters.items():
+            adapter_result: Optional[AdapterResult] = None if adapter is None else results.get(adapter.name)
+            if adapter is None:
+                outcomes[name] = ('adapter not available', None)
+            elif adapter_result is None:
+                outcomes[name] = ('no result', None)
+            elif adapter_result.running is not None:
+                running[name] = adapter_result.running
+            else:
+                outcomes[name] = (None if adapter_result.success else adapter_result.error,
+                                  adapter_result.failed_recipients)
+        self._record_outcomes(notification_id, outcomes, running)
+
+    def _drop(self, notification_id: int, adapters: List[str]) -> None:
+        """
+        Give up on the deliveries of a notification without sending them.
+        :param notification_id: the notification.
+        :param adapters: the adapters to give up on.
+        :return:
+        """
+        with self._lock, self._connection:
+            self._connection.executemany('UPDATE outbox SET status = ? WHERE notification_id = ? AND adapter = ?',
+                                         [(DROPPED, notification_id, adapter) for adapter in adapters])
+            self._settle([notification_id])
+
+    def _record_outcomes(self, notification_id: int, outcomes: _Outcomes,
+                         running: Optional[Dict[str, Future]] = None) -> None:
+        """
+        Update the outbox with the outcome of a delivery attempt.
+        :param notification_id: the notification.
+        :param outcomes: the error and the failed recipients per adapter.
+        :param running: the attempts still running after the dispatcher's timeout per adapter. They are not
+        retried, their outcome is recorded once they finished.
+        :return:
+        """
+        now: float = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute('SELECT event, created_at FROM notifications WHERE id = ?',
+                                           (notification_id,)).fetchone()
+            if row is None:
+                # Superseded by a newer notification while it was being sent
+                return
+            event, created_at = row
+            for name, future in (running or {}).items():
+                self._connection.execute('UPDATE outbox SET status = ? WHERE notification_id = ? AND adapter = ?',
+                                         (SENDING, notification_id, name))
+                self._running[(notification_id, name)] = future
+                future.add_done_callback(lambda _: self._wakeup.set())
+                log.warning(f'Delivery of event {event} to {name} is still running, waiting for it before '
+                            f'retrying.', module=Module.OUTBOX)
+            for name, (error, failed_recipients) in outcomes.items():
+                if error is None:
+                    self._connection.execute('UPDATE outbox SET status = ? WHERE notification_id = ? AND adapter = ?',
+                                             (SENT, notification_id, name))
+                    continue
+                attempts: int = self._connection.execute(
+                    'SELECT attempts FROM outbox WHERE notification_id = ? AND adapter = ?', (notification_id, name)
+                ).fetchone()[0] + 1
+                if now - created_at > self._max_age_seconds:
+                    log.error(f'Giving up on notification for event {event} to {name} after '
+                              f'{attempts} attempts. Last error: {error}', module=Module.OUTBOX)
+                    status, next_attempt_at = DROPPED, now
+                else:
+                    status, next_attempt_at = PENDING, now + self._get_backoff(attempts)
+                    log.warning(f'Delivery of event {event} to {name} failed ({error}), '
+                                f'retry {attempts} in {next_attempt_at - now:.0f}s.', module=Module.OUTBOX)
+                # Recipients that were delivered to are not sent to again
+                self._connection.execute(
+                    'UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, '
+                    'recipients = COALESCE(?, recipients) WHERE notification_id = ? AND adapter = ?',
+                    (status, attempts, next_attempt_at, error,
+                     json.dumps(failed_recipients) if failed_recipients else None, notification_id, name))
+            self._settle([notification_id])
+
+    def _collect_finished(self) -> None:
+        """
+        Record the outcome of attempts that outlived the dispatcher's timeout and have finished since.
+        :return:
+        """
+        with self._lock:
+            finished = [(key, future) for key, future in self._running.items() if future.done()]
+            for key, _ in finished:
+                del self._running[key]
+        for (notification_id, name), future in finished:
+            success, _, error, failed_recipients = future.result()
+            log.info(f'Delayed delivery to {name} finished: {"ok" if success else error}', module=Module.OUTBOX)
+            self._record_outcomes(notification_id, {name: (None if success else error, failed_recipients)})
+
+    def _get_next_attempt_in(self) -> Optional[float]:
+        """
+        :return: the seconds until the next pending delivery is due, None if there is none.
+        """
+        with self._lock:
+            next_attempt_at = self._connection.execute('SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?',
+                                                       (PENDING,)).fetchone()[0]
+        return None if next_attempt_at is None else max(0.0, next_attempt_at - time.time())
+
+    def _run(self) -> None:
+        """
+        Worker loop, sleeping until the next delivery is due or a notification is enqueued.
+        :return:
+        """
+        while True:
+            try:
+                self._collect_finished()
+                for notification_id, notification, adapters in self._get_due():
+                    self._deliver(notification_id, notification, adapters)
+                if time.monotonic() - self._stats_logged_at >= self._stats_interval_seconds:
+                    self._log_stats()
+                next_attempt_in: Optional[float] = self._get_next_attempt_in()
+            except Exception as e:
+                log.error('Error delivering outbox notifications. Trace:', e, module=Module.OUTBOX)
+                next_attempt_in = self._retry_base_seconds
+            with self._idle:
+                if next_attempt_in is None:
+                    self._idle.notify_all()
+            timeout: float = self._stats_interval_seconds if next_attempt_in is None \
+                else min(next_attempt_in, self._stats_interval_seconds)
+            self._wakeup.wait(timeout=timeout)
+            self._wakeup.clear()
+
+    def wait_until_empty(self, timeout: float) -> bool:
+        """
+        Block until no deliveries are pending, for instance before shutting down.
+        :param timeout: the maximum seconds to wait.
+        :return: true if the outbox is empty.
+        """
+        deadline: float = time.monotonic() + timeout
+        with self._idle:
+            while self.get_stats()[0]:
+                remaining: float = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._idle.wait(timeout=min(remaining, 0.1))
+        return True
+
+    def start(self) -> None:
+        """
+        Start the background worker, delivering notifications left over from a previous run first.
+        :return:
+        """
+        with self._lock:
+            if self._worker is not None:
+                return
+            self._worker = threading.Thread(target=self._run, name='outbox', daemon=True)
+            self._worker.start()
+        self._log_stats()
+
+    def __init__(self, filepath: str, retry_base_seconds: float, retry_max_seconds: float, max_age_seconds: float,
+                 stats_interval_seconds: float = 300):
+        """
+        Default constructor.
+        :param filepath: the database file, created if missing.
+        :param retry_base_seconds: the delay before the first retry, doubled for every further retry.
+        :param retry_max_seconds: the maximum delay between retries.
+        :param max_age_seconds: deliveries still failing this long after they were enqueued are dropped.
+        :param stats_interval_seconds: how often the queue depth and age are logged while deliveries are pending.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition()
+        self._wakeup = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._retry_base_seconds: float = retry_base_seconds
+        self._retry_max_seconds: float = retry_max_seconds
+        self._max_age_seconds: float = max_age_seconds
+        self._stats_interval_seconds: float = stats_interval_seconds
+        self._stats_logged_at: float = time.monotonic()
+        self._connection = sqlite3.connect(filepath, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(_SCHEMA)
+        # Attempts still running when the previous process ended may or may not have been delivered, retry them
+        with self._connection:
+            self._connection.execute('UPDATE outbox SET status = ? WHERE status = ?', (PENDING, SENDING))
+        self._running: Dict[Tuple[int, str], Future] = {}
+
+
+outbox: Outbox = Outbox(
+    os.path.join(config.data_dir, 'outbox.db'),
+    retry_base_seconds=config.outbox_retry_base_seconds,
+    retry_max_seconds=config.outbox_retry_max_seconds,
+    max_age_seconds=config.outbox_max_age_hours * 3600
+)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Callable, List, Optional
+
+import requests
+
+from logging_framework.log_handler import log, Module
+
+# Used if a 429 response carries no retry_after.
+_DEFAULT_RETRY_AFTER_SECONDS: float = 1
+# Attempts per message, including the first one, before a rate limited send is given up.
+_MAX_ATTEMPTS: int = 5
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens may go negative, which queues callers in the order they reserved.
+    """
+
+    def reserve(self) -> float:
+        """
+        Take a token.
+        :return: the seconds to wait before the token may be used.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0 if self._tokens >= 0 else -self._tokens / self._rate
+
+    def pause(self, seconds: float) -> None:
+        """
+        Hand out no tokens for the given time, for instance after the server asked to retry later.
+        :param seconds: the pause.
+        :return:
+        """
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self._rate)
+            self._updated = time.monotonic()
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Default constructor.
+        :param rate: tokens added per second.
+        :param capacity: maximum number of tokens, i.e. the burst size.
+        """
+        self._rate: float = rate
+        self._capacity: float = capacity
+        self._tokens: float = capacity
+        self._updated: float = time.monotonic()
+        self._lock = threading.Lock()
+
+
+class SendScheduler:
+    """
+    Paces api calls to stay within a global and a per-chat rate limit,
+    and retries calls rejected with 429 after the time the server asked for.
+    """
+
+    def _get_chat_bucket(self, chat_id: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = TokenBucket(self._chat_rate, self._chat_burst)
+                self._chat_buckets[chat_id] = bucket
+            return bucket
+
+    @staticmethod
+    def _get_retry_after(response: requests.Response) -> float:
+        try:
+            retry_after = response.json().get('parameters', {}).get('retry_after')
+        except ValueError:
+            retry_after = None
+        if retry_after is None:
+            retry_after = response.headers.get('Retry-After')
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return _DEFAULT_RETRY_AFTER_SECONDS
+
+    def call(
+            self,
+            chat_id: str,
+            send: Callable[[str], requests.Response],
+            per_chat: bool = True
+    ) -> requests.Response:
+        """
+        Run a single api call once the rate limits allow it. Blocks until done.
+        :param chat_id: the chat the call targets.
+        :param send: performs the call for the given chat id.
+        :param per_chat: whether the call counts against the chat's limit, false for calls such as deletions.
+        :return: the last response.
+        """
+        chat_bucket: Optional[TokenBucket] = self._get_chat_bucket(chat_id) if per_chat else None
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            if chat_bucket is not None:
+                time.sleep(chat_bucket.reserve())
+            time.sleep(self._global_bucket.reserve())
+            r = send(chat_id)
+            if r.status_code != 429:
+                return r
+            retry_after = self._get_retry_after(r)
+            with self._lock:
+                self.rate_limited += 1
+            log.warning(f'Rate limited in chat {chat_id}, retrying in {retry_after}s',
+                        f'(attempt {attempt}/{_MAX_ATTEMPTS}).', module=Module.TEL)
+            (chat_bucket or self._global_bucket).pause(retry_after)
+        return r
+
+    def broadcast(
+            self,
+            chat_ids: List[str],
+            send: Callable[[str], requests.Response]
+    ) -> Dict[str, Optional[requests.Response]]:
+        """
+        Run an api call for every chat concurrently, within the rate limits.
+        :param chat_ids: the chats.
+        :param send: performs the call for the given chat id.
+        :return: the response per chat, None if the request failed.
+        """
+        def _call(chat_id: str) -> Optional[requests.Response]:
+            try:
+                return self.call(chat_id, send)
+            except requests.RequestException as e:
+                log.error(f'Error sending to chat {chat_id}. Trace:', e, module=Module.TEL)
+                return None
+
+        if len(chat_ids) == 1:
+            return {chat_ids[0]: _call(chat_ids[0])}
+        return dict(zip(chat_ids, self._executor.map(_call, chat_ids)))
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: int, workers: int = 8):
+        """
+        Default constructor.
+        :param global_rate: calls per second over all chats.
+        :param chat_rate: calls per second to the same chat.
+        :param chat_burst: calls that may be sent to the same chat at once.
+        :param workers: concurrent requests of a broadcast.
+        """
+        self._global_bucket: TokenBucket = TokenBucket(global_rate, 1)
+        self._chat_rate: float = chat_rate
+        self._chat_burst: int = chat_burst
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='telegram-send')
+        # Number of calls rejected with 429, for statistics.
+        self.rate_limited: int = 0
@@ -1,71 +1,271 @@
 #!/usr/bin/env python3
-from typing import Dict, Any, Optional, List
+import os
+import sqlite3
+import threading
+from typing import Dict, Any, Optional, List, Union, Callable, Tuple
 from social_media_connectors.AbstractSocialMediaAdapter import AbstractSocialMediaAdapter
+from social_media_connectors.file_id_cache import FileIdCache
+from social_media_connectors.send_scheduler import SendScheduler
 from logging_framework.log_handler import log, Module
+from metrics.metrics import metrics, ADAPTER_DURATION, ADAPTER_FAILURES
+from networking.http_client import http_client
+from rendering.image_variants import ImageProfile, ImageVariant, image_optimiser
+from localisation.localised_message import LocalisedMessage, RecipientSettings, default_settings
+from storage.state_store import state_store
+from scheduling.clock import clock
 
 import requests
 import config
 
+# Maximum number of messages per deleteMessages call.
+_DELETE_BATCH_SIZE: int = 100
+
 
 class TelegramAPI(AbstractSocialMediaAdapter):
     """
     Handles telegram API calls.
     """
 
-    def _delete_messages(self, messages: List[int]) -> None:
-        for msg_id in messages:
-            r = requests.post(self._telegram_delete_url, data={
-                "chat_id": self._chat_id,
-                "message_id": msg_id
+    name: str = 'Telegram'
+    # Photos up to 10 MB, telegram scales them to at most 2560 pixels on the longest side anyway
+    image_profile: ImageProfile = ImageProfile(formats=('jpeg', 'png'), max_side=2560, max_bytes=10 * 1024 * 1024)
+
+    def _load_message_state(self) -> None:
+        """
+        Restore the deletable messages and pending deletions of a previous run.
+        :return:
+        """
+        try:
+            state: Dict[str, Any] = state_store.get_value('telegram', 'messages', {})
+        except Exception as e:
+            log.error('Error loading Telegram message state. Trace:', e, module=Module.TEL)
+            state = {}
+        self._deletable_message_dict = state.get('messages', {})
+        self._pending_deletes = state.get('pending', {})
+
+    def _save_message_state(self) -> None:
+        """
+        Persist the deletable messages and pending deletions. Must be called with the lock held.
+        :return:
+        """
+        try:
+            state_store.set_value('telegram', 'messages', {
+                'messages': self._deletable_message_dict,
+                'pending': self._pending_deletes
             })
+        except sqlite3.Error as e:
+            log.error('Error saving Telegram message state. Trace:', e, module=Module.TEL)
+
+    def _delete_messages(self, chat_id: str, messages: List[int]) -> None:
+        """
+        Delete messages in bulk, in batches of the maximum size allowed by telegram.
+        Messages that no longer exist or are too old are skipped by telegram.
+        :param chat_id: the chat of the messages.
+        :param messages: the message ids to delete.
+        :return:
+        """
+        for i in range(0, len(messages), _DELETE_BATCH_SIZE):
+            batch: List[int] = messages[i:i + _DELETE_BATCH_SIZE]
+            with metrics.time(ADAPTER_DURATION, adapter=self.name, operation='delete'):
+                r = self._scheduler.call(chat_id, lambda chat: http_client.post(self._telegram_delete_url, json={
+                    "chat_id": chat,
+                    "message_ids": batch
+                }), per_chat=False)
             if r.status_code != 200:
-                log.error("Failed to delete Telegram message:", r.text, module=Module.TEL)
+                metrics.inc(ADAPTER_FAILURES, adapter=self.name, operation='delete')
+                log.error("Failed to delete Telegram messages:", r.text, module=Module.TEL)
+
+    def _delete_worker(self) -> None:
+        """
+        Background worker deleting pending messages, keeping deletions off the send path.
+        :return:
+        """
+        while True:
+            self._delete_event.wait()
+            self._delete_event.clear()
+            with self._lock:
+                pending: Dict[str, List[int]] = {chat_id: list(ids) for chat_id, ids in self._pending_deletes.items()}
+            for chat_id, ids in pending.items():
+                # Any error only affects this chat and round, the worker must keep running for later deletions
+                try:
+                    self._delete_messages(chat_id, ids)
+                    with self._lock:
+                        deleted = set(ids)
+                        remaining = [msg_id for msg_id in self._pending_deletes.get(chat_id, [])
+                                     if msg_id not in deleted]
+                        if remaining:
+                            self._pending_deletes[chat_id] = remaining
+                        else:
+                            self._pending_deletes.pop(chat_id, None)
+                        self._save_message_state()
+                except Exception as e:
+                    log.error('Error deleting Telegram messages, retrying after the next notification. Trace:', e,
+                              module=Module.TEL)
 
-    def _check_and_delete_previous(self, delete_previous_key: Optional[str], new_message_id: int) -> None:
-        if delete_previous_key is None:
+    def _check_and_delete_previous(self, delete_previous_key: Optional[str], new_message_ids: Dict[str, int]) -> None:
+        """
+        Remember the new messages under the key and schedule the previous messages of the same chats for deletion.
+        :param delete_previous_key: the key, nothing is tracked if None.
+        :param new_message_ids: the new message id per chat.
+        :return:
+        """
+        if delete_previous_key is None or not new_message_ids:
             return
-        val = self._deletable_message_dict.get(delete_previous_key, None)
-        if val is not None:
-            self._delete_messages(val)
-        self._deletable_message_dict[delete_previous_key] = [new_message_id]
+        with self._lock:
+            chats: Dict[str, List[int]] = self._deletable_message_dict.setdefault(delete_previous_key, {})
+            for chat_id, msg_id in new_message_ids.items():
+                previous: Optional[List[int]] = chats.get(chat_id)
+                if previous:
+                    self._pending_deletes.setdefault(chat_id, []).extend(previous)
+                chats[chat_id] = [msg_id]
+            self._save_message_state()
+        self._delete_event.set()
+
+    @staticmethod
+    def _get_file_id(response: requests.Response) -> Optional[str]:
+        """
+        Get the file id of the largest photo size from a sendPhoto response.
+        :param response: the telegram response.
+        :return: the file id, if present.
+        """
+        photos: List[Dict[str, Any]] = response.json().get('result', {}).get('photo', [])
+        if not photos:
+            return None
+        return photos[-1].get('file_id')
+
+    def _send_message(self, chat_id: str, message: str) -> requests.Response:
+        return http_client.post(self._telegram_chat_url, data={'chat_id': chat_id, 'text': message})
+
+    def _send_photo(
+            self,
+            chat_id: str,
+            message: str,
+            image: ImageVariant,
+            content_hash: str
+    ) -> requests.Response:
+        """
+        Send a photo, referencing the file id of a previous upload of the same content if possible.
+        :param chat_id: the chat to send to.
+        :param message: the photo caption.
+        :param image: the image to send.
+        :param content_hash: the file id cache key of the image.
+        :return: the telegram response.
+        """
+        data = {
+            'chat_id': chat_id,
+            'caption': message
+        }
+        file_id: Optional[str] = self._file_id_cache.get(content_hash)
+        if file_id is not None:
+            r = http_client.post(self._telegram_attachment_url, data={**data, 'photo': file_id})
+            if r.status_code != 400:
+                return r
+            log.warning('Cached file id rejected, uploading the file again:', r.text, module=Module.TEL)
+            self._file_id_cache.invalidate(content_hash)
+        files = {
+            'photo': (image.filename, image.data, image.mime_type)
+        }
+        r = http_client.post(self._telegram_attachment_url, files=files, data=data)
+        if r.status_code == 200:
+            file_id = self._get_file_id(r)
+            if file_id is not None:
+                self._file_id_cache.put(content_hash, file_id)
+        return r
+
+    def _get_message_renderer(self, message: str, flags: Dict[str, Any]) -> Callable[[str], str]:
+        """
+        Get the message of each chat. Localised messages are rendered once per timezone and locale,
+        so each further chat only costs a lookup.
+        :param message: the default message.
+        :param flags: the notification flags, optionally containing a localised message.
+        :return: chat id -> message.
+        """
+        if not flags.get('localised'):
+            return lambda chat_id: message
+        localised: LocalisedMessage = LocalisedMessage.from_dict(flags['localised'])
+        now_ms: int = clock.now_ms()
+        rendered: Dict[Tuple[str, str], str] = {}
+
+        def _get_message(chat_id: str) -> str:
+            settings: RecipientSettings = self._chat_settings.get(chat_id, default_settings)
+            text: Optional[str] = rendered.get(settings.key)
+            if text is None:
+                text = rendered[settings.key] = localised.render(settings, now_ms)
+            return text
+
+        return _get_message
+
+    def _broadcast(self, chat_ids: List[str], message: str,
+                   flags: Dict[str, Any]) -> Dict[str, Optional[requests.Response]]:
+        """
+        Send the message to the given chats within the rate limits.
+        :param chat_ids: the chats.
+        :param message: the message to send.
+        :param flags: optional flags containing attachments.
+        :return: the response per chat, None if the request failed.
+        """
+        get_message: Callable[[str], str] = self._get_message_renderer(message, flags)
+        image_data: Optional[Union[bytes, memoryview]] = self.get_image(flags)
+        if image_data is None:
+            return self._scheduler.broadcast(chat_ids,
+                                             lambda chat_id: self._send_message(chat_id, get_message(chat_id)))
+        image: ImageVariant = image_optimiser.get_variant(image_data, self.image_profile)
+        content_hash: str = self._file_id_cache.get_content_hash(image.data)
+
+        def _send(chat_id: str) -> requests.Response:
+            return self._send_photo(chat_id, get_message(chat_id), image, content_hash)
+
+        # The first chat uploads the image, the others reference its file id
+        responses = self._scheduler.broadcast(chat_ids[:1], _send)
+        responses.update(self._scheduler.broadcast(chat_ids[1:], _send))
+        return responses
 
     def notify(
             self,
             message: str,
             flags: Dict[str, Any],
-            delete_previous_key: Optional[str] = None
-    ) -> None:
+            delete_previous_key: Optional[str] = None,
+            recipients: Optional[List[str]] = None
+    ) -> List[str]:
         """
-        Send the given message to telegram.
+        Send the given message to all telegram chats.
         :param message: the message to send.
         :param flags: optional flags containing attachments.
         :param delete_previous_key: optional key name for deleting previously sent message. Key name = event type.
-        :return:
+        :param recipients: optionally only send to these chats, for instance the ones that failed before.
+        :return: the chats the message was not delivered to.
         """
-        if not ('image' in flags.keys() and flags['image']):
-            r = requests.get(self._telegram_chat_url + message)
-        else:
-            filepath: str = flags['filepath']
-            image_data: Optional[bytes] = open(filepath, 'rb').read()
-            files = {
-                'photo': image_data
-            }
-            data = {
-                'chat_id': self._chat_id,
-                'caption': message
-            }
-            r = requests.post(self._telegram_attachment_url, files=files, data=data)
-        if r.status_code != 200:
-            log.error('Telegram API Error. Status code:', str(r.status_code), r.text, module=Module.TEL)
-            return
-        response_json = r.json()
-        if not response_json.get("ok"):
-            return
-        msg_id = response_json.get("result", {}).get("message_id", None)
-        if msg_id is None:
-            log.error('Message id not found.', module=Module.TEL)
-            return
-        self._check_and_delete_previous(delete_previous_key=delete_previous_key, new_message_id=msg_id)
+        chat_ids: List[str] = self._chat_ids if recipients is None \
+            else [chat_id for chat_id in self._chat_ids if chat_id in recipients]
+        with metrics.time(ADAPTER_DURATION, adapter=self.name, operation='send'):
+            responses = self._broadcast(chat_ids, message, flags)
+        new_message_ids: Dict[str, int] = {}
+        failed: List[str] = []
+        for chat_id in chat_ids:
+            r: Optional[requests.Response] = responses.get(chat_id)
+            if r is None:
+                metrics.inc(ADAPTER_FAILURES, adapter=self.name, operation='send')
+                failed.append(chat_id)
+                continue
+            if r.status_code != 200:
+                metrics.inc(ADAPTER_FAILURES, adapter=self.name, operation='send')
+                log.error(f'Telegram API Error in chat {chat_id}. Status code:', str(r.status_code), r.text,
+                          module=Module.TEL)
+                failed.append(chat_id)
+                continue
+            response_json = r.json()
+            if not response_json.get("ok"):
+                failed.append(chat_id)
+                continue
+            msg_id = response_json.get("result", {}).get("message_id", None)
+            if msg_id is None:
+                log.error('Message id not found.', module=Module.TEL)
+                continue
+            new_message_ids[chat_id] = msg_id
+        if len(chat_ids) > 1:
+            log.info(f'Delivered to {len(chat_ids) - len(failed)}/{len(chat_ids)} chats.', module=Module.TEL)
+        self._check_and_delete_previous(delete_previous_key=delete_previous_key, new_message_ids=new_message_ids)
+        return failed
 
     def __init__(self):
         """
@@ -73,12 +273,32 @@ class TelegramAPI(AbstractSocialMediaAdapter):
         :return:
         """
         self._api_key: str = config.telegram_api_key
-        self._chat_id: str = config.telegram_chat_id
-        self._telegram_attachment_url: str = f"https://api.telegram.org/bot{self._api_key}/sendPhoto"
-        self._telegram_chat_url: str = (f"https://api.telegram.org/bot{self._api_key}/sendMessage"
-                                        f"?chat_id={self._chat_id}&text=")
-        self._telegram_delete_url: str = f"https://api.telegram.org/bot{self._api_key}/deleteMessage"
-        self._deletable_message_dict: Dict[str, List[int]] = {}
+        self._chat_ids: List[str] = config.telegram_chat_ids
+        self._chat_settings: Dict[str, RecipientSettings] = {
+            chat_id: RecipientSettings(timezone_name, locale)
+            for chat_id, (timezone_name, locale) in config.telegram_chat_settings.items()
+        }
+        # Broadcasts to many chats take longer than a single message
+        self.notify_timeout_seconds: float = AbstractSocialMediaAdapter.notify_timeout_seconds \
+            + len(self._chat_ids) / config.telegram_global_rate_per_second
+        self._scheduler: SendScheduler = SendScheduler(
+            global_rate=config.telegram_global_rate_per_second,
+            chat_rate=config.telegram_chat_rate_per_minute / 60,
+            chat_burst=config.telegram_chat_burst
+        )
+        self._telegram_attachment_url: str = f"{config.telegram_api_url}/bot{self._api_key}/sendPhoto"
+        self._telegram_chat_url: str = f"{config.telegram_api_url}/bot{self._api_key}/sendMessage"
+        self._telegram_delete_url: str = f"{config.telegram_api_url}/bot{self._api_key}/deleteMessages"
+        # Message ids per delete key and chat, and pending deletions per chat
+        self._deletable_message_dict: Dict[str, Dict[str, List[int]]] = {}
+        self._pending_deletes: Dict[str, List[int]] = {}
+        self._load_message_state()
+        self._lock = threading.Lock()
+        self._delete_event = threading.Event()
+        self._file_id_cache: FileIdCache = FileIdCache(os.path.join(config.data_dir, 'telegram_file_ids.json'))
+        threading.Thread(target=self._delete_worker, name='telegram-delete', daemon=True).start()
+        if self._pending_deletes:
+            self._delete_event.set()
 
 
 api: TelegramAPI = TelegramAPI()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+import os
+import json
+from typing import Any
+
+
+def load_json(filepath: str, default: Any) -> Any:
+    """
+    Load a json file.
+    :param filepath: the file to load.
+    :param default: returned if the file does not exist.
+    :return: the parsed content.
+    """
+    if not os.path.exists(filepath):
+        return default
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(filepath: str, data: Any) -> None:
+    """
+    Atomically write a json file, so a crash never leaves a partially written file behind.
+    :param filepath: the file to write.
+    :param data: the content to write.
+    :return:
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+    tmp_path = f'{filepath}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, filepath)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Optional, Union
+
+import config
+from logging_framework.log_handler import log, Module
+
+# Delivery records older than this are removed on startup.
+_DELIVERY_RETENTION_SECONDS: int = 30 * 24 * 3600
+
+_SCHEMA: str = '''
+CREATE TABLE IF NOT EXISTS deliveries (
+    event TEXT NOT NULL,
+    period TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    delivered_at REAL NOT NULL,
+    PRIMARY KEY (event, period, content_hash)
+);
+CREATE TABLE IF NOT EXISTS state (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+'''
+
+
+def get_content_hash(message: str, image: Optional[Union[bytes, memoryview]]) -> str:
+    """
+    Hash a notification, including its attachment.
+    :param message: the message.
+    :param image: the image attachment, if any.
+    :return: the hex digest.
+    """
+    content = hashlib.sha256(message.encode('utf-8'))
+    if image is not None:
+        content.update(image)
+    return content.hexdigest()
+
+
+class StateStore:
+    """
+    Embedded SQLite store for state that has to survive restarts: which notification content was delivered
+    for which event and period, and small json values such as the message ids of the adapters.
+    """
+
+    def was_delivered(self, event: str, period: str, content_hash: Optional[str] = None) -> bool:
+        """
+        Check whether a notification was delivered.
+        :param event: the event name.
+        :param period: the period the notification belongs to, for instance the game day.
+        :param content_hash: optionally only match this content.
+        :return: true if a (matching) notification was delivered for the event and period.
+        """
+        query = 'SELECT 1 FROM deliveries WHERE event = ? AND period = ?'
+        params = [event, period]
+        if content_hash is not None:
+            query += ' AND content_hash = ?'
+            params.append(content_hash)
+        with self._lock:
+            return self._connection.execute(query + ' LIMIT 1', params).fetchone() is not None
+
+    def record_delivery(self, event: str, period: str, content_hash: str) -> None:
+        """
+        Remember that a notification was delivered.
+        :param event: the event name.
+        :param period: the period the notification belongs to.
+        :param content_hash: the content hash.
+        :return:
+        """
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO deliveries VALUES (?, ?, ?, ?)',
+                                     (event, period, content_hash, time.time()))
+
+    def clear_deliveries(self) -> None:
+        """
+        Forget all delivered notifications, so the next runs send them again. Used by the benchmarks to time
+        the full schedule path repeatedly.
+        :return:
+        """
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM deliveries')
+
+    def get_value(self, namespace: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._connection.execute('SELECT value FROM state WHERE namespace = ? AND key = ?',
+                                           (namespace, key)).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def set_value(self, namespace: str, key: str, value: Any) -> None:
+        with self._lock, self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO state VALUES (?, ?, ?)',
+                                     (namespace, key, json.dumps(value)))
+
+    def __init__(self, filepath: str):
+        """
+        Default constructor.
+        :param filepath: the database file, created if missing.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(filepath)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(filepath, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.executescript(_SCHEMA)
+        with self._connection:
+            removed = self._connection.execute('DELETE FROM deliveries WHERE delivered_at < ?',
+                                               (time.time() - _DELIVERY_RETENTION_SECONDS,)).rowcount
+        if removed:
+            log.debug(f'Removed {removed} expired delivery records.', module=Module.STATE)
+
+
+state_store: StateStore = StateStore(os.path.join(config.data_dir, 'state.db'))